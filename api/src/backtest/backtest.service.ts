@@ -37,14 +37,14 @@ export class BacktestService {
     );
 
     // Start backtest asynchronously
-    this.runBacktestAsync(backtest.id, strategy.code);
+    this.runBacktestAsync(backtest.id, strategy.code, userId);
 
     return this.findOne(userId, backtest.id);
   }
 
-  private async runBacktestAsync(backtestId: string, strategyCode: string) {
+  private async runBacktestAsync(backtestId: string, strategyCode: string, userId: string) {
     try {
-      const results = await this.leanService.runBacktest(backtestId, strategyCode);
+      const results = await this.leanService.runBacktest(backtestId, strategyCode, userId);
 
       await this.backtestRepository.update(backtestId, {
         results,
@@ -65,11 +65,26 @@ export class BacktestService {
       where.strategyId = strategyId;
     }
 
-    return this.backtestRepository.find({
+    const backtests = await this.backtestRepository.find({
       where,
       relations: ['strategy'],
       order: { createdAt: 'DESC' },
     });
+
+    // Attach live progress of running backtests, fetched in one call
+    const running = backtests.filter(backtest => backtest.status === 'running');
+    if (running.length > 0) {
+      try {
+        const statuses = await this.leanService.getBacktestStatuses(running.map(backtest => backtest.id));
+        for (const backtest of running) {
+          (backtest as any).progress = statuses[backtest.id]?.progress ?? null;
+        }
+      } catch (err) {
+        console.error('Failed to fetch backtest progress:', err);
+      }
+    }
+
+    return backtests;
   }
 
   async findOne(userId: string, id: string) {
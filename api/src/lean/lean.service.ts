@@ -9,49 +9,51 @@ export class LeanService {
 
     constructor(private readonly httpService: HttpService) { }
 
-    async runBacktest(strategyId: string, code: string): Promise<any> {
+    async runBacktest(strategyId: string, code: string, owner?: string): Promise<any> {
         try {
-            // Start the backtest
+            // Start the backtest; the user waits on it, so it runs ahead of bulk sweeps
             const backtestRequest = {
                 backtest_id: strategyId,
-                strategy_code: code
+                strategy_code: code,
+                owner,
+                priority_class: 'interactive'
             };
 
-            const startResponse = await firstValueFrom(
-                this.httpService.post(`${this.leanCliUrl}/backtest`, backtestRequest)
-            );
+            const startResponse = await this.submitBacktest(backtestRequest);
 
             if (startResponse.status !== 200) {
                 throw new Error('Failed to start backtest');
             }
 
-            // Poll for results
-            let attempts = 0;
-            const maxAttempts = 60; // 5 minutes with 5-second intervals
-            const pollInterval = 5000; // 5 seconds
-
-            while (attempts < maxAttempts) {
-                await new Promise(resolve => setTimeout(resolve, pollInterval));
-                attempts++;
+            // Long-poll for results: the service holds each request until the
+            // backtest finishes or the wait window elapses
+            const deadline = Date.now() + 5 * 60 * 1000; // 5 minutes
+            const waitSeconds = 30;
+            const retryDelay = 5000; // 5 seconds after a failed poll
 
+            while (Date.now() < deadline) {
+                let result: any;
                 try {
                     const resultResponse = await firstValueFrom(
-                        this.httpService.get(`${this.leanCliUrl}/backtest/${strategyId}`)
+                        this.httpService.get(`${this.leanCliUrl}/backtest/${strategyId}`, {
+                            params: { wait: waitSeconds },
+                        })
                     );
-
-                    if (resultResponse.status === 200) {
-                        const result = resultResponse.data;
-
-                        if (result.status === 'completed') {
-                            return result.results || result.performance;
-                        } else if (result.status === 'failed') {
-                            throw new Error(result.error || 'Backtest failed');
-                        }
-                        // If still running, continue polling
-                    }
+                    result = resultResponse.data;
                 } catch (error) {
                     console.error('Error polling backtest result:', error);
+                    await new Promise(resolve => setTimeout(resolve, retryDelay));
+                    continue;
                 }
+
+                if (result.status === 'completed') {
+                    return result.results || result.performance;
+                } else if (result.status === 'failed') {
+                    throw new Error(result.error || 'Backtest failed');
+                } else if (result.status === 'cancelled' || result.status === 'pruned') {
+                    throw new Error(result.error || `Backtest ${result.status}`);
+                }
+                // If still queued or running, wait again
             }
 
             throw new Error('Backtest timed out');
@@ -60,4 +62,42 @@ export class LeanService {
             throw new InternalServerErrorException('LEAN backtest failed: ' + error.message);
         }
     }
+
+    async getBacktestStatuses(backtestIds: string[]): Promise<Record<string, any>> {
+        // One request for all IDs; result payloads are left out unless asked for
+        const response = await firstValueFrom(
+            this.httpService.post(`${this.leanCliUrl}/backtests/status`, {
+                backtest_ids: backtestIds,
+            })
+        );
+        const statuses: Record<string, any> = {};
+        for (const backtest of response.data.backtests) {
+            statuses[backtest.backtest_id] = backtest;
+        }
+        return statuses;
+    }
+
+    private async submitBacktest(backtestRequest: any, maxRetries = 5): Promise<any> {
+        // The lean-cli service answers 429 with Retry-After when its queue is full
+        for (let retry = 0; ; retry++) {
+            try {
+                return await firstValueFrom(
+                    this.httpService.post(`${this.leanCliUrl}/backtest`, backtestRequest)
+                );
+            } catch (error) {
+                if (error.response?.status === 422 && Array.isArray(error.response.data?.detail)) {
+                    // Strategy code rejected before queueing, with line-level errors
+                    const errors = error.response.data.detail
+                        .map((e: any) => (e.line ? `line ${e.line}: ${e.msg}` : e.msg))
+                        .join('; ');
+                    throw new Error(`Invalid strategy code: ${errors}`);
+                }
+                if (error.response?.status !== 429 || retry >= maxRetries) {
+                    throw error;
+                }
+                const retryAfter = Number(error.response.headers['retry-after']) || 5;
+                await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+            }
+        }
+    }
 }
@@ -0,0 +1,82 @@
+"""
+Compact storage for per-job series such as equity curves.
+
+A series is stored as one compressed .npz file, split into chunks of
+CHUNK_SIZE points with an index of each chunk's first and last time. NumPy
+loads .npz members lazily, so a ranged read only decompresses the chunks
+that overlap the requested range.
+"""
+
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+CHUNK_SIZE = 65536
+EQUITY_FILE = "equity.npz"
+ORDERS_FILE = "orders.jsonl.gz"
+
+
+def write_series(path: Path, time: np.ndarray, columns: Dict[str, np.ndarray],
+                 chunk_size: int = CHUNK_SIZE):
+    """Store a time-indexed series as compressed chunks"""
+    time = np.asarray(time, dtype="datetime64[s]")
+    members = {}
+    starts, ends = [], []
+    for number, offset in enumerate(range(0, len(time), chunk_size)):
+        chunk = slice(offset, offset + chunk_size)
+        members[f"time_{number}"] = time[chunk]
+        for name, values in columns.items():
+            members[f"{name}_{number}"] = np.asarray(values)[chunk]
+        starts.append(time[chunk][0])
+        ends.append(time[chunk][-1])
+
+    members["chunk_start"] = np.array(starts, dtype="datetime64[s]")
+    members["chunk_end"] = np.array(ends, dtype="datetime64[s]")
+    members["columns"] = np.array(list(columns))
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez_compressed(f, **members)
+    tmp.replace(path)
+
+
+def read_series(path: Path, start: Optional[str] = None, end: Optional[str] = None,
+                downsample: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """Read start <= time <= end from a stored series, decompressing only overlapping chunks
+
+    With downsample, at most that many evenly spaced points are returned,
+    always including the last one.
+    """
+    with np.load(path) as archive:
+        chunk_start = archive["chunk_start"]
+        chunk_end = archive["chunk_end"]
+        columns = [str(name) for name in archive["columns"]]
+
+        selected = np.ones(len(chunk_start), dtype=bool)
+        if start is not None:
+            selected &= chunk_end >= np.datetime64(start)
+        if end is not None:
+            selected &= chunk_start <= np.datetime64(end)
+        chunks = np.flatnonzero(selected)
+
+        names = ["time"] + columns
+        if len(chunks) == 0:
+            empty = {name: np.empty(0) for name in columns}
+            return {"time": np.empty(0, dtype="datetime64[s]"), **empty}
+        series = {
+            name: np.concatenate([archive[f"{name}_{number}"] for number in chunks])
+            for name in names
+        }
+
+    mask = np.ones(len(series["time"]), dtype=bool)
+    if start is not None:
+        mask &= series["time"] >= np.datetime64(start)
+    if end is not None:
+        mask &= series["time"] <= np.datetime64(end)
+    series = {name: values[mask] for name, values in series.items()}
+
+    points = len(series["time"])
+    if downsample and points > downsample:
+        keep = np.unique(np.linspace(0, points - 1, downsample).round().astype(int))
+        series = {name: values[keep] for name, values in series.items()}
+    return series
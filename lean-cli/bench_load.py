@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Load test for the backtest service.
+
+Runs the FastAPI app in-process with the simulator engine and drives
+concurrent clients that submit backtests and long-poll for their results.
+Reports throughput, submit and completion latency percentiles and job store
+latency, repeated as the stored history grows. Results can be saved as a
+baseline and later runs compared against it to catch regressions.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, List
+
+import numpy as np
+
+BASELINE_FILE = Path(__file__).parent / "benchmarks" / "load_baseline.json"
+STRATEGY_CODE = """
+from AlgorithmImports import *
+
+class LoadTestAlgorithm(QCAlgorithm):
+    def Initialize(self):
+        self.AddEquity("SPY")
+"""
+# Store operations timed directly at each history size
+STORE_SAMPLES = 500
+SEED_CHUNK = 5000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=500, help="Backtests per history step")
+    parser.add_argument("--clients", type=int, default=50, help="Concurrent clients")
+    parser.add_argument("--workers", type=int, default=8, help="Executor workers")
+    parser.add_argument("--sim-seconds", type=float, default=0.05, help="Simulated run time per backtest")
+    parser.add_argument("--history", default="0,10000,50000",
+                        help="Comma-separated stored job counts to measure at")
+    parser.add_argument("--store", default="sqlite", choices=["sqlite", "memory"])
+    parser.add_argument("--save", action="store_true", help="Save the results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="Compare the results with the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative regression against the baseline")
+    return parser.parse_args()
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 in milliseconds"""
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    values = np.percentile(np.asarray(samples) * 1000, [50, 95, 99])
+    return {"p50": float(values[0]), "p95": float(values[1]), "p99": float(values[2])}
+
+
+def seed_history(main, count: int, offset: int):
+    """Store count finished backtests shaped like real ones"""
+    now = time.strftime("%Y-%m-%dT%H:%M:%S")
+    for start in range(0, count, SEED_CHUNK):
+        main.job_store.upsert_many({
+            f"history-{offset + i}": {
+                "status": "completed",
+                "created_at": now,
+                "completed_at": now,
+                "results": {"totalReturn": 0.1, "sharpeRatio": 1.2, "maxDrawdown": -0.1,
+                            "winRate": 0.5, "finalPortfolioValue": 110000.0,
+                            "totalTrades": 10, "profitLoss": 10000.0},
+                "error": None,
+            }
+            for i in range(start, min(start + SEED_CHUNK, count))
+        })
+
+
+def time_store(main, history: int) -> Dict[str, Any]:
+    """Latency of single-job reads and writes against the current history"""
+    rng = random.Random(0)
+    reads, writes = [], []
+    for i in range(STORE_SAMPLES):
+        backtest_id = f"history-{rng.randrange(history)}" if history else f"probe-{i}"
+        started = time.perf_counter()
+        main.job_store.get(backtest_id)
+        reads.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        main.job_store.upsert(f"probe-{i}", {"status": "queued", "error": None})
+        writes.append(time.perf_counter() - started)
+    return {"get_ms": percentiles(reads), "upsert_ms": percentiles(writes)}
+
+
+async def run_clients(client, jobs: int, clients: int, step: int) -> Dict[str, Any]:
+    """Submit jobs from concurrent clients and wait for every result"""
+    submit_latency, completion_latency = [], []
+    rejected = 0
+    failed = 0
+    next_job = iter(range(jobs))
+
+    async def client_loop():
+        nonlocal rejected, failed
+        for number in next_job:
+            backtest_id = f"load-{step}-{number}"
+            request = {
+                "backtest_id": backtest_id,
+                "strategy_code": STRATEGY_CODE,
+                "parameters": {"run": number},
+                "use_cache": False,
+            }
+            submitted = time.perf_counter()
+            while True:
+                response = await client.post("/backtest", json=request)
+                if response.status_code != 429:
+                    break
+                rejected += 1
+                await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+            submit_latency.append(time.perf_counter() - submitted)
+            if response.status_code != 200:
+                failed += 1
+                continue
+
+            status = response.json()["status"]
+            while status in ("queued", "running"):
+                response = await client.get(f"/backtest/{backtest_id}", params={"wait": 30})
+                status = response.json()["status"]
+            completion_latency.append(time.perf_counter() - submitted)
+            if status != "completed":
+                failed += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    return {
+        "jobs_per_second": jobs / elapsed,
+        "submit_ms": percentiles(submit_latency),
+        "completion_ms": percentiles(completion_latency),
+        "rejected": rejected,
+        "failed": failed,
+    }
+
+
+async def run_benchmark(args, history_steps: List[int]) -> List[Dict[str, Any]]:
+    import httpx
+    import main
+
+    steps = []
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            seeded = 0
+            for step, history in enumerate(history_steps):
+                seed_history(main, history - seeded, seeded)
+                seeded = history
+                store = time_store(main, history)
+                load = await run_clients(client, args.jobs, args.clients, step)
+                steps.append({"history": history, **load, "store": store})
+
+                print(f"\n📚 History {history:,} jobs")
+                print(f"   🚀 {load['jobs_per_second']:.1f} jobs/s "
+                      f"(ceiling {args.workers / args.sim_seconds:.0f}), "
+                      f"{load['rejected']} rejected, {load['failed']} failed")
+                for name in ("submit_ms", "completion_ms"):
+                    p = load[name]
+                    print(f"   ⏱️  {name:<14} p50 {p['p50']:8.2f}  p95 {p['p95']:8.2f}  p99 {p['p99']:8.2f}")
+                for name in ("get_ms", "upsert_ms"):
+                    p = store[name]
+                    print(f"   💾 store {name:<8} p50 {p['p50']:8.3f}  p95 {p['p95']:8.3f}  p99 {p['p99']:8.3f}")
+    return steps
+
+
+def compare(steps: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Describe every measurement that regressed beyond tolerance"""
+    regressions = []
+    previous = {step["history"]: step for step in baseline["steps"]}
+    for step in steps:
+        base = previous.get(step["history"])
+        if base is None:
+            continue
+        label = f"history {step['history']:,}"
+        if step["jobs_per_second"] < base["jobs_per_second"] * (1 - tolerance):
+            regressions.append(f"{label}: {step['jobs_per_second']:.1f} jobs/s, "
+                               f"baseline {base['jobs_per_second']:.1f}")
+        for group, name in (("completion_ms", "p95"), ("submit_ms", "p95")):
+            value, limit = step[group][name], base[group][name] * (1 + tolerance)
+            if value > limit:
+                regressions.append(f"{label}: {group} {name} {value:.2f}, baseline {base[group][name]:.2f}")
+        for name in ("get_ms", "upsert_ms"):
+            value, limit = step["store"][name]["p95"], base["store"][name]["p95"] * (1 + tolerance)
+            if value > limit:
+                regressions.append(f"{label}: store {name} p95 {value:.3f}, "
+                                   f"baseline {base['store'][name]['p95']:.3f}")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    history_steps = sorted(int(value) for value in args.history.split(","))
+    workdir = Path(tempfile.mkdtemp(prefix="bench_load_"))
+
+    # The service reads its configuration at import time
+    os.environ.update({
+        "ENGINE_MODE": "simulator",
+        "ENGINE_WORKERS": "0",
+        "SIMULATOR_DURATION_SECONDS": str(args.sim_seconds),
+        "MAX_WORKERS": str(args.workers),
+        "MAX_QUEUE_DEPTH": str(max(args.jobs, args.clients) * 2),
+        "JOB_STORE": args.store,
+        "JOB_STORE_PATH": str(workdir / "backtest_status.db"),
+        "LEAN_STRATEGIES_DIR": str(workdir / "strategies"),
+        "LEAN_RESULTS_DIR": str(workdir / "results"),
+        "LEAN_DATA_DIR": str(workdir / "data"),
+    })
+
+    print("🏋️ Load testing the backtest service in-process")
+    print(f"   {args.jobs} jobs per step, {args.clients} clients, {args.workers} workers, "
+          f"{args.sim_seconds * 1000:.0f} ms simulated runs, {args.store} store")
+    print("=" * 50)
+
+    steps = asyncio.run(run_benchmark(args, history_steps))
+    report = {
+        "config": {
+            "jobs": args.jobs,
+            "clients": args.clients,
+            "workers": args.workers,
+            "sim_seconds": args.sim_seconds,
+            "store": args.store,
+        },
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "steps": steps,
+    }
+
+    print("=" * 50)
+    exit_code = 0
+    if args.compare:
+        if not BASELINE_FILE.exists():
+            print(f"❌ No baseline at {BASELINE_FILE}, run with --save first")
+            return 1
+        with open(BASELINE_FILE) as f:
+            baseline = json.load(f)
+        if baseline["config"] != report["config"]:
+            print(f"⚠️  Baseline was recorded with a different config: {baseline['config']}")
+        if baseline["machine"] != report["machine"]:
+            print(f"⚠️  Baseline was recorded on a different machine: {baseline['machine']}")
+        regressions = compare(steps, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"❌ {regression}")
+        if regressions:
+            exit_code = 1
+        else:
+            print(f"✅ No regressions beyond {args.tolerance:.0%} of the baseline")
+    if args.save:
+        BASELINE_FILE.parent.mkdir(exist_ok=True)
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Baseline saved to {BASELINE_FILE}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the metrics module.
+
+Times compute_metrics and rolling_stats on synthetic minute-resolution
+equity curves of growing length and checks that the cost grows linearly
+with the number of bars.
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from metrics import PERIODS_PER_YEAR, compute_metrics, rolling_stats
+
+MINUTE_BARS_PER_YEAR = PERIODS_PER_YEAR["minute"]
+SIZES = [MINUTE_BARS_PER_YEAR * years for years in (1, 2, 5, 10, 20)]
+REPEATS = 3
+# Log-log slope of time against length; 1.0 is perfectly linear
+MAX_SLOPE = 1.25
+
+
+def synthetic_curve(bars: int, seed: int = 0):
+    """Random-walk equity curve, trade list and positions"""
+    rng = np.random.default_rng(seed)
+    equity = 100000 * np.cumprod(1 + rng.normal(0, 0.0005, bars))
+    trades = rng.normal(0.001, 0.02, bars // 500)
+    positions = rng.integers(0, 2, bars)
+    return equity, trades, positions
+
+
+def time_metrics(bars: int) -> float:
+    """Best-of-REPEATS seconds for a full metrics pass"""
+    equity, trades, positions = synthetic_curve(bars)
+    best = float("inf")
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        compute_metrics(equity, trades, positions, MINUTE_BARS_PER_YEAR)
+        rolling_stats(equity, 390 * 21, MINUTE_BARS_PER_YEAR)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    print("📏 Benchmarking metrics on minute-resolution equity curves")
+    print("=" * 50)
+
+    timings = []
+    for bars in SIZES:
+        seconds = time_metrics(bars)
+        timings.append(seconds)
+        print(f"{bars:>12,} bars  {seconds * 1000:9.1f} ms  {seconds / bars * 1e9:7.1f} ns/bar")
+
+    slope = np.polyfit(np.log(SIZES), np.log(timings), 1)[0]
+    print("=" * 50)
+    print(f"📈 Log-log slope: {slope:.2f} (linear = 1.00, limit {MAX_SLOPE})")
+
+    if slope <= MAX_SLOPE:
+        print("✅ Metrics cost is linear in series length")
+        return 0
+    print("❌ Metrics cost grows faster than linear")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark for parsing large LEAN result files.
+
+Writes a synthetic backtest-results.json of roughly --size-mb megabytes and
+parses it in fresh processes with json.load and with the streaming parser,
+reporting parse time and peak RSS of each.
+"""
+
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from lean_results import ingest_lean_results, summarize_performance
+
+
+def write_synthetic_results(path: Path, size_mb: int):
+    """Stream a LEAN-shaped results file to disk without building it in memory"""
+    rng = random.Random(0)
+    target = size_mb * 1024 * 1024
+    start = 1262304000  # 2010-01-01
+    with open(path, "w") as f:
+        f.write('{"Charts": {"Strategy Equity": {"Series": {"Equity": {"Values": [')
+        points = 200000
+        f.write(",".join(
+            json.dumps({"x": start + 60 * i, "y": 100000 + i * 0.5}) for i in range(points)
+        ))
+        f.write(']}}}, "Benchmark": {"Series": {"Benchmark": {"Values": [')
+        f.write(",".join(
+            json.dumps({"x": start + 60 * i, "y": 300 + i * 0.001}) for i in range(points)
+        ))
+        f.write(']}}}}, "Orders": {')
+        order_id = 0
+        while f.tell() < target:
+            if order_id:
+                f.write(",")
+            f.write(json.dumps(str(order_id)) + ":" + json.dumps({
+                "Id": order_id,
+                "Symbol": {"Value": "SPY", "ID": "SPY R735QTJ8XC9X"},
+                "Price": round(rng.uniform(200, 400), 2),
+                "Quantity": rng.randint(-100, 100),
+                "Time": "2020-01-02T14:31:00Z",
+                "Type": 0,
+                "Status": 3,
+                "Tag": "",
+                "OrderSubmissionData": {"BidPrice": 300.1, "AskPrice": 300.2, "LastPrice": 300.15},
+            }))
+            order_id += 1
+        f.write('}, "TotalPerformance": {"TotalReturn": 0.12, "SharpeRatio": 1.1, '
+                '"Drawdown": -0.08, "WinRate": 0.55, "PortfolioValue": 112000, '
+                '"TotalTrades": %d, "TotalProfit": 12000}}' % order_id)
+
+
+def measure(mode: str, results_file: Path):
+    """Parse once in this process and print seconds and peak RSS as JSON"""
+    started = time.perf_counter()
+    if mode == "json":
+        with open(results_file) as f:
+            results = json.load(f)
+        summarize_performance(results.get("TotalPerformance", {}))
+    else:
+        with tempfile.TemporaryDirectory() as artifacts_dir:
+            ingest_lean_results(results_file, Path(artifacts_dir))
+    seconds = time.perf_counter() - started
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"seconds": seconds, "peak_rss_mb": peak_rss_mb}))
+
+
+def run_measurement(mode: str, results_file: Path) -> dict:
+    output = subprocess.run(
+        [sys.executable, __file__, "--measure", mode, str(results_file)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=100)
+    parser.add_argument("--measure", nargs=2, metavar=("MODE", "FILE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.measure[0], Path(args.measure[1]))
+        return 0
+
+    print(f"📦 Benchmarking LEAN result parsing on a {args.size_mb} MB file")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as workdir:
+        results_file = Path(workdir) / "backtest-results.json"
+        write_synthetic_results(results_file, args.size_mb)
+        size_mb = results_file.stat().st_size / 1024 / 1024
+        print(f"File size: {size_mb:.1f} MB")
+
+        measurements = {mode: run_measurement(mode, results_file) for mode in ("json", "stream")}
+
+    for mode, result in measurements.items():
+        print(f"{mode:>8}: {result['seconds']:7.2f} s  peak RSS {result['peak_rss_mb']:8.1f} MB")
+
+    saved = measurements["json"]["peak_rss_mb"] - measurements["stream"]["peak_rss_mb"]
+    print("=" * 50)
+    print(f"📉 Streaming saves {saved:.1f} MB of peak RSS")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the backtest service.
+
+Starts the service with uvicorn in fresh processes and times how long it
+takes until the first backtest is accepted and until /ready reports warm
+engine workers and caches. Fails when the median time to the first
+accepted request exceeds the budget.
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Dict, Optional
+
+BASE_DIR = Path(__file__).parent
+# Cold start to first accepted request, in seconds
+DEFAULT_BUDGET_SECONDS = 2.0
+POLL_INTERVAL = 0.01
+TIMEOUT_SECONDS = 60
+STRATEGY_CODE = """
+from AlgorithmImports import *
+
+class StartupAlgorithm(QCAlgorithm):
+    def Initialize(self):
+        self.AddEquity("SPY")
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Service starts to time")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS,
+                        help="Maximum median seconds from start to the first accepted backtest")
+    parser.add_argument("--engine-workers", type=int, default=0,
+                        help="Warm engine workers the service starts (ENGINE_WORKERS)")
+    return parser.parse_args()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def request(url: str, body: Optional[Dict] = None) -> Optional[int]:
+    """Status code of a GET, or a POST with a JSON body; None if the service is not up"""
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError):
+        return None
+
+
+def time_startup(workdir: Path, engine_workers: int) -> Dict[str, float]:
+    """Seconds from process start to the first accepted backtest and to readiness"""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = {
+        **os.environ,
+        "JOB_STORE_PATH": str(workdir / "backtest_status.db"),
+        "LEAN_STRATEGIES_DIR": str(workdir / "strategies"),
+        "LEAN_RESULTS_DIR": str(workdir / "results"),
+        "LEAN_DATA_DIR": str(workdir / "data"),
+        "ENGINE_WORKERS": str(engine_workers),
+        "SIMULATOR_DURATION_SECONDS": "0.1",
+    }
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        timings = {}
+        backtest = {"backtest_id": f"startup-{port}", "strategy_code": STRATEGY_CODE, "use_cache": False}
+        while "first_request" not in timings:
+            if time.perf_counter() - started > TIMEOUT_SECONDS:
+                raise RuntimeError("The service did not accept a backtest in time")
+            if request(f"{url}/backtest", backtest) == 200:
+                timings["first_request"] = time.perf_counter() - started
+            else:
+                time.sleep(POLL_INTERVAL)
+        while "ready" not in timings:
+            if time.perf_counter() - started > TIMEOUT_SECONDS:
+                raise RuntimeError("The service did not become ready in time")
+            if request(f"{url}/ready") == 200:
+                timings["ready"] = time.perf_counter() - started
+            else:
+                time.sleep(POLL_INTERVAL)
+        return timings
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    args = parse_args()
+    print(f"🚀 Benchmarking service startup, {args.runs} runs, {args.engine_workers} engine workers")
+    print("=" * 50)
+
+    runs = []
+    for run in range(args.runs):
+        with tempfile.TemporaryDirectory() as workdir:
+            timings = time_startup(Path(workdir), args.engine_workers)
+        runs.append(timings)
+        print(f"run {run + 1}: first accepted backtest {timings['first_request']:.3f} s, "
+              f"ready {timings['ready']:.3f} s")
+
+    first_request = statistics.median(t["first_request"] for t in runs)
+    ready = statistics.median(t["ready"] for t in runs)
+    print("=" * 50)
+    print(f"Median: first accepted backtest {first_request:.3f} s, ready {ready:.3f} s")
+    if first_request > args.budget:
+        print(f"❌ Over the {args.budget:.2f} s budget")
+        return 1
+    print(f"✅ Within the {args.budget:.2f} s budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
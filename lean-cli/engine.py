@@ -0,0 +1,265 @@
+"""
+Backtest engines.
+
+"lean" runs the LEAN launcher as a subprocess and streams its output to a
+per-job log file. "simulator" produces deterministic fake results without
+running anything, for development and load tests.
+
+Both engines can report progress checkpoints while running: a dict with
+the fraction of the period done and the return and drawdown so far. The
+simulator can resume from its last checkpoint; LEAN cannot restore an
+algorithm's state mid-run, so interrupted LEAN runs start over.
+"""
+
+import ast
+import asyncio
+import builtins
+import json
+import random
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+ENGINE_MODES = ("lean", "simulator")
+
+# Bytes read from the engine output per chunk, so logs never sit in memory
+LOG_CHUNK_SIZE = 64 * 1024
+
+# Prefix of the output lines through which a running algorithm reports progress
+PROGRESS_MARKER = b"BACKTEST_PROGRESS "
+# Progress checkpoints reported by the simulator over its run time
+SIMULATOR_CHECKPOINTS = 10
+
+# Appended to strategy files to print a checkpoint at the end of each day
+PROGRESS_REPORTER = """
+
+def _install_progress_reporter(algorithm_class):
+    import json
+    # Hook the handler the strategy itself defines, snake_case or not, on the class or a base of its own
+    own = [cls for cls in algorithm_class.__mro__ if cls.__module__ == algorithm_class.__module__]
+    name = next((n for cls in own for n in ("on_end_of_day", "OnEndOfDay") if n in cls.__dict__), "OnEndOfDay")
+    original = next((cls.__dict__[name] for cls in own if name in cls.__dict__), None)
+
+    def on_end_of_day(self, *args):
+        state = getattr(self, "_progress", None)
+        if state is None:
+            state = self._progress = {}
+        today = self.Time.date()
+        if state.get("day") != today:
+            state["day"] = today
+            value = float(self.Portfolio.TotalPortfolioValue)
+            state.setdefault("initial", value)
+            state["peak"] = max(state.get("peak", value), value)
+            span = (self.EndDate - self.StartDate).total_seconds() or 1.0
+            elapsed = (self.Time - self.StartDate).total_seconds()
+            print("BACKTEST_PROGRESS " + json.dumps({
+                "fraction": min(1.0, max(0.0, elapsed / span)),
+                "return": value / state["initial"] - 1.0,
+                "drawdown": value / state["peak"] - 1.0,
+            }), flush=True)
+        if original is not None:
+            return original(self, *args)
+
+    setattr(algorithm_class, name, on_end_of_day)
+"""
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+class EngineError(Exception):
+    """Raised when the engine fails to produce results"""
+
+
+def _base_names(node: ast.ClassDef) -> List[str]:
+    return [
+        base.attr if isinstance(base, ast.Attribute) else getattr(base, "id", None)
+        for base in node.bases
+    ]
+
+
+def algorithm_class_chain(tree: ast.Module, node: ast.ClassDef) -> Tuple[List[ast.ClassDef], bool]:
+    """The class and its bases defined in the module, and whether QCAlgorithm is among their bases"""
+    classes = {item.name: item for item in tree.body if isinstance(item, ast.ClassDef)}
+    chain, pending, derives = [], [node], False
+    while pending:
+        current = pending.pop()
+        if any(current is seen for seen in chain):
+            continue
+        chain.append(current)
+        for name in _base_names(current):
+            if name == "QCAlgorithm":
+                derives = True
+            elif name in classes:
+                pending.append(classes[name])
+    return chain, derives
+
+
+def find_algorithm_class_node(tree: ast.Module, indirect: bool = False) -> Optional[ast.ClassDef]:
+    """Return the most derived top-level class deriving from QCAlgorithm
+
+    Bases defined in the same module are followed. With indirect, a class
+    deriving from a base imported from elsewhere, which may derive from
+    QCAlgorithm in turn, is returned when no class visibly does.
+    """
+    classes = [item for item in tree.body if isinstance(item, ast.ClassDef)]
+    defined = {item.name for item in classes}
+    chains = [(item, *algorithm_class_chain(tree, item)) for item in classes]
+    candidates = [(item, chain) for item, chain, derives in chains if derives]
+    if not candidates and indirect:
+        candidates = [
+            (item, chain) for item, chain, _ in chains
+            if any(name not in defined and not hasattr(builtins, name)
+                   for cls in chain for name in _base_names(cls))
+        ]
+    # A base shared by several algorithms is not the one to run
+    bases = {id(cls) for _, chain in candidates for cls in chain[1:]}
+    for item, _ in candidates:
+        if id(item) not in bases:
+            return item
+    return None
+
+
+def find_algorithm_class(strategy_code: str) -> Optional[str]:
+    """Return the name of the algorithm class, possibly deriving from QCAlgorithm through an imported base"""
+    try:
+        tree = ast.parse(strategy_code)
+    except SyntaxError:
+        return None
+    node = find_algorithm_class_node(tree, indirect=True)
+    return node.name if node is not None else None
+
+
+def with_progress_reporter(strategy_code: str) -> str:
+    """Strategy code that also prints progress checkpoints while LEAN runs it"""
+    algorithm_class = find_algorithm_class(strategy_code)
+    if algorithm_class is None:
+        return strategy_code
+    return f"{strategy_code}{PROGRESS_REPORTER}\n_install_progress_reporter({algorithm_class})\n"
+
+
+def write_lean_config(config_file: Path, algorithm_class: str, strategy_file: Path,
+                      results_dir: Path, data_dir: Path, parameters: Dict[str, Any]):
+    """Write the launcher config for a single Python backtest"""
+    config = {
+        "environment": "backtesting",
+        "algorithm-type-name": algorithm_class,
+        "algorithm-language": "Python",
+        "algorithm-location": str(strategy_file),
+        "algorithm-id": "backtest-results",
+        "data-folder": str(data_dir),
+        "results-destination-folder": str(results_dir),
+        "parameters": {key: str(value) for key, value in parameters.items()},
+        "close-automatically": True,
+    }
+    with open(config_file, "w") as f:
+        json.dump(config, f, indent=2)
+
+
+def _report_progress(lines: List[bytes], on_progress: ProgressCallback):
+    for line in lines:
+        index = line.find(PROGRESS_MARKER)
+        if index < 0:
+            continue
+        try:
+            checkpoint = json.loads(line[index + len(PROGRESS_MARKER):])
+        except ValueError:
+            continue
+        on_progress(checkpoint)
+
+
+async def _stream_to_file(stream: asyncio.StreamReader, log_file: Path,
+                          on_progress: Optional[ProgressCallback] = None):
+    partial = b""
+    # Unbuffered, so each chunk is written by one call in a worker thread
+    with open(log_file, "wb", buffering=0) as f:
+        while True:
+            chunk = await stream.read(LOG_CHUNK_SIZE)
+            if not chunk:
+                break
+            await asyncio.to_thread(f.write, chunk)
+            if on_progress is not None:
+                # Only complete lines are scanned; the tail waits for the next chunk
+                lines = (partial + chunk).split(b"\n")
+                partial = lines.pop()
+                _report_progress(lines, on_progress)
+        if on_progress is not None and partial:
+            _report_progress([partial], on_progress)
+
+
+async def run_lean_engine(launcher: List[str], engine_dir: Path, config_file: Path,
+                          log_file: Path, timeout: float,
+                          on_progress: Optional[ProgressCallback] = None):
+    """Run the LEAN launcher, streaming stdout/stderr to log_file
+
+    Progress lines printed by the algorithm are passed to on_progress. The
+    process is killed if it exceeds timeout, the calling task is cancelled
+    or on_progress raises.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *launcher, "--config", str(config_file),
+        cwd=engine_dir,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+    )
+    try:
+        await asyncio.wait_for(_stream_to_file(process.stdout, log_file, on_progress), timeout)
+        returncode = await process.wait()
+    except asyncio.TimeoutError:
+        raise EngineError(f"LEAN engine timed out after {timeout:.0f}s")
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+    if returncode != 0:
+        raise EngineError(f"LEAN engine exited with code {returncode}, see {log_file.name}")
+
+
+async def run_simulator(backtest_id: str, initial_capital: float,
+                        duration: float = 3.0,
+                        on_progress: Optional[ProgressCallback] = None,
+                        checkpoint: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Return deterministic fake results after a simulated run time
+
+    The run time is split into SIMULATOR_CHECKPOINTS steps, each reporting
+    a checkpoint on a path that ends at the final return and drawdown. Given
+    the last checkpoint of an interrupted run, the steps up to it are skipped.
+    """
+    # Deterministic results for the same backtest_id, in any process
+    rng = random.Random(zlib.crc32(backtest_id.encode()) % 1000)
+
+    # Simulate realistic trading results
+    total_return = rng.uniform(-0.2, 0.4)  # -20% to +40%
+    sharpe_ratio = rng.uniform(-1.0, 2.5)  # -1.0 to 2.5
+    max_drawdown = rng.uniform(-0.3, -0.05)  # -30% to -5%
+    win_rate = rng.uniform(0.3, 0.8)  # 30% to 80%
+
+    path = random.Random(rng.random())
+    # The maximum drawdown is reached at some point during the run
+    drawdown_at = path.uniform(0.1, 1.0)
+    resume_step = checkpoint.get("step", 0) if checkpoint else 0
+    for step in range(1, SIMULATOR_CHECKPOINTS + 1):
+        # Drawn for skipped steps too, so a resumed run reports the same path
+        noise = path.gauss(0.0, 0.02)
+        if step <= resume_step:
+            continue
+        await asyncio.sleep(duration / SIMULATOR_CHECKPOINTS)  # Simulate processing time
+        fraction = step / SIMULATOR_CHECKPOINTS
+        if on_progress is not None and step < SIMULATOR_CHECKPOINTS:
+            on_progress({
+                "step": step,
+                "fraction": fraction,
+                "return": total_return * fraction + noise,
+                "drawdown": max_drawdown * min(1.0, fraction / drawdown_at),
+            })
+
+    return {
+        "totalReturn": total_return,
+        "sharpeRatio": sharpe_ratio,
+        "maxDrawdown": max_drawdown,
+        "winRate": win_rate,
+        "finalPortfolioValue": initial_capital * (1 + total_return),
+        "totalTrades": rng.randint(1, 50),
+        "profitLoss": initial_capital * total_return,
+    }
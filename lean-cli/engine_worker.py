@@ -0,0 +1,113 @@
+"""
+Long-lived engine worker process.
+
+Started by EngineWorkerPool. Reads one JSON job per line on stdin and
+answers with JSON lines on stdout, so interpreter start-up and engine
+imports are paid once per worker instead of once per backtest. Progress
+checkpoints are sent as they are reported, ahead of the job's result.
+"""
+
+import asyncio
+import json
+import os
+import resource
+import sys
+from pathlib import Path
+from typing import Callable, Dict, Any
+
+from engine import run_lean_engine, run_simulator
+
+
+# How often the memory of a running job is sampled
+RSS_SAMPLE_SECONDS = 0.5
+
+
+def tree_rss_bytes() -> int:
+    """Resident set size of this process and everything it started, such as a LEAN launcher"""
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total, pending = 0, [os.getpid()]
+    try:
+        while pending:
+            pid = pending.pop()
+            try:
+                with open(f"/proc/{pid}/statm") as f:
+                    total += int(f.read().split()[1]) * page_size
+                for task in os.listdir(f"/proc/{pid}/task"):
+                    with open(f"/proc/{pid}/task/{task}/children") as f:
+                        pending.extend(int(child) for child in f.read().split())
+            except FileNotFoundError:
+                # Exited while being measured
+                if pid == os.getpid():
+                    raise
+        return total
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is the peak in KB on Linux, the best estimate elsewhere
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        return usage * 1024
+
+
+async def run_measured(job: Dict[str, Any], on_progress: Callable) -> Dict[str, Any]:
+    """Run a job and build its result message, with the peak memory of the process tree while it ran"""
+    peak = tree_rss_bytes()
+
+    async def sample():
+        nonlocal peak
+        while True:
+            await asyncio.sleep(RSS_SAMPLE_SECONDS)
+            peak = max(peak, tree_rss_bytes())
+
+    sampler = asyncio.create_task(sample())
+    try:
+        result = await ENGINE_FUNCTIONS[job["engine"]](job["kwargs"], on_progress)
+        message = {"type": "result", "ok": True, "result": result}
+    except Exception as e:
+        message = {"type": "result", "ok": False, "error": str(e)}
+    finally:
+        sampler.cancel()
+    message["rss"] = max(peak, tree_rss_bytes())
+    return message
+
+
+async def _run_simulator(kwargs: Dict[str, Any], on_progress: Callable):
+    return await run_simulator(**kwargs, on_progress=on_progress)
+
+
+async def _run_lean_engine(kwargs: Dict[str, Any], on_progress: Callable):
+    await run_lean_engine(
+        kwargs["launcher"],
+        Path(kwargs["engine_dir"]),
+        Path(kwargs["config_file"]),
+        Path(kwargs["log_file"]),
+        kwargs["timeout"],
+        on_progress,
+    )
+
+
+ENGINE_FUNCTIONS = {
+    "run_simulator": _run_simulator,
+    "run_lean_engine": _run_lean_engine,
+}
+
+
+def main():
+    # Keep stdout for the protocol; anything printed by engine code goes to stderr
+    channel = sys.stdout
+    sys.stdout = sys.stderr
+
+    def send(message: Dict[str, Any]):
+        channel.write(json.dumps(message) + "\n")
+        channel.flush()
+
+    def send_progress(checkpoint: Dict[str, Any]):
+        send({"type": "progress", "checkpoint": checkpoint})
+
+    send({"type": "ready", "pid": os.getpid()})
+
+    for line in sys.stdin:
+        job = json.loads(line)
+        send({"type": "started", "job_id": job["job_id"]})
+        send(asyncio.run(run_measured(job, send_progress)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+In-process publish/subscribe for backtest status changes.
+
+Subscribers get every status update for a backtest as it is written, so
+clients can be pushed results instead of polling for them. Updates written
+by other processes, such as queue workers, are picked up by StatusWatcher.
+"""
+
+import asyncio
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
+
+# Statuses after which a backtest will not change again
+TERMINAL_STATUSES = {"completed", "failed", "cancelled", "pruned"}
+
+
+class JobEvents:
+    """Fans out job updates to the subscribers of each backtest"""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+
+    def subscribe(self, backtest_id: str) -> asyncio.Queue:
+        """Register a queue that receives every update to the backtest"""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(backtest_id, set()).add(
+            (asyncio.get_running_loop(), queue)
+        )
+        return queue
+
+    def unsubscribe(self, backtest_id: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(backtest_id, set())
+        for entry in [s for s in subscribers if s[1] is queue]:
+            subscribers.discard(entry)
+        if not subscribers:
+            self._subscribers.pop(backtest_id, None)
+
+    def subscribed_ids(self) -> List[str]:
+        return list(self._subscribers)
+
+    def publish(self, backtest_id: str, job: Dict[str, Any]):
+        """Deliver a job update; safe to call from any thread"""
+        for loop, queue in list(self._subscribers.get(backtest_id, ())):
+            loop.call_soon_threadsafe(queue.put_nowait, dict(job))
+
+
+class StatusWatcher:
+    """Publishes status changes written by other processes
+
+    Polls the store for the backtests that have subscribers and publishes
+    every job that changed since the last poll.
+    """
+
+    def __init__(self, events: JobEvents,
+                 fetch_many: Callable[[List[str]], Dict[str, Dict[str, Any]]],
+                 interval: float):
+        self.events = events
+        self.fetch_many = fetch_many
+        self.interval = interval
+        self._seen: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            backtest_ids = self.events.subscribed_ids()
+            if not backtest_ids:
+                self._seen = {}
+                continue
+            try:
+                jobs = await asyncio.to_thread(self.fetch_many, backtest_ids)
+            except Exception as e:
+                print(f"Error polling backtest status: {e}")
+                continue
+            for backtest_id, job in jobs.items():
+                # A new subscriber may get the status it has already read once more
+                if self._seen.get(backtest_id) != job:
+                    self.events.publish(backtest_id, job)
+            self._seen = jobs
+
+
+async def wait_for_terminal(job: Dict[str, Any], queue: asyncio.Queue,
+                            timeout: float) -> Dict[str, Any]:
+    """Wait up to timeout seconds for the job to reach a terminal status"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while job.get("status") not in TERMINAL_STATUSES:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        try:
+            job = await asyncio.wait_for(queue.get(), remaining)
+        except asyncio.TimeoutError:
+            break
+    return job
@@ -0,0 +1,182 @@
+"""
+Bounded executor for backtest jobs.
+
+A fixed number of workers pull jobs from a fair-share queue that orders
+them by priority class, owner and priority. When the queue is full,
+submissions are rejected with an estimate of when to retry instead of
+starting yet another backtest in parallel.
+"""
+
+import asyncio
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from scheduler import FairShareQueue, ScheduledJob
+
+
+class QueueFullError(Exception):
+    """Raised when the executor queue has reached its depth limit"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Backtest queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobRunningError(Exception):
+    """Raised when a job is submitted while a job with the same id is running"""
+
+    def __init__(self, job_id: str):
+        super().__init__(f"Backtest {job_id} is already running")
+        self.job_id = job_id
+
+
+class BacktestExecutor:
+    """Runs submitted jobs on a bounded pool of async workers"""
+
+    def __init__(
+        self,
+        run_job: Callable[..., Awaitable[None]],
+        max_workers: int,
+        max_queue_depth: int,
+        observe_wait: Optional[Callable[[float], None]] = None,
+        reserved_workers: int = 0,
+        owner_weights: Optional[Dict[str, float]] = None,
+    ):
+        self.run_job = run_job
+        # Called with the seconds each job waited in the queue
+        self.observe_wait = observe_wait
+        self.max_workers = max(1, max_workers)
+        self.max_queue_depth = max(1, max_queue_depth)
+        # Workers bulk jobs leave free for interactive ones
+        self.reserved_workers = reserved_workers
+        self.owner_weights = owner_weights or {}
+        self.running = 0
+        self.completed = 0
+        # Total time workers have spent running jobs
+        self.busy_seconds = 0.0
+        self._started_at = time.monotonic()
+        # Exponential moving average of job duration, used for Retry-After
+        self.avg_duration = 5.0
+        self._queue: Optional[FairShareQueue] = None
+        self._workers: List[asyncio.Task] = []
+        self._active: Dict[str, asyncio.Task] = {}
+        self._active_since: Dict[str, float] = {}
+        self._stopping = False
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        """Start the worker tasks"""
+        self._queue = FairShareQueue(
+            self.max_workers, self.reserved_workers, self.owner_weights, lambda: self.avg_duration
+        )
+        self._stopping = False
+        self._started_at = time.monotonic()
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.max_workers)
+        ]
+
+    async def stop(self):
+        """Cancel the worker tasks, dropping anything still queued"""
+        self._stopping = True
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def retry_after(self) -> int:
+        """Estimate the seconds until a queue slot frees up"""
+        waves = (self.queue_depth + 1) / self.max_workers
+        return max(1, math.ceil(self.avg_duration * waves))
+
+    def stats(self) -> Dict[str, Any]:
+        uptime = time.monotonic() - self._started_at
+        busy = self.busy_seconds + sum(
+            time.monotonic() - started for started in self._active_since.values()
+        )
+        return {
+            "max_workers": self.max_workers,
+            "running": self.running,
+            "queued": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "completed": self.completed,
+            "busy_seconds": busy,
+            "utilization": busy / (uptime * self.max_workers) if uptime > 0 else 0.0,
+            "reserved_workers": self._queue.reserved_slots if self._queue is not None else 0,
+            **(self._queue.stats() if self._queue is not None else {}),
+        }
+
+    def check_capacity(self, count: int = 1):
+        """Raise QueueFullError if count more jobs would not fit in the queue"""
+        if self.queue_depth + count > self.max_queue_depth:
+            raise QueueFullError(self.retry_after())
+
+    def submit(self, job_id: str, *args: Any, priority: int = 0, owner: Optional[str] = None,
+               priority_class: str = "interactive", enforce_limit: bool = True):
+        """Queue run_job(job_id, *args)
+
+        Interactive jobs run before bulk ones and owners get fair shares of
+        the workers; within an owner, higher priority runs first, FIFO
+        within a priority. Callers that checked capacity before awaiting other work pass
+        enforce_limit=False, so an admitted job is never rejected halfway;
+        the depth limit may then be exceeded by jobs admitted concurrently.
+        Submitting a job that is still queued replaces the queued one;
+        submitting one that is running raises JobRunningError.
+        """
+        if job_id in self._active:
+            raise JobRunningError(job_id)
+        if enforce_limit:
+            self.check_capacity()
+        self._queue.put(ScheduledJob(
+            job_id, args, owner or "", priority_class, priority, time.monotonic()
+        ))
+
+    def is_running(self, job_id: str) -> bool:
+        return job_id in self._active
+
+    def cancel(self, job_id: str) -> bool:
+        """Drop a queued job or cancel a running one; False if the job is not here"""
+        task = self._active.get(job_id)
+        if task is not None:
+            task.cancel()
+            return True
+        return self._queue is not None and self._queue.remove(job_id)
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await self._queue.get()
+            except Exception as e:
+                # A scheduling bug must not take the worker down with it
+                print(f"Error taking the next backtest from the queue: {e}")
+                await asyncio.sleep(0.1)
+                continue
+            job_id = job.job_id
+
+            self.running += 1
+            started = time.monotonic()
+            if self.observe_wait is not None:
+                self.observe_wait(started - job.submitted)
+            task = asyncio.create_task(self.run_job(job_id, *job.args))
+            self._active[job_id] = task
+            self._active_since[job_id] = started
+            try:
+                await task
+            except asyncio.CancelledError:
+                # Only the job was cancelled; keep the worker alive
+                if self._stopping or not task.cancelled():
+                    raise
+            except Exception as e:
+                print(f"Unhandled error in backtest {job_id}: {e}")
+            finally:
+                self._active.pop(job_id, None)
+                self._active_since.pop(job_id, None)
+                self.running -= 1
+                self.completed += 1
+                duration = time.monotonic() - started
+                self.busy_seconds += duration
+                self.avg_duration = 0.8 * self.avg_duration + 0.2 * duration
+                self._queue.done(job, duration)
@@ -0,0 +1,160 @@
+"""
+Shared disk cache of indicator series.
+
+Indicators are computed once over a symbol's whole history and stored as
+.npy files under DATA_DIR/features, keyed by symbol, resolution, indicator,
+parameters and the version of the bar data. Jobs memory-map the file and
+slice their own date range, so a sweep of many variants over the same data
+computes each indicator once, and every process on the host shares the
+pages. The least recently used files are evicted beyond a size budget.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from market_data import Bars
+from vectorized import INDICATORS, Features
+
+
+class FeatureCache:
+    """Size-bounded, memory-mapped cache of indicator series shared through the filesystem"""
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._mapped: Dict[str, np.ndarray] = {}
+        # Guards the counters and maps; per-key locks stop threads computing the same series twice
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._bytes: Optional[int] = None
+
+    def _path(self, bars: Bars, indicator: str, params: Dict[str, Any]) -> Path:
+        key = json.dumps([indicator, params, bars.version], sort_keys=True)
+        digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+        return self.cache_dir / bars.resolution / bars.symbol / f"{indicator}-{digest}.npy"
+
+    def get(self, bars: Bars, indicator: str, params: Dict[str, Any],
+            compute: Callable[[], np.ndarray]) -> np.ndarray:
+        """Memory-mapped indicator series over bars, computing and storing it on a miss
+
+        bars must be the whole series as loaded, not a slice of it.
+        """
+        path = self._path(bars, indicator, params)
+        name = str(path)
+        with self._lock:
+            values = self._mapped.get(name)
+            if values is not None:
+                self.hits += 1
+                return values
+            key_lock = self._key_locks.setdefault(name, threading.Lock())
+
+        with key_lock:
+            try:
+                values = np.load(path, mmap_mode="r")
+                # Access time drives eviction; atime is often not updated on read
+                os.utime(path)
+                hit = True
+            except FileNotFoundError:
+                values = self._store(path, np.asarray(compute(), dtype=float))
+                hit = False
+
+        with self._lock:
+            self._key_locks.pop(name, None)
+            self._mapped[name] = values
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if not hit:
+            self._evict(values.nbytes)
+        return values
+
+    def _store(self, path: Path, values: np.ndarray) -> np.ndarray:
+        """Write a series atomically, so concurrent readers never see a partial file"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        staging = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        # Through a file object, as np.save would append .npy to the staging name
+        with open(staging, "wb") as f:
+            np.save(f, values)
+        os.replace(staging, path)
+        return np.load(path, mmap_mode="r")
+
+    def _evict(self, added: int):
+        """Delete the least recently used series while the cache is over budget
+
+        Mapped files stay readable after deletion, so eviction never breaks
+        a running job.
+        """
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self._measure()
+            else:
+                self._bytes += added
+            if self._bytes <= self.max_bytes:
+                return
+
+            # Other processes add files too, so measure before deleting
+            files = []
+            for f in self.cache_dir.rglob("*.npy"):
+                try:
+                    stat = f.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, f))
+            self._bytes = sum(size for _, size, _ in files)
+            for _, size, f in sorted(files, key=lambda entry: entry[0]):
+                if self._bytes <= self.max_bytes:
+                    break
+                try:
+                    f.unlink()
+                except FileNotFoundError:
+                    pass
+                self._bytes -= size
+                self._mapped.pop(str(f), None)
+                self.evictions += 1
+
+    def _measure(self) -> int:
+        """Bytes of all cached series, including those written by other processes"""
+        total = 0
+        for f in self.cache_dir.rglob("*.npy"):
+            try:
+                total += f.stat().st_size
+            except FileNotFoundError:
+                pass
+        return total
+
+    def features(self, bars: Bars, lo: int, hi: int) -> Features:
+        """Indicator lookup for the bars[lo:hi] slice of a whole series, backed by the cache"""
+        close = bars.close
+
+        def lookup(indicator: str, period: int) -> np.ndarray:
+            values = self.get(
+                bars, indicator, {"period": period},
+                lambda: INDICATORS[indicator](np.asarray(close, dtype=float), period)
+            )
+            return values[lo:hi]
+        return lookup
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        if self._bytes is None:
+            self._bytes = self._measure()
+        return {
+            "mapped": len(self._mapped),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
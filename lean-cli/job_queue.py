@@ -0,0 +1,600 @@
+"""
+Shared job queue for running backtests on several worker processes or hosts.
+
+The coordinator (the FastAPI service) enqueues jobs and any number of
+queue_worker.py processes claim them under a lease. Workers heartbeat to
+extend the leases of the jobs they run. A lease that expires, because its
+worker died or hung, is handed back to the queue until the job has been
+attempted max_attempts times. SQLite serves workers on one host; Postgres
+claims with SELECT ... FOR UPDATE SKIP LOCKED so workers on many hosts
+never block on each other.
+"""
+
+import asyncio
+import json
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from executor import QueueFullError
+
+# (job_id, payload, priority)
+QueuedJob = Tuple[str, Dict[str, Any], int]
+
+
+class JobQueue:
+    """Interface for the queue shared by the coordinator and its workers"""
+
+    def enqueue_many(self, jobs: List[QueuedJob]):
+        """Queue jobs; higher priority is claimed first, FIFO within a priority"""
+        raise NotImplementedError
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Lease the next queued job to a worker, or return None if there is none"""
+        raise NotImplementedError
+
+    def heartbeat(self, worker_id: str, job_ids: List[str], lease_seconds: float,
+                  info: Dict[str, Any]) -> Set[str]:
+        """Record that a worker is alive and extend its leases
+
+        Returns the job ids the worker still holds; jobs that were cancelled
+        or whose lease was lost to another worker are left out.
+        """
+        raise NotImplementedError
+
+    def complete(self, job_id: str, worker_id: str):
+        """Remove a job its worker has finished"""
+        raise NotImplementedError
+
+    def release(self, worker_id: str) -> List[str]:
+        """Hand a stopping worker's jobs back to the queue without counting the attempt"""
+        raise NotImplementedError
+
+    def cancel(self, job_id: str) -> bool:
+        """Drop a queued job or flag a leased one for cancellation; False if unknown"""
+        raise NotImplementedError
+
+    def reap(self, max_attempts: int) -> Tuple[List[str], List[str]]:
+        """Requeue jobs whose lease expired
+
+        Returns the requeued job ids and those dropped after max_attempts.
+        """
+        raise NotImplementedError
+
+    def stats(self, stale_after: float) -> Dict[str, Any]:
+        """Queued and leased job counts and the workers seen within stale_after seconds"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SQLiteJobQueue(JobQueue):
+    """Job queue in a SQLite file, shared by processes on one host"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        # Every thread's connection, so close() reaches them all
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._create_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Only close() uses a connection outside the thread that opened it
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._connections_lock:
+                self._connections.append(conn)
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        self._connect().executescript("""
+            CREATE TABLE IF NOT EXISTS job_queue (
+                job_id TEXT PRIMARY KEY,
+                priority INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                state TEXT NOT NULL,
+                worker_id TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                enqueued_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_job_queue_claim ON job_queue (state, priority);
+            CREATE INDEX IF NOT EXISTS idx_job_queue_worker ON job_queue (worker_id);
+            CREATE TABLE IF NOT EXISTS queue_workers (
+                worker_id TEXT PRIMARY KEY,
+                heartbeat_at REAL NOT NULL,
+                info TEXT NOT NULL
+            );
+        """)
+
+    def _write(self, work: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run work in a write transaction; BEGIN IMMEDIATE serialises writers across processes"""
+        conn = self._connect()
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return result
+
+    def enqueue_many(self, jobs: List[QueuedJob]):
+        now = time.time()
+
+        def work(conn):
+            # Re-submitting a job id replaces it, taking the lease from any worker running it
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO job_queue (job_id, priority, payload, state, enqueued_at)
+                VALUES (?, ?, ?, 'queued', ?)
+                """,
+                [(job_id, priority, json.dumps(payload), now) for job_id, payload, priority in jobs],
+            )
+        self._write(work)
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[Tuple[str, Dict[str, Any]]]:
+        def work(conn):
+            row = conn.execute(
+                """
+                SELECT job_id, payload FROM job_queue WHERE state = 'queued'
+                ORDER BY priority DESC, rowid LIMIT 1
+                """
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                """
+                UPDATE job_queue SET state = 'leased', worker_id = ?, lease_expires = ?,
+                    attempts = attempts + 1
+                WHERE job_id = ?
+                """,
+                (worker_id, time.time() + lease_seconds, row[0]),
+            )
+            return row[0], json.loads(row[1])
+        return self._write(work)
+
+    def heartbeat(self, worker_id: str, job_ids: List[str], lease_seconds: float,
+                  info: Dict[str, Any]) -> Set[str]:
+        now = time.time()
+
+        def work(conn):
+            conn.execute(
+                """
+                INSERT INTO queue_workers (worker_id, heartbeat_at, info) VALUES (?, ?, ?)
+                ON CONFLICT (worker_id) DO UPDATE SET
+                    heartbeat_at = excluded.heartbeat_at, info = excluded.info
+                """,
+                (worker_id, now, json.dumps(info)),
+            )
+            conn.execute(
+                """
+                UPDATE job_queue SET lease_expires = ?
+                WHERE worker_id = ? AND state = 'leased' AND cancel_requested = 0
+                """,
+                (now + lease_seconds, worker_id),
+            )
+            rows = conn.execute(
+                """
+                SELECT job_id FROM job_queue
+                WHERE worker_id = ? AND state = 'leased' AND cancel_requested = 0
+                """,
+                (worker_id,),
+            )
+            return {row[0] for row in rows} & set(job_ids)
+        return self._write(work)
+
+    def complete(self, job_id: str, worker_id: str):
+        self._write(lambda conn: conn.execute(
+            "DELETE FROM job_queue WHERE job_id = ? AND worker_id = ?", (job_id, worker_id)
+        ))
+
+    def release(self, worker_id: str) -> List[str]:
+        def work(conn):
+            rows = conn.execute(
+                "SELECT job_id FROM job_queue WHERE worker_id = ? AND state = 'leased'",
+                (worker_id,),
+            ).fetchall()
+            conn.execute(
+                """
+                UPDATE job_queue SET state = 'queued', worker_id = NULL, lease_expires = NULL,
+                    attempts = attempts - 1
+                WHERE worker_id = ? AND state = 'leased' AND cancel_requested = 0
+                """,
+                (worker_id,),
+            )
+            conn.execute(
+                "DELETE FROM job_queue WHERE worker_id = ? AND cancel_requested = 1", (worker_id,)
+            )
+            conn.execute("DELETE FROM queue_workers WHERE worker_id = ?", (worker_id,))
+            return [row[0] for row in rows]
+        return self._write(work)
+
+    def cancel(self, job_id: str) -> bool:
+        def work(conn):
+            row = conn.execute(
+                "SELECT state FROM job_queue WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            if row[0] == "queued":
+                conn.execute("DELETE FROM job_queue WHERE job_id = ?", (job_id,))
+            else:
+                conn.execute(
+                    "UPDATE job_queue SET cancel_requested = 1 WHERE job_id = ?", (job_id,)
+                )
+            return True
+        return self._write(work)
+
+    def reap(self, max_attempts: int) -> Tuple[List[str], List[str]]:
+        now = time.time()
+
+        def work(conn):
+            rows = conn.execute(
+                """
+                SELECT job_id, attempts, cancel_requested FROM job_queue
+                WHERE state = 'leased' AND lease_expires < ?
+                """,
+                (now,),
+            ).fetchall()
+            requeued = [job_id for job_id, attempts, cancelled in rows
+                        if not cancelled and attempts < max_attempts]
+            dropped = [job_id for job_id, attempts, cancelled in rows
+                       if cancelled or attempts >= max_attempts]
+            conn.executemany(
+                """
+                UPDATE job_queue SET state = 'queued', worker_id = NULL, lease_expires = NULL
+                WHERE job_id = ?
+                """,
+                [(job_id,) for job_id in requeued],
+            )
+            conn.executemany(
+                "DELETE FROM job_queue WHERE job_id = ?", [(job_id,) for job_id in dropped]
+            )
+            # Cancelled jobs are already marked as such; only report exhausted ones
+            exhausted = [job_id for job_id, attempts, cancelled in rows
+                         if not cancelled and attempts >= max_attempts]
+            return requeued, exhausted
+        return self._write(work)
+
+    def stats(self, stale_after: float) -> Dict[str, Any]:
+        conn = self._connect()
+        counts = dict(conn.execute(
+            "SELECT state, COUNT(*) FROM job_queue GROUP BY state"
+        ).fetchall())
+        workers = [
+            {"worker_id": worker_id, "heartbeat_at": heartbeat_at, **json.loads(info)}
+            for worker_id, heartbeat_at, info in conn.execute(
+                "SELECT worker_id, heartbeat_at, info FROM queue_workers WHERE heartbeat_at > ?",
+                (time.time() - stale_after,),
+            )
+        ]
+        return {"queued": counts.get("queued", 0), "leased": counts.get("leased", 0), "workers": workers}
+
+    def close(self):
+        """Close the connection of every thread that used this queue"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            # Threads that use it again open a new connection
+            self._local = threading.local()
+        for conn in connections:
+            conn.close()
+
+
+class PostgresJobQueue(JobQueue):
+    """Job queue in Postgres for workers on several hosts
+
+    Lease times come from the database clock, so hosts need not agree on
+    the time.
+    """
+
+    def __init__(self, dsn: str):
+        try:
+            import psycopg
+        except ImportError:
+            raise RuntimeError("The postgres job queue requires the psycopg package")
+        self._psycopg = psycopg
+        self.dsn = dsn
+        self._local = threading.local()
+        # Every thread's connection, so close() reaches them all
+        self._connections: List[Any] = []
+        self._connections_lock = threading.Lock()
+        self._create_schema()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or conn.closed:
+            conn = self._psycopg.connect(self.dsn, autocommit=True)
+            with self._connections_lock:
+                self._connections.append(conn)
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        with self._connect().transaction() as tx:
+            tx.connection.execute("""
+                CREATE TABLE IF NOT EXISTS job_queue (
+                    job_id TEXT PRIMARY KEY,
+                    seq BIGSERIAL,
+                    priority INTEGER NOT NULL,
+                    payload JSONB NOT NULL,
+                    state TEXT NOT NULL,
+                    worker_id TEXT,
+                    lease_expires TIMESTAMPTZ,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+                    enqueued_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+            """)
+            tx.connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_job_queue_claim ON job_queue (state, priority DESC, seq)"
+            )
+            tx.connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_job_queue_worker ON job_queue (worker_id)"
+            )
+            tx.connection.execute("""
+                CREATE TABLE IF NOT EXISTS queue_workers (
+                    worker_id TEXT PRIMARY KEY,
+                    heartbeat_at TIMESTAMPTZ NOT NULL,
+                    info JSONB NOT NULL
+                )
+            """)
+
+    def enqueue_many(self, jobs: List[QueuedJob]):
+        Jsonb = self._psycopg.types.json.Jsonb
+        with self._connect().transaction() as tx:
+            with tx.connection.cursor() as cursor:
+                cursor.executemany(
+                    """
+                    INSERT INTO job_queue (job_id, priority, payload, state)
+                    VALUES (%s, %s, %s, 'queued')
+                    ON CONFLICT (job_id) DO UPDATE SET
+                        seq = nextval(pg_get_serial_sequence('job_queue', 'seq')),
+                        priority = excluded.priority, payload = excluded.payload,
+                        state = 'queued', worker_id = NULL, lease_expires = NULL,
+                        attempts = 0, cancel_requested = FALSE, enqueued_at = now()
+                    """,
+                    [(job_id, priority, Jsonb(payload)) for job_id, payload, priority in jobs],
+                )
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[Tuple[str, Dict[str, Any]]]:
+        row = self._connect().execute(
+            """
+            UPDATE job_queue SET state = 'leased', worker_id = %s,
+                lease_expires = now() + make_interval(secs => %s), attempts = attempts + 1
+            WHERE job_id = (
+                SELECT job_id FROM job_queue WHERE state = 'queued'
+                ORDER BY priority DESC, seq
+                FOR UPDATE SKIP LOCKED LIMIT 1
+            )
+            RETURNING job_id, payload
+            """,
+            (worker_id, lease_seconds),
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def heartbeat(self, worker_id: str, job_ids: List[str], lease_seconds: float,
+                  info: Dict[str, Any]) -> Set[str]:
+        with self._connect().transaction() as tx:
+            tx.connection.execute(
+                """
+                INSERT INTO queue_workers (worker_id, heartbeat_at, info) VALUES (%s, now(), %s)
+                ON CONFLICT (worker_id) DO UPDATE SET
+                    heartbeat_at = excluded.heartbeat_at, info = excluded.info
+                """,
+                (worker_id, self._psycopg.types.json.Jsonb(info)),
+            )
+            rows = tx.connection.execute(
+                """
+                UPDATE job_queue SET lease_expires = now() + make_interval(secs => %s)
+                WHERE worker_id = %s AND state = 'leased' AND NOT cancel_requested
+                RETURNING job_id
+                """,
+                (lease_seconds, worker_id),
+            ).fetchall()
+        return {row[0] for row in rows} & set(job_ids)
+
+    def complete(self, job_id: str, worker_id: str):
+        self._connect().execute(
+            "DELETE FROM job_queue WHERE job_id = %s AND worker_id = %s", (job_id, worker_id)
+        )
+
+    def release(self, worker_id: str) -> List[str]:
+        with self._connect().transaction() as tx:
+            rows = tx.connection.execute(
+                """
+                UPDATE job_queue SET state = 'queued', worker_id = NULL, lease_expires = NULL,
+                    attempts = attempts - 1
+                WHERE worker_id = %s AND state = 'leased' AND NOT cancel_requested
+                RETURNING job_id
+                """,
+                (worker_id,),
+            ).fetchall()
+            tx.connection.execute(
+                "DELETE FROM job_queue WHERE worker_id = %s AND cancel_requested", (worker_id,)
+            )
+            tx.connection.execute("DELETE FROM queue_workers WHERE worker_id = %s", (worker_id,))
+        return [row[0] for row in rows]
+
+    def cancel(self, job_id: str) -> bool:
+        with self._connect().transaction() as tx:
+            row = tx.connection.execute(
+                "SELECT state FROM job_queue WHERE job_id = %s FOR UPDATE", (job_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            if row[0] == "queued":
+                tx.connection.execute("DELETE FROM job_queue WHERE job_id = %s", (job_id,))
+            else:
+                tx.connection.execute(
+                    "UPDATE job_queue SET cancel_requested = TRUE WHERE job_id = %s", (job_id,)
+                )
+        return True
+
+    def reap(self, max_attempts: int) -> Tuple[List[str], List[str]]:
+        with self._connect().transaction() as tx:
+            requeued = tx.connection.execute(
+                """
+                UPDATE job_queue SET state = 'queued', worker_id = NULL, lease_expires = NULL
+                WHERE state = 'leased' AND lease_expires < now()
+                    AND NOT cancel_requested AND attempts < %s
+                RETURNING job_id
+                """,
+                (max_attempts,),
+            ).fetchall()
+            dropped = tx.connection.execute(
+                """
+                DELETE FROM job_queue WHERE state = 'leased' AND lease_expires < now()
+                RETURNING job_id, cancel_requested
+                """
+            ).fetchall()
+        # Cancelled jobs are already marked as such; only report exhausted ones
+        return [row[0] for row in requeued], [job_id for job_id, cancelled in dropped if not cancelled]
+
+    def stats(self, stale_after: float) -> Dict[str, Any]:
+        conn = self._connect()
+        counts = dict(conn.execute(
+            "SELECT state, COUNT(*) FROM job_queue GROUP BY state"
+        ).fetchall())
+        workers = [
+            {"worker_id": worker_id, "heartbeat_at": heartbeat_at.timestamp(), **info}
+            for worker_id, heartbeat_at, info in conn.execute(
+                """
+                SELECT worker_id, heartbeat_at, info FROM queue_workers
+                WHERE heartbeat_at > now() - make_interval(secs => %s)
+                """,
+                (stale_after,),
+            )
+        ]
+        return {"queued": counts.get("queued", 0), "leased": counts.get("leased", 0), "workers": workers}
+
+    def close(self):
+        """Close the connection of every thread that used this queue"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            # Threads that use it again open a new connection
+            self._local = threading.local()
+        for conn in connections:
+            conn.close()
+
+
+def create_job_queue(backend: str, path: Path, dsn: Optional[str] = None) -> JobQueue:
+    """Create the job queue selected by the JOB_QUEUE setting"""
+    if backend == "sqlite":
+        return SQLiteJobQueue(path)
+    if backend == "postgres":
+        if not dsn:
+            raise ValueError("The postgres job queue requires DATABASE_URL")
+        return PostgresJobQueue(dsn)
+    raise ValueError(f"Unknown job queue backend: {backend}")
+
+
+def default_worker_id() -> str:
+    """Identify a worker process by host and pid"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class QueueDispatcher:
+    """Coordinator side of the shared queue
+
+    Offers the admission interface of BacktestExecutor (check_capacity,
+    retry_after, stats) over the shared queue. A background task refreshes
+    queue statistics and requeues jobs whose lease expired, reporting them
+    through on_requeued and on_exhausted.
+    """
+
+    def __init__(self, queue: JobQueue, max_queue_depth: int, poll_interval: float,
+                 lease_seconds: float, max_attempts: int,
+                 on_requeued: Callable[[List[str]], None],
+                 on_exhausted: Callable[[List[str]], None]):
+        self.queue = queue
+        self.max_queue_depth = max(1, max_queue_depth)
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.on_requeued = on_requeued
+        self.on_exhausted = on_exhausted
+        self.requeued = 0
+        self.exhausted = 0
+        self._stats: Dict[str, Any] = {"queued": 0, "leased": 0, "workers": []}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._stats["queued"]
+
+    async def start(self):
+        await self._refresh()
+        self._task = asyncio.create_task(self._monitor())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh(self):
+        requeued, exhausted = await asyncio.to_thread(self.queue.reap, self.max_attempts)
+        if requeued:
+            self.requeued += len(requeued)
+            await asyncio.to_thread(self.on_requeued, requeued)
+        if exhausted:
+            self.exhausted += len(exhausted)
+            await asyncio.to_thread(self.on_exhausted, exhausted)
+        # Workers heartbeat at a third of the lease; one missed beat is tolerated
+        self._stats = await asyncio.to_thread(self.queue.stats, self.lease_seconds)
+
+    async def _monitor(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self._refresh()
+            except Exception as e:
+                print(f"Error polling the job queue: {e}")
+
+    def retry_after(self) -> int:
+        """Estimate the seconds until a queue slot frees up, from worker reports"""
+        workers = self._stats["workers"]
+        slots = sum(worker.get("slots", 1) for worker in workers) or 1
+        durations = [worker["avg_duration"] for worker in workers if worker.get("avg_duration")]
+        avg_duration = sum(durations) / len(durations) if durations else 5.0
+        return max(1, math.ceil(avg_duration * (self.queue_depth + 1) / slots))
+
+    def check_capacity(self, count: int = 1):
+        if self.queue_depth + count > self.max_queue_depth:
+            raise QueueFullError(self.retry_after())
+
+    async def submit_many(self, jobs: List[QueuedJob]):
+        await asyncio.to_thread(self.queue.enqueue_many, jobs)
+        # Count them until the next refresh so bursts respect the depth limit
+        self._stats = {**self._stats, "queued": self._stats["queued"] + len(jobs)}
+
+    async def cancel(self, job_id: str) -> bool:
+        return await asyncio.to_thread(self.queue.cancel, job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        workers = self._stats["workers"]
+        return {
+            "mode": "queue",
+            "queued": self._stats["queued"],
+            "running": self._stats["leased"],
+            "max_queue_depth": self.max_queue_depth,
+            "workers": len(workers),
+            "max_workers": sum(worker.get("slots", 1) for worker in workers),
+            "requeued": self.requeued,
+            "exhausted": self.exhausted,
+        }
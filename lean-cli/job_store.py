@@ -0,0 +1,644 @@
+"""
+Job store for backtest status.
+
+Each backtest is stored as its own row, so reading or updating one job
+costs the same no matter how many backtests have been run before. SQLite
+serves a single host; Postgres lets coordinator and workers on several
+hosts share one store.
+"""
+
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+# Left out of compact projections: result payloads and the stored request with its strategy code
+BULKY_FIELDS = ("results", "request")
+
+
+def compact_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in job.items() if key not in BULKY_FIELDS}
+
+
+class JobStore:
+    """Interface for backtest job persistence"""
+
+    def get(self, backtest_id: str) -> Optional[Dict[str, Any]]:
+        """Return the stored fields for a job, or None if unknown"""
+        raise NotImplementedError
+
+    def upsert(self, backtest_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge updates into a job, creating it if needed, and return the merged job"""
+        raise NotImplementedError
+
+    def upsert_unless_status(self, backtest_id: str, updates: Dict[str, Any],
+                             statuses: List[str]) -> Optional[Dict[str, Any]]:
+        """Like upsert, unless the stored status is one of statuses; then return None
+
+        The check and the write are atomic, so a final status cannot replace
+        one written concurrently by another process.
+        """
+        raise NotImplementedError
+
+    def get_many(self, backtest_ids: List[str], compact: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Return the stored fields of every known job among backtest_ids
+
+        compact leaves out BULKY_FIELDS.
+        """
+        jobs = {}
+        for backtest_id in backtest_ids:
+            job = self.get(backtest_id)
+            if job is not None:
+                jobs[backtest_id] = compact_job(job) if compact else job
+        return jobs
+
+    def upsert_many(self, jobs: Dict[str, Dict[str, Any]]):
+        """Merge updates into several jobs at once"""
+        for backtest_id, updates in jobs.items():
+            self.upsert(backtest_id, updates)
+
+    def find_by_status(self, statuses: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return every job whose status is one of statuses"""
+        raise NotImplementedError
+
+    def list_jobs(self, statuses: Optional[List[str]] = None, since: Optional[str] = None,
+                  limit: int = 100, after: Optional[Tuple[str, str]] = None,
+                  compact: bool = True) -> List[Tuple[str, Dict[str, Any]]]:
+        """Page through jobs newest first, ordered by (created_at, backtest_id)
+
+        Only jobs with one of statuses and created at or after since are
+        listed. after is the (created_at, backtest_id) of the last job of
+        the previous page.
+        """
+        raise NotImplementedError
+
+    def delete_many(self, backtest_ids: List[str]) -> int:
+        """Delete jobs and return how many existed"""
+        raise NotImplementedError
+
+    def save_batch(self, batch_id: str, batch: Dict[str, Any]):
+        """Store the description of a batch of backtests"""
+        raise NotImplementedError
+
+    def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Return a stored batch, or None if unknown"""
+        raise NotImplementedError
+
+    def get_cached_results(self, cache_keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return the shared result cache entries stored under any of cache_keys"""
+        raise NotImplementedError
+
+    def put_cached_results(self, cache_key: str, results: Dict[str, Any], max_entries: int):
+        """Store a shared result cache entry, dropping the oldest beyond max_entries"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the store"""
+
+
+class MemoryJobStore(JobStore):
+    """In-process job store, used for tests and load tests"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._batches: Dict[str, Dict[str, Any]] = {}
+        self._cached_results: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, backtest_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(backtest_id)
+            return dict(job) if job is not None else None
+
+    def upsert(self, backtest_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            job = self._jobs.setdefault(backtest_id, {})
+            job.update(updates)
+            return dict(job)
+
+    def upsert_unless_status(self, backtest_id: str, updates: Dict[str, Any],
+                             statuses: List[str]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.setdefault(backtest_id, {})
+            if job.get("status") in statuses:
+                return None
+            job.update(updates)
+            return dict(job)
+
+    def find_by_status(self, statuses: List[str]) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                backtest_id: dict(job) for backtest_id, job in self._jobs.items()
+                if job.get("status") in statuses
+            }
+
+    def list_jobs(self, statuses: Optional[List[str]] = None, since: Optional[str] = None,
+                  limit: int = 100, after: Optional[Tuple[str, str]] = None,
+                  compact: bool = True) -> List[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            keyed = [
+                ((job.get("created_at") or "", backtest_id), job)
+                for backtest_id, job in self._jobs.items()
+                if (statuses is None or job.get("status") in statuses)
+                and (since is None or (job.get("created_at") or "") >= since)
+            ]
+            keyed.sort(key=lambda entry: entry[0], reverse=True)
+            if after is not None:
+                keyed = [entry for entry in keyed if entry[0] < tuple(after)]
+            return [
+                (key[1], compact_job(job) if compact else dict(job))
+                for key, job in keyed[:limit]
+            ]
+
+    def delete_many(self, backtest_ids: List[str]) -> int:
+        with self._lock:
+            return sum(self._jobs.pop(backtest_id, None) is not None for backtest_id in backtest_ids)
+
+    def save_batch(self, batch_id: str, batch: Dict[str, Any]):
+        with self._lock:
+            self._batches[batch_id] = dict(batch)
+
+    def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            return dict(batch) if batch is not None else None
+
+    def get_cached_results(self, cache_keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {key: self._cached_results[key] for key in cache_keys if key in self._cached_results}
+
+    def put_cached_results(self, cache_key: str, results: Dict[str, Any], max_entries: int):
+        with self._lock:
+            self._cached_results.pop(cache_key, None)
+            self._cached_results[cache_key] = results
+            while len(self._cached_results) > max_entries:
+                self._cached_results.popitem(last=False)
+
+
+class SQLiteJobStore(JobStore):
+    """SQLite job store running in WAL mode, one row per backtest"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        # Every thread's connection, so close() reaches them all
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        # Serialises read-modify-write upserts from threads of this process;
+        # BEGIN IMMEDIATE covers writers in other processes.
+        self._write_lock = threading.Lock()
+        self._create_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Only close() uses a connection outside the thread that opened it
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._connections_lock:
+                self._connections.append(conn)
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        conn = self._connect()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                backtest_id TEXT PRIMARY KEY,
+                status TEXT,
+                created_at TEXT,
+                data TEXT NOT NULL
+            );
+            -- Keyset pagination of listings, with or without a status filter; their
+            -- prefixes serve status and created_at lookups, so no index of their own
+            CREATE INDEX IF NOT EXISTS idx_jobs_created_at_id ON jobs (created_at, backtest_id);
+            CREATE INDEX IF NOT EXISTS idx_jobs_status_created_at_id ON jobs (status, created_at, backtest_id);
+            DROP INDEX IF EXISTS idx_jobs_status;
+            DROP INDEX IF EXISTS idx_jobs_created_at;
+            CREATE TABLE IF NOT EXISTS batches (
+                batch_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL
+            );
+            -- Results by cache key, shared by the service and queue workers; rowid orders them by age
+            CREATE TABLE IF NOT EXISTS result_cache (
+                cache_key TEXT PRIMARY KEY,
+                results TEXT NOT NULL
+            );
+        """)
+
+    def get(self, backtest_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT data FROM jobs WHERE backtest_id = ?", (backtest_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, backtest_ids: List[str], compact: bool = False) -> Dict[str, Dict[str, Any]]:
+        conn = self._connect()
+        jobs = {}
+        # Stay below SQLite's bound-parameter limit
+        for start in range(0, len(backtest_ids), 500):
+            chunk = backtest_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT backtest_id, {self._data_column(compact)} FROM jobs "
+                f"WHERE backtest_id IN ({placeholders})",
+                chunk,
+            )
+            for backtest_id, data in rows:
+                jobs[backtest_id] = json.loads(data)
+        return jobs
+
+    def upsert(self, backtest_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
+        return self._upsert_all({backtest_id: updates})[backtest_id]
+
+    def upsert_many(self, jobs: Dict[str, Dict[str, Any]]):
+        self._upsert_all(jobs)
+
+    def upsert_unless_status(self, backtest_id: str, updates: Dict[str, Any],
+                             statuses: List[str]) -> Optional[Dict[str, Any]]:
+        return self._upsert_all({backtest_id: updates}, tuple(statuses)).get(backtest_id)
+
+    def _upsert_all(self, updates_by_id: Dict[str, Dict[str, Any]],
+                    skip_statuses: Tuple[str, ...] = ()) -> Dict[str, Dict[str, Any]]:
+        """Merge updates into each job inside a single write transaction
+
+        Jobs whose stored status is in skip_statuses are left alone and out of the result.
+        """
+        conn = self._connect()
+        merged = {}
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for backtest_id, updates in updates_by_id.items():
+                    row = conn.execute(
+                        "SELECT data FROM jobs WHERE backtest_id = ?", (backtest_id,)
+                    ).fetchone()
+                    job = json.loads(row[0]) if row else {}
+                    if job.get("status") in skip_statuses:
+                        continue
+                    job.update(updates)
+                    conn.execute(
+                        """
+                        INSERT INTO jobs (backtest_id, status, created_at, data)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT (backtest_id) DO UPDATE SET
+                            status = excluded.status,
+                            created_at = excluded.created_at,
+                            data = excluded.data
+                        """,
+                        (backtest_id, job.get("status"), job.get("created_at"), json.dumps(job)),
+                    )
+                    merged[backtest_id] = job
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return merged
+
+    def find_by_status(self, statuses: List[str]) -> Dict[str, Dict[str, Any]]:
+        placeholders = ",".join("?" * len(statuses))
+        rows = self._connect().execute(
+            f"SELECT backtest_id, data FROM jobs WHERE status IN ({placeholders})", list(statuses)
+        )
+        return {backtest_id: json.loads(data) for backtest_id, data in rows}
+
+    @staticmethod
+    def _data_column(compact: bool) -> str:
+        """Job data, with BULKY_FIELDS removed in SQLite rather than after decoding"""
+        if not compact:
+            return "data"
+        paths = ", ".join(f"'$.{field}'" for field in BULKY_FIELDS)
+        return f"json_remove(data, {paths})"
+
+    def list_jobs(self, statuses: Optional[List[str]] = None, since: Optional[str] = None,
+                  limit: int = 100, after: Optional[Tuple[str, str]] = None,
+                  compact: bool = True) -> List[Tuple[str, Dict[str, Any]]]:
+        conditions, params = [], []
+        if statuses is not None:
+            conditions.append(f"status IN ({','.join('?' * len(statuses))})")
+            params.extend(statuses)
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        if after is not None:
+            conditions.append("(created_at, backtest_id) < (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._connect().execute(
+            f"SELECT backtest_id, {self._data_column(compact)} FROM jobs {where} "
+            "ORDER BY created_at DESC, backtest_id DESC LIMIT ?",
+            [*params, limit],
+        )
+        return [(backtest_id, json.loads(data)) for backtest_id, data in rows]
+
+    def delete_many(self, backtest_ids: List[str]) -> int:
+        conn = self._connect()
+        deleted = 0
+        with self._write_lock:
+            for start in range(0, len(backtest_ids), 500):
+                chunk = backtest_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                deleted += conn.execute(
+                    f"DELETE FROM jobs WHERE backtest_id IN ({placeholders})", chunk
+                ).rowcount
+        return deleted
+
+    def save_batch(self, batch_id: str, batch: Dict[str, Any]):
+        self._connect().execute(
+            """
+            INSERT INTO batches (batch_id, data) VALUES (?, ?)
+            ON CONFLICT (batch_id) DO UPDATE SET data = excluded.data
+            """,
+            (batch_id, json.dumps(batch)),
+        )
+
+    def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT data FROM batches WHERE batch_id = ?", (batch_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_cached_results(self, cache_keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        conn = self._connect()
+        cached = {}
+        for start in range(0, len(cache_keys), 500):
+            chunk = cache_keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT cache_key, results FROM result_cache WHERE cache_key IN ({placeholders})", chunk
+            )
+            for cache_key, results in rows:
+                cached[cache_key] = json.loads(results)
+        return cached
+
+    def put_cached_results(self, cache_key: str, results: Dict[str, Any], max_entries: int):
+        conn = self._connect()
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Replacing moves the entry to the newest rowid
+                conn.execute("DELETE FROM result_cache WHERE cache_key = ?", (cache_key,))
+                conn.execute(
+                    "INSERT INTO result_cache (cache_key, results) VALUES (?, ?)",
+                    (cache_key, json.dumps(results)),
+                )
+                conn.execute(
+                    "DELETE FROM result_cache WHERE rowid <= "
+                    "(SELECT rowid FROM result_cache ORDER BY rowid DESC LIMIT 1 OFFSET ?)",
+                    (max_entries,),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        """Close the connection of every thread that used this store"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            # Threads that use it again open a new connection
+            self._local = threading.local()
+        for conn in connections:
+            conn.close()
+
+
+class PostgresJobStore(JobStore):
+    """Postgres job store for services spread over several hosts"""
+
+    def __init__(self, dsn: str):
+        try:
+            import psycopg
+        except ImportError:
+            raise RuntimeError("The postgres job store requires the psycopg package")
+        self._psycopg = psycopg
+        self.dsn = dsn
+        self._local = threading.local()
+        # Every thread's connection, so close() reaches them all
+        self._connections: List[Any] = []
+        self._connections_lock = threading.Lock()
+        self._create_schema()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or conn.closed:
+            conn = self._psycopg.connect(self.dsn, autocommit=True)
+            with self._connections_lock:
+                self._connections.append(conn)
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        with self._connect().transaction() as tx:
+            tx.connection.execute("""
+                CREATE TABLE IF NOT EXISTS backtest_jobs (
+                    backtest_id TEXT PRIMARY KEY,
+                    status TEXT,
+                    created_at TEXT,
+                    data JSONB NOT NULL
+                )
+            """)
+            # The listing indexes' prefixes serve status and created_at lookups
+            tx.connection.execute("DROP INDEX IF EXISTS idx_backtest_jobs_status")
+            tx.connection.execute("DROP INDEX IF EXISTS idx_backtest_jobs_created_at")
+            tx.connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_backtest_jobs_created_at_id "
+                "ON backtest_jobs (created_at, backtest_id)"
+            )
+            tx.connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_backtest_jobs_status_created_at_id "
+                "ON backtest_jobs (status, created_at, backtest_id)"
+            )
+            tx.connection.execute("""
+                CREATE TABLE IF NOT EXISTS backtest_batches (
+                    batch_id TEXT PRIMARY KEY,
+                    data JSONB NOT NULL
+                )
+            """)
+            # Results by cache key, shared by the service and queue workers
+            tx.connection.execute("""
+                CREATE TABLE IF NOT EXISTS backtest_result_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    seq BIGSERIAL,
+                    results JSONB NOT NULL
+                )
+            """)
+            tx.connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_backtest_result_cache_seq ON backtest_result_cache (seq)"
+            )
+
+    def get(self, backtest_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT data FROM backtest_jobs WHERE backtest_id = %s", (backtest_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, backtest_ids: List[str], compact: bool = False) -> Dict[str, Dict[str, Any]]:
+        rows = self._connect().execute(
+            f"SELECT backtest_id, {self._data_column(compact)} FROM backtest_jobs "
+            "WHERE backtest_id = ANY(%s)",
+            (list(backtest_ids),),
+        )
+        return {backtest_id: data for backtest_id, data in rows}
+
+    def upsert(self, backtest_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
+        return self._upsert_all({backtest_id: updates})[backtest_id]
+
+    def upsert_many(self, jobs: Dict[str, Dict[str, Any]]):
+        self._upsert_all(jobs)
+
+    def upsert_unless_status(self, backtest_id: str, updates: Dict[str, Any],
+                             statuses: List[str]) -> Optional[Dict[str, Any]]:
+        return self._upsert_all({backtest_id: updates}, tuple(statuses)).get(backtest_id)
+
+    def _upsert_all(self, updates_by_id: Dict[str, Dict[str, Any]],
+                    skip_statuses: Tuple[str, ...] = ()) -> Dict[str, Dict[str, Any]]:
+        """Merge updates into each job in one transaction; the merge happens in the database
+
+        Jobs whose stored status is in skip_statuses are left alone and out of the result.
+        """
+        Jsonb = self._psycopg.types.json.Jsonb
+        merged = {}
+        with self._connect().transaction() as tx:
+            for backtest_id, updates in updates_by_id.items():
+                row = tx.connection.execute(
+                    """
+                    INSERT INTO backtest_jobs (backtest_id, status, created_at, data)
+                    VALUES (%(id)s, %(data)s->>'status', %(data)s->>'created_at', %(data)s)
+                    ON CONFLICT (backtest_id) DO UPDATE SET
+                        data = backtest_jobs.data || excluded.data,
+                        status = (backtest_jobs.data || excluded.data)->>'status',
+                        created_at = (backtest_jobs.data || excluded.data)->>'created_at'
+                    WHERE backtest_jobs.status IS NULL OR NOT backtest_jobs.status = ANY(%(skip)s)
+                    RETURNING data
+                    """,
+                    {"id": backtest_id, "data": Jsonb(updates), "skip": list(skip_statuses)},
+                ).fetchone()
+                if row is not None:
+                    merged[backtest_id] = row[0]
+        return merged
+
+    def find_by_status(self, statuses: List[str]) -> Dict[str, Dict[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT backtest_id, data FROM backtest_jobs WHERE status = ANY(%s)", (list(statuses),)
+        )
+        return {backtest_id: data for backtest_id, data in rows}
+
+    @staticmethod
+    def _data_column(compact: bool) -> str:
+        """Job data, with BULKY_FIELDS removed in Postgres rather than after decoding"""
+        if not compact:
+            return "data"
+        return "data" + "".join(f" - '{field}'" for field in BULKY_FIELDS)
+
+    def list_jobs(self, statuses: Optional[List[str]] = None, since: Optional[str] = None,
+                  limit: int = 100, after: Optional[Tuple[str, str]] = None,
+                  compact: bool = True) -> List[Tuple[str, Dict[str, Any]]]:
+        conditions, params = [], []
+        if statuses is not None:
+            conditions.append("status = ANY(%s)")
+            params.append(list(statuses))
+        if since is not None:
+            conditions.append("created_at >= %s")
+            params.append(since)
+        if after is not None:
+            conditions.append("(created_at, backtest_id) < (%s, %s)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._connect().execute(
+            f"SELECT backtest_id, {self._data_column(compact)} FROM backtest_jobs {where} "
+            "ORDER BY created_at DESC, backtest_id DESC LIMIT %s",
+            [*params, limit],
+        )
+        return [(backtest_id, data) for backtest_id, data in rows]
+
+    def delete_many(self, backtest_ids: List[str]) -> int:
+        return self._connect().execute(
+            "DELETE FROM backtest_jobs WHERE backtest_id = ANY(%s)", (list(backtest_ids),)
+        ).rowcount
+
+    def save_batch(self, batch_id: str, batch: Dict[str, Any]):
+        self._connect().execute(
+            """
+            INSERT INTO backtest_batches (batch_id, data) VALUES (%s, %s)
+            ON CONFLICT (batch_id) DO UPDATE SET data = excluded.data
+            """,
+            (batch_id, self._psycopg.types.json.Jsonb(batch)),
+        )
+
+    def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT data FROM backtest_batches WHERE batch_id = %s", (batch_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_cached_results(self, cache_keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT cache_key, results FROM backtest_result_cache WHERE cache_key = ANY(%s)",
+            (list(cache_keys),),
+        )
+        return {cache_key: results for cache_key, results in rows}
+
+    def put_cached_results(self, cache_key: str, results: Dict[str, Any], max_entries: int):
+        with self._connect().transaction() as tx:
+            tx.connection.execute(
+                """
+                INSERT INTO backtest_result_cache (cache_key, results) VALUES (%s, %s)
+                ON CONFLICT (cache_key) DO UPDATE SET
+                    results = excluded.results,
+                    seq = nextval(pg_get_serial_sequence('backtest_result_cache', 'seq'))
+                """,
+                (cache_key, self._psycopg.types.json.Jsonb(results)),
+            )
+            tx.connection.execute(
+                """
+                DELETE FROM backtest_result_cache WHERE seq <= (
+                    SELECT seq FROM backtest_result_cache ORDER BY seq DESC LIMIT 1 OFFSET %s
+                )
+                """,
+                (max_entries,),
+            )
+
+    def close(self):
+        """Close the connection of every thread that used this store"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            # Threads that use it again open a new connection
+            self._local = threading.local()
+        for conn in connections:
+            conn.close()
+
+
+def create_job_store(backend: str, path: Path, dsn: Optional[str] = None) -> JobStore:
+    """Create the job store selected by the JOB_STORE setting"""
+    if backend == "sqlite":
+        return SQLiteJobStore(path)
+    if backend == "memory":
+        return MemoryJobStore()
+    if backend == "postgres":
+        if not dsn:
+            raise ValueError("The postgres job store requires DATABASE_URL")
+        return PostgresJobStore(dsn)
+    raise ValueError(f"Unknown job store backend: {backend}")
+
+
+def migrate_json_status(store: JobStore, status_file: Path) -> int:
+    """Import a legacy backtest_status.json into the store once, then rename it"""
+    if not status_file.exists():
+        return 0
+
+    try:
+        with open(status_file, "r") as f:
+            legacy = json.load(f)
+    except Exception as e:
+        print(f"Error loading legacy status file: {e}")
+        return 0
+
+    for backtest_id, job in legacy.items():
+        if store.get(backtest_id) is None:
+            store.upsert(backtest_id, job)
+
+    status_file.rename(status_file.with_name(status_file.name + ".migrated"))
+    return len(legacy)
@@ -0,0 +1,100 @@
+"""
+Streaming parser for LEAN backtest-results.json.
+
+The file is read as a stream of JSON events, so memory stays bounded by the
+largest single object of interest rather than the file size.
+TotalPerformance is kept as the summary, the 'Strategy Equity' chart goes
+to a compact series artifact, and orders are streamed straight into a
+compressed JSON-lines file.
+"""
+
+import gzip
+import itertools
+import json
+from array import array
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+import ijson
+import numpy as np
+
+from artifacts import EQUITY_FILE, ORDERS_FILE, write_series
+
+EQUITY_PREFIX = "Charts.Strategy Equity.Series.Equity.Values.item"
+# Orders are written in batches with fast compression; they are rarely read
+ORDERS_BATCH = 1000
+ORDERS_COMPRESSION = 1
+
+
+def chart_point(point: Any) -> tuple:
+    """(unix time, value) of a LEAN chart point
+
+    Older LEAN versions write {"x": time, "y": value} points, newer ones
+    [time, open, high, low, close] candles; the close is used for those.
+    """
+    if isinstance(point, dict):
+        return point["x"], point["y"]
+    return point[0], point[-1]
+
+
+def summarize_performance(total_performance: Dict[str, Any]) -> Dict[str, Any]:
+    """Map LEAN's TotalPerformance to the service's result keys"""
+    return {
+        "totalReturn": total_performance.get("TotalReturn", 0),
+        "sharpeRatio": total_performance.get("SharpeRatio", 0),
+        "maxDrawdown": total_performance.get("Drawdown", 0),
+        "winRate": total_performance.get("WinRate", 0),
+        "finalPortfolioValue": total_performance.get("PortfolioValue", 0),
+        "totalTrades": total_performance.get("TotalTrades", 0),
+        "profitLoss": total_performance.get("TotalProfit", 0)
+    }
+
+
+def ingest_lean_results(results_file: Path, artifacts_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """Stream a LEAN results file into a summary and compact artifacts
+
+    Returns the summary metrics. Artifacts are written to artifacts_dir,
+    which defaults to the results file's directory. Each section is read in
+    its own pass so the parser backend builds objects in C; a pass over
+    the file is cheaper than a Python-level loop over every JSON event.
+    """
+    artifacts_dir = artifacts_dir or results_file.parent
+
+    with open(results_file, "rb") as f:
+        total_performance = next(ijson.items(f, "TotalPerformance", use_float=True), None) or {}
+
+    equity_time = array("d")
+    equity_value = array("d")
+    with open(results_file, "rb") as f:
+        for point in ijson.items(f, EQUITY_PREFIX, use_float=True):
+            x, y = chart_point(point)
+            equity_time.append(x)
+            equity_value.append(y)
+    if equity_time:
+        write_series(
+            artifacts_dir / EQUITY_FILE,
+            np.frombuffer(equity_time).astype("int64").astype("datetime64[s]"),
+            {"equity": np.frombuffer(equity_value)},
+        )
+
+    with open(results_file, "rb") as f, \
+            gzip.open(artifacts_dir / ORDERS_FILE, "wt", compresslevel=ORDERS_COMPRESSION) as orders_file:
+        # Orders is a map keyed by order id in most versions, a list in others
+        orders = ijson.kvitems(f, "Orders", use_float=True)
+        first = next(orders, None)
+        if first is None:
+            f.seek(0)
+            orders = (("", order) for order in ijson.items(f, "Orders.item", use_float=True))
+        else:
+            orders = itertools.chain([first], orders)
+
+        batch = []
+        for _, order in orders:
+            batch.append(json.dumps(order))
+            if len(batch) >= ORDERS_BATCH:
+                orders_file.write("\n".join(batch) + "\n")
+                batch.clear()
+        if batch:
+            orders_file.write("\n".join(batch) + "\n")
+
+    return summarize_performance(total_performance)
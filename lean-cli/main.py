@@ -1,17 +1,75 @@
 import os
+import sys
 import json
+import base64
 import subprocess
 import asyncio
+import functools
+import importlib
+import itertools
+import time
+import uuid
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Literal, Optional, Tuple
 from datetime import datetime
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import uvicorn
+from pydantic import BaseModel, Field
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
-app = FastAPI(title="LEAN CLI Service", version="1.0.0")
+from job_store import create_job_store, migrate_json_status
+from executor import BacktestExecutor, JobRunningError, QueueFullError
+from events import JobEvents, StatusWatcher, TERMINAL_STATUSES, wait_for_terminal
+from job_queue import QueueDispatcher, create_job_queue
+from result_cache import ResultCache, SharedResultCache, result_cache_key, strategy_hash
+from scheduler import claim_priority, parse_weights
+from engine import (
+    ENGINE_MODES, EngineError, find_algorithm_class, run_lean_engine,
+    run_simulator, with_progress_reporter, write_lean_config
+)
+from worker_pool import EngineWorkerPool
+from pruning import JobPruned, PeerTracker, ProgressMonitor
+from validation import ValidationCache, is_warning
+from retention import RetentionManager
+from telemetry import (
+    BACKTESTS_FINISHED, HTTP_LATENCY, HTTP_REQUESTS, QUEUE_WAIT_SECONDS,
+    InstrumentedJobStore, PhaseTimer, register_stats
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(create_directories)
+    migrated = migrate_json_status(job_store, STATUS_FILE)
+    if migrated:
+        print(f"Migrated {migrated} backtests from {STATUS_FILE.name}")
+    if dispatcher is not None:
+        # Queue workers run the backtests; this process only dispatches them
+        await dispatcher.start()
+        await status_watcher.start()
+    else:
+        # Jobs submitted before the engine workers are up wait for the first one
+        await executor.start()
+    readiness["executor"] = True
+    warmup = asyncio.create_task(warm_up(recover=dispatcher is None))
+    await retention.start()
+    yield
+    warmup.cancel()
+    await asyncio.gather(warmup, return_exceptions=True)
+    await retention.stop()
+    if dispatcher is not None:
+        await status_watcher.stop()
+        await dispatcher.stop()
+        job_queue.close()
+    else:
+        await executor.stop()
+        if engine_pool is not None:
+            await engine_pool.stop()
+    job_store.close()
+
+app = FastAPI(title="LEAN CLI Service", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -22,57 +80,508 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests and time responses per route template"""
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    HTTP_LATENCY.labels(request.method, path).observe(time.perf_counter() - started)
+    HTTP_REQUESTS.labels(request.method, path, response.status_code).inc()
+    return response
+
 # Models
+class SignalStrategy(BaseModel):
+    """Declared long/flat signal strategy that runs on the vectorized fast path"""
+    rule: Literal["buy_and_hold", "sma_cross", "price_above_sma", "rsi"]
+    symbol: str = "SPY"
+    resolution: Literal["daily", "hour", "minute"] = "daily"
+    fast: int = Field(10, gt=0)
+    slow: int = Field(30, gt=0)
+    rsi_period: int = Field(14, gt=0)
+    rsi_lower: float = 30.0
+    rsi_upper: float = 70.0
+    allocation: float = Field(1.0, ge=0.0, le=1.0)
+    fee_bps: float = Field(0.0, ge=0.0)
+
+class StopRules(BaseModel):
+    """Conditions under which a running backtest is stopped early as pruned"""
+    max_drawdown: Optional[float] = Field(None, lt=0.0)
+    checkpoint: float = Field(0.5, gt=0.0, lt=1.0)
+    min_return: Optional[float] = None
+    below_peer_median: bool = False
+    peer_group: Optional[str] = None
+    min_peers: int = Field(3, ge=1)
+
 class BacktestRequest(BaseModel):
     backtest_id: str
     strategy_code: str
     start_date: str = "2020-01-01"
     end_date: str = "2021-01-01"
     initial_capital: float = 100000.0
+    parameters: Dict[str, Any] = {}
+    signal: Optional[SignalStrategy] = None
+    stop_rules: Optional[StopRules] = None
+    priority: int = 0
+    # Interactive backtests run ahead of bulk sweeps; owners share the workers fairly
+    priority_class: Literal["interactive", "bulk"] = "interactive"
+    owner: Optional[str] = None
+    use_cache: bool = True
 
 class BacktestResult(BaseModel):
     backtest_id: str
     status: str
     results: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
+    progress: Optional[Dict[str, Any]] = None
+    timings: Optional[Dict[str, float]] = None
+
+class BacktestSummary(BaseModel):
+    backtest_id: str
+    status: str
+    created_at: Optional[str] = None
+    completed_at: Optional[str] = None
+    batch_id: Optional[str] = None
+    owner: Optional[str] = None
+    error: Optional[str] = None
+    progress: Optional[Dict[str, Any]] = None
+    cache_hit: bool = False
+    results: Optional[Dict[str, Any]] = None
+
+class BacktestList(BaseModel):
+    backtests: List[BacktestSummary]
+    next_cursor: Optional[str] = None
+
+class BacktestStatusRequest(BaseModel):
+    backtest_ids: List[str]
+    include_results: bool = False
+
+class BacktestStatusResult(BaseModel):
+    backtests: List[BacktestSummary]
+    missing: List[str] = []
+
+class BatchJobParameters(BaseModel):
+    start_date: str = "2020-01-01"
+    end_date: str = "2021-01-01"
+    initial_capital: float = 100000.0
+    parameters: Dict[str, Any] = {}
+
+class ParameterGrid(BaseModel):
+    start_date: List[str] = ["2020-01-01"]
+    end_date: List[str] = ["2021-01-01"]
+    initial_capital: List[float] = [100000.0]
+    parameters: Dict[str, List[Any]] = {}
+
+class BatchBacktestRequest(BaseModel):
+    batch_id: str
+    strategy_code: str
+    jobs: List[BatchJobParameters] = []
+    grid: Optional[ParameterGrid] = None
+    signal: Optional[SignalStrategy] = None
+    stop_rules: Optional[StopRules] = None
+    priority: int = 0
+    priority_class: Literal["interactive", "bulk"] = "bulk"
+    owner: Optional[str] = None
+    use_cache: bool = True
+
+class WalkForwardRequest(BaseModel):
+    walk_forward_id: str
+    strategy_code: str
+    start_date: str = "2015-01-01"
+    end_date: str = "2021-01-01"
+    train_days: int = Field(730, gt=0)
+    test_days: int = Field(182, gt=0)
+    step_days: Optional[int] = Field(None, gt=0)
+    anchored: bool = False
+    initial_capital: float = 100000.0
+    parameters: Dict[str, Any] = {}
+    signal: Optional[SignalStrategy] = None
+    stop_rules: Optional[StopRules] = None
+    priority: int = 0
+    priority_class: Literal["interactive", "bulk"] = "bulk"
+    owner: Optional[str] = None
+    use_cache: bool = True
+
+class WalkForwardResult(BaseModel):
+    walk_forward_id: str
+    status: str
+    total_windows: int
+    counts: Dict[str, int]
+    windows: List[Dict[str, Any]] = []
+    aggregate: Optional[Dict[str, Any]] = None
+
+class BatchResult(BaseModel):
+    batch_id: str
+    status: str
+    total: int
+    counts: Dict[str, int]
+    jobs: List[BacktestResult] = []
 
 # Use local directories for development
 BASE_DIR = Path(__file__).parent
-STRATEGIES_DIR = BASE_DIR / "strategies"
-RESULTS_DIR = BASE_DIR / "results"
-DATA_DIR = BASE_DIR / "data"
+STRATEGIES_DIR = Path(os.getenv("LEAN_STRATEGIES_DIR", BASE_DIR / "strategies"))
+RESULTS_DIR = Path(os.getenv("LEAN_RESULTS_DIR", BASE_DIR / "results"))
+DATA_DIR = Path(os.getenv("LEAN_DATA_DIR", BASE_DIR / "data"))
 STATUS_FILE = BASE_DIR / "backtest_status.json"
+JOB_STORE = os.getenv("JOB_STORE", "sqlite")
+JOB_STORE_PATH = Path(os.getenv("JOB_STORE_PATH", BASE_DIR / "backtest_status.db"))
+# Unset runs backtests in this process; sqlite or postgres hands them to queue_worker.py processes
+JOB_QUEUE = os.getenv("JOB_QUEUE", "")
+JOB_QUEUE_PATH = Path(os.getenv("JOB_QUEUE_PATH", BASE_DIR / "job_queue.db"))
+DATABASE_URL = os.getenv("DATABASE_URL")
+JOB_QUEUE_LEASE_SECONDS = float(os.getenv("JOB_QUEUE_LEASE_SECONDS", "30"))
+JOB_QUEUE_POLL_SECONDS = float(os.getenv("JOB_QUEUE_POLL_SECONDS", "1"))
+JOB_QUEUE_MAX_ATTEMPTS = int(os.getenv("JOB_QUEUE_MAX_ATTEMPTS", "3"))
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", os.cpu_count() or 1))
+MAX_QUEUE_DEPTH = int(os.getenv("MAX_QUEUE_DEPTH", "1000"))
+# Workers bulk backtests leave free for interactive ones
+INTERACTIVE_RESERVED_WORKERS = int(os.getenv("INTERACTIVE_RESERVED_WORKERS", "1"))
+# Relative worker shares, e.g. "alice=2,bob=0.5"; unlisted owners weigh 1
+OWNER_WEIGHTS = parse_weights(os.getenv("OWNER_WEIGHTS", ""))
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+ENGINE_MODE = os.getenv("ENGINE_MODE", "simulator")
+ENGINE_VERSION = os.getenv("ENGINE_VERSION", ENGINE_MODE)
+ENGINE_TIMEOUT_SECONDS = float(os.getenv("ENGINE_TIMEOUT_SECONDS", "3600"))
+# Simulated run time of each backtest in simulator mode
+SIMULATOR_DURATION_SECONDS = float(os.getenv("SIMULATOR_DURATION_SECONDS", "3"))
+LEAN_LAUNCHER = os.getenv("LEAN_LAUNCHER", "dotnet QuantConnect.Lean.Launcher.dll").split()
+LEAN_ENGINE_DIR = Path(os.getenv("LEAN_ENGINE_DIR", "/Lean/Launcher/bin/Debug"))
+# Warm engine worker processes; 0 runs engines inside the service process
+ENGINE_WORKERS = int(os.getenv("ENGINE_WORKERS", "0"))
+ENGINE_WORKER_MAX_JOBS = int(os.getenv("ENGINE_WORKER_MAX_JOBS", "100"))
+ENGINE_WORKER_MAX_RSS_MB = int(os.getenv("ENGINE_WORKER_MAX_RSS_MB", "2048"))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "10000"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+VALIDATION_CACHE_MAX_ENTRIES = int(os.getenv("VALIDATION_CACHE_MAX_ENTRIES", "10000"))
+FEATURE_CACHE_MAX_BYTES = int(os.getenv("FEATURE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+# How often a memory-mapped series is checked against its LEAN source
+MARKET_DATA_CHECK_SECONDS = float(os.getenv("MARKET_DATA_CHECK_SECONDS", "5"))
+# Batches or peer groups whose returns are kept for peer-median stop rules
+PEER_TRACKER_MAX_GROUPS = int(os.getenv("PEER_TRACKER_MAX_GROUPS", "1000"))
+# Minimum time between stored progress checkpoints of a running backtest
+PROGRESS_PERSIST_SECONDS = float(os.getenv("PROGRESS_PERSIST_SECONDS", "1"))
+# Restarts a backtest may be interrupted by before it is failed instead of requeued
+RECOVERY_MAX_ATTEMPTS = int(os.getenv("RECOVERY_MAX_ATTEMPTS", "3"))
+# Retention of finished backtests; 0 disables a policy
+RETENTION_INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+RETENTION_MAX_AGE_DAYS = float(os.getenv("RETENTION_MAX_AGE_DAYS", "0"))
+RETENTION_KEEP_PER_STRATEGY = int(os.getenv("RETENTION_KEEP_PER_STRATEGY", "0"))
+RETENTION_MAX_DISK_BYTES = int(os.getenv("RETENTION_MAX_DISK_BYTES", "0"))
+RETENTION_DELETE_AFTER_DAYS = float(os.getenv("RETENTION_DELETE_AFTER_DAYS", "0"))
+RETENTION_STRATEGY_MAX_AGE_DAYS = float(os.getenv("RETENTION_STRATEGY_MAX_AGE_DAYS", "0"))
+MAX_WAIT_SECONDS = 60
+EVENT_HEARTBEAT_SECONDS = 15
+# The data, engine and metrics modules pull in NumPy and ijson. They are
+# imported on first use, and in the background once the service is up.
+WARMUP_MODULES = [
+    "numpy", "metrics", "market_data", "vectorized", "artifacts",
+    "lean_results", "feature_cache", "walk_forward"
+]
+STARTED_AT = time.monotonic()
 
-# Create directories if they don't exist
-STRATEGIES_DIR.mkdir(exist_ok=True)
-RESULTS_DIR.mkdir(exist_ok=True)
-DATA_DIR.mkdir(exist_ok=True)
+if ENGINE_MODE not in ENGINE_MODES:
+    raise ValueError(f"Unknown ENGINE_MODE: {ENGINE_MODE}")
 
-def load_backtest_status() -> Dict[str, Any]:
-    """Load backtest status from JSON file"""
-    if STATUS_FILE.exists():
-        try:
-            with open(STATUS_FILE, "r") as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Error loading status file: {e}")
-    return {}
+job_store = InstrumentedJobStore(create_job_store(JOB_STORE, JOB_STORE_PATH, DATABASE_URL))
+job_queue = create_job_queue(JOB_QUEUE, JOB_QUEUE_PATH, DATABASE_URL) if JOB_QUEUE else None
+job_events = JobEvents()
+# Progress checkpoint writes in flight, by backtest
+progress_writes: Dict[str, asyncio.Future] = {}
+# Queue workers store results in their own process, so share the cache through the job store
+result_cache = SharedResultCache(
+    job_store, RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_BYTES
+) if job_queue is not None else ResultCache(RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_BYTES)
+validation_cache = ValidationCache(VALIDATION_CACHE_MAX_ENTRIES)
+peer_tracker = PeerTracker(PEER_TRACKER_MAX_GROUPS)
+retention = RetentionManager(
+    job_store, STRATEGIES_DIR, RESULTS_DIR, RETENTION_INTERVAL_SECONDS,
+    RETENTION_MAX_AGE_DAYS, RETENTION_KEEP_PER_STRATEGY,
+    RETENTION_MAX_DISK_BYTES, RETENTION_DELETE_AFTER_DAYS, RETENTION_STRATEGY_MAX_AGE_DAYS
+)
+engine_pool = EngineWorkerPool(
+    [sys.executable, str(BASE_DIR / "engine_worker.py")],
+    ENGINE_WORKERS,
+    ENGINE_WORKER_MAX_JOBS,
+    ENGINE_WORKER_MAX_RSS_MB * 1024 * 1024
+) if ENGINE_WORKERS > 0 else None
+# What /ready waits for; set by the lifespan and the warm-up after it
+readiness = {
+    "executor": False,
+    "engine_pool": engine_pool is None,
+    "recovery": False,
+    "modules": False,
+    "caches": False,
+}
+ready_seconds: Optional[float] = None
+
+def create_directories():
+    """Create the strategy, result and data directories if they don't exist"""
+    for directory in (STRATEGIES_DIR, RESULTS_DIR, DATA_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
+
+@functools.lru_cache(maxsize=None)
+def get_market_data():
+    """The market data store, created on first use"""
+    from market_data import MarketDataStore
+    return MarketDataStore(DATA_DIR, MARKET_DATA_CHECK_SECONDS)
+
+@functools.lru_cache(maxsize=None)
+def get_feature_cache():
+    """The shared indicator cache, created on first use"""
+    from feature_cache import FeatureCache
+    return FeatureCache(DATA_DIR / "features", FEATURE_CACHE_MAX_BYTES)
+
+def feature_cache_stats() -> Dict[str, Any]:
+    """Indicator cache usage, without loading the cache just to report it"""
+    if "feature_cache" not in sys.modules:
+        return {}
+    return get_feature_cache().stats()
+
+async def warm_up(recover: bool):
+    """Start engine workers, requeue interrupted backtests and load lazy modules and caches
+
+    Runs after startup so the service accepts requests meanwhile; /ready
+    reports when it is done.
+    """
+    global ready_seconds
+
+    async def start_engine_pool():
+        if engine_pool is not None:
+            await engine_pool.start()
+            readiness["engine_pool"] = engine_pool.ready
+
+    async def recover_interrupted():
+        if recover:
+            recovered = await asyncio.to_thread(recover_backtests)
+            for request in recovered:
+                executor.submit(
+                    request.backtest_id, request, priority=request.priority, owner=request.owner,
+                    priority_class=request.priority_class, enforce_limit=False
+                )
+            if recovered:
+                print(f"Requeued {len(recovered)} backtests interrupted by a restart")
+        readiness["recovery"] = True
+
+    async def load_modules():
+        for module in WARMUP_MODULES:
+            await asyncio.to_thread(importlib.import_module, module)
+        readiness["modules"] = True
+        # Measures the disk cache left by earlier runs
+        await asyncio.to_thread(get_feature_cache().stats)
+        readiness["caches"] = True
+
+    results = await asyncio.gather(
+        start_engine_pool(), recover_interrupted(), load_modules(), return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            print(f"Error warming up: {result}")
+    if all(readiness.values()):
+        ready_seconds = time.monotonic() - STARTED_AT
+        print(f"✅ Ready {ready_seconds:.2f}s after start")
+
+def update_backtest_status(backtest_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge updates into the stored backtest status, notify subscribers and return the job"""
+    job = job_store.upsert(backtest_id, updates)
+    publish_status(backtest_id, job, updates)
+    return job
+
+def update_unfinished_status(backtest_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Like update_backtest_status, unless the backtest already finished; then return None
+
+    A cancel from the service must not be replaced by the status a queue
+    worker writes as its run starts or ends, nor the reverse.
+    """
+    job = job_store.upsert_unless_status(backtest_id, updates, list(TERMINAL_STATUSES))
+    if job is not None:
+        publish_status(backtest_id, job, updates)
+    return job
+
+def publish_status(backtest_id: str, job: Dict[str, Any], updates: Dict[str, Any]):
+    """Notify subscribers of a stored status update and count finished backtests"""
+    job_events.publish(backtest_id, job)
+    if updates.get("status") in TERMINAL_STATUSES:
+        BACKTESTS_FINISHED.labels(updates["status"]).inc()
+
+def write_strategy(name: str, strategy_code: str) -> Path:
+    """Write strategy code to STRATEGIES_DIR/<name>/strategy.py
 
-def save_backtest_status(status: Dict[str, Any]):
-    """Save backtest status to JSON file"""
+    LEAN runs get a hook that reports progress checkpoints.
+    """
+    strategy_dir = STRATEGIES_DIR / name
+    strategy_dir.mkdir(parents=True, exist_ok=True)
+    
+    if ENGINE_MODE == "lean":
+        strategy_code = with_progress_reporter(strategy_code)
+    
+    strategy_file = strategy_dir / "strategy.py"
+    # Replaced, never rewritten in place: retention may have hard-linked the file to its twins
+    staging = strategy_dir / f".{uuid.uuid4().hex}.tmp"
+    with open(staging, "w") as f:
+        f.write(strategy_code)
+    os.replace(staging, strategy_file)
+    return strategy_file
+
+def expand_batch(request: BatchBacktestRequest) -> List[BatchJobParameters]:
+    """List the jobs of a batch: explicit jobs plus the cartesian product of the grid"""
+    jobs = list(request.jobs)
+    grid = request.grid
+    if grid is not None:
+        names = list(grid.parameters)
+        for start_date, end_date, initial_capital, *values in itertools.product(
+            grid.start_date, grid.end_date, grid.initial_capital,
+            *(grid.parameters[name] for name in names)
+        ):
+            jobs.append(BatchJobParameters(
+                start_date=start_date,
+                end_date=end_date,
+                initial_capital=initial_capital,
+                parameters=dict(zip(names, values))
+            ))
+    return jobs
+
+def backtest_cache_key(request: BacktestRequest) -> str:
+    if request.signal is not None:
+        parameters = {**request.parameters, "signal": request.signal.model_dump()}
+        engine_version = "vectorized"
+    else:
+        parameters = request.parameters
+        engine_version = ENGINE_VERSION
+    return result_cache_key(
+        request.strategy_code,
+        request.start_date,
+        request.end_date,
+        request.initial_capital,
+        parameters,
+        engine_version
+    )
+
+def lookup_cached_results(requests: List[BacktestRequest]) -> List[Optional[Dict[str, Any]]]:
+    """Return cached results for an identical earlier backtest of each request, if any"""
+    keys = [backtest_cache_key(r) if r.use_cache else None for r in requests]
+    cached = result_cache.get_many([key for key in keys if key is not None])
+    return [cached.get(key) if key is not None else None for key in keys]
+
+def to_backtest_result(backtest_id: str, job: Dict[str, Any]) -> BacktestResult:
+    return BacktestResult(
+        backtest_id=backtest_id,
+        status=job["status"],
+        results=job.get("results"),
+        error=job.get("error"),
+        progress=job.get("progress"),
+        timings=job.get("timings")
+    )
+
+def to_backtest_summary(backtest_id: str, job: Dict[str, Any]) -> BacktestSummary:
+    return BacktestSummary(
+        backtest_id=backtest_id,
+        status=job["status"],
+        created_at=job.get("created_at"),
+        completed_at=job.get("completed_at"),
+        batch_id=job.get("batch_id"),
+        owner=job.get("owner"),
+        error=job.get("error"),
+        progress=job.get("progress"),
+        cache_hit=job.get("cache_hit", False),
+        results=job.get("results")
+    )
+
+def encode_cursor(created_at: Optional[str], backtest_id: str) -> str:
+    """Opaque listing cursor pointing after the given job"""
+    return base64.urlsafe_b64encode(json.dumps([created_at or "", backtest_id]).encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
     try:
-        with open(STATUS_FILE, "w") as f:
-            json.dump(status, f, indent=2)
-    except Exception as e:
-        print(f"Error saving status file: {e}")
+        created_at, backtest_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(created_at), str(backtest_id)
+    except Exception:
+        raise HTTPException(status_code=422, detail="Invalid cursor")
+
+def validate_strategy_code(strategy_code: str, signal: Optional[SignalStrategy]):
+    """Reject strategy code that cannot run with a 422 listing line-level errors
+
+    Signal strategies run on the vectorized fast path and ignore the code.
+    """
+    if signal is not None:
+        return
+    issues = validation_cache.validate(strategy_code)
+    errors = [issue for issue in issues if not is_warning(issue)]
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    for warning in issues:
+        print(f"Strategy code warning: {warning['msg']}")
+
+def check_not_running(backtest_ids: List[str]):
+    """Reject resubmitting backtests that are running on this host
 
-def update_backtest_status(backtest_id: str, updates: Dict[str, Any]):
-    """Update backtest status and save to file"""
-    status = load_backtest_status()
-    if backtest_id not in status:
-        status[backtest_id] = {}
-    status[backtest_id].update(updates)
-    save_backtest_status(status)
+    A backtest resubmitted to the shared queue takes the lease from the
+    worker running it instead.
+    """
+    if dispatcher is not None:
+        return
+    for backtest_id in backtest_ids:
+        if executor.is_running(backtest_id):
+            raise HTTPException(status_code=409, detail=str(JobRunningError(backtest_id)))
+
+def check_capacity(count: int = 1):
+    """Raise QueueFullError if count more backtests would not fit in the queue"""
+    (dispatcher or executor).check_capacity(count)
+
+async def dispatch(requests: List[BacktestRequest], strategy_file: Optional[Path] = None):
+    """Hand admitted backtests to the local executor or the shared job queue
+
+    Queued backtests may run on other hosts, so they write their own
+    strategy file instead of receiving one. The shared queue claims
+    interactive backtests first but does not balance owners.
+    """
+    if dispatcher is not None:
+        await dispatcher.submit_many([
+            (r.backtest_id, {"request": r.model_dump(mode="json")}, claim_priority(r.priority_class, r.priority))
+            for r in requests
+        ])
+        return
+    for r in requests:
+        try:
+            executor.submit(
+                r.backtest_id, r, strategy_file, priority=r.priority, owner=r.owner,
+                priority_class=r.priority_class, enforce_limit=False
+            )
+        except JobRunningError as e:
+            # Started since check_not_running; the running backtest stands
+            print(f"Not queueing backtest: {e}")
+
+async def cancel_job(backtest_id: str):
+    """Stop a queued or running backtest wherever it runs"""
+    if dispatcher is not None:
+        await dispatcher.cancel(backtest_id)
+    else:
+        executor.cancel(backtest_id)
+
+def requeue_backtests(backtest_ids: List[str]):
+    """Mark backtests whose worker was lost as queued again"""
+    for backtest_id in backtest_ids:
+        update_backtest_status(backtest_id, {
+            "status": "queued",
+            "requeued_at": datetime.now().isoformat()
+        })
+
+def fail_lost_backtests(backtest_ids: List[str]):
+    """Fail backtests that lost their worker on every attempt"""
+    for backtest_id in backtest_ids:
+        update_backtest_status(backtest_id, {
+            "status": "failed",
+            "error": f"Worker lost on {JOB_QUEUE_MAX_ATTEMPTS} attempts",
+            "failed_at": datetime.now().isoformat()
+        })
+
+def queue_full_response(e: QueueFullError) -> HTTPException:
+    """Build the 429 response for a rejected submission"""
+    return HTTPException(
+        status_code=429,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
 
 @app.get("/")
 async def root():
@@ -82,125 +591,780 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
+@app.get("/ready")
+async def readiness_check():
+    """Report whether engine workers, recovery and caches are ready; 503 until they are"""
+    ready = all(readiness.values())
+    return JSONResponse(
+        {"ready": ready, "checks": readiness, "ready_seconds": ready_seconds},
+        status_code=200 if ready else 503
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/executor")
+async def executor_status():
+    """Report executor load"""
+    return (dispatcher or executor).stats()
+
+@app.get("/workers")
+async def workers_status():
+    """Report warm engine worker usage and the start-up time it saved"""
+    if engine_pool is None:
+        return {"enabled": False}
+    return {"enabled": True, **engine_pool.stats()}
+
+@app.get("/cache")
+async def cache_status():
+    """Report result, validation and indicator cache usage"""
+    return {
+        **result_cache.stats(),
+        "validation": validation_cache.stats(),
+        "features": feature_cache_stats()
+    }
+
+@app.get("/retention")
+async def retention_status():
+    """Report what the retention policy has compacted, deleted and reclaimed"""
+    return retention.stats()
+
+@app.post("/retention/run")
+async def run_retention():
+    """Apply the retention policy now and report what it reclaimed"""
+    return await asyncio.to_thread(retention.run)
+
+@app.get("/data")
+async def list_market_data():
+    """List converted market data series"""
+    return {"series": await asyncio.to_thread(lambda: get_market_data().list_series())}
+
+@app.post("/data/{symbol}/convert")
+async def convert_market_data(symbol: str, resolution: str = "daily"):
+    """Convert LEAN bar data for a symbol to the memory-mapped columnar format"""
+    from market_data import MarketDataError, RESOLUTIONS
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=422, detail=f"Unknown resolution: {resolution}")
+    try:
+        bars = await asyncio.to_thread(get_market_data().convert_lean_equity, symbol, resolution)
+    except MarketDataError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"symbol": symbol.lower(), "resolution": resolution, "bars": bars}
+
 @app.post("/backtest", response_model=BacktestResult)
-async def execute_backtest(request: BacktestRequest, background_tasks: BackgroundTasks):
-    """Execute a backtest using the LEAN CLI"""
+async def execute_backtest(request: BacktestRequest):
+    """Queue a backtest for execution using the LEAN CLI"""
     backtest_id = request.backtest_id
+    timer = PhaseTimer()
+    with timer.phase("validation"):
+        validate_strategy_code(request.strategy_code, request.signal)
+    check_not_running([backtest_id])
+    
+    # May query the shared job store
+    cached_results, = await asyncio.to_thread(lookup_cached_results, [request])
+    if cached_results is not None:
+        now = datetime.now().isoformat()
+        await asyncio.to_thread(update_backtest_status, backtest_id, {
+            "status": "completed",
+            "created_at": now,
+            "completed_at": now,
+            "owner": request.owner,
+            "strategy_hash": strategy_hash(request.strategy_code),
+            "results": cached_results,
+            "error": None,
+            "cache_hit": True
+        })
+        return BacktestResult(
+            backtest_id=backtest_id,
+            status="completed",
+            results=cached_results
+        )
+    
+    try:
+        check_capacity()
+    except QueueFullError as e:
+        raise queue_full_response(e)
     
-    # Initialize status
-    update_backtest_status(backtest_id, {
-        "status": "running",
+    # Initialize status, keeping the request so the job survives a restart
+    await asyncio.to_thread(update_backtest_status, backtest_id, {
+        "status": "queued",
         "created_at": datetime.now().isoformat(),
+        "request": request.model_dump(mode="json"),
+        "owner": request.owner,
+        "strategy_hash": strategy_hash(request.strategy_code),
         "results": None,
-        "error": None
+        "error": None,
+        "progress": None,
+        "timings": timer.timings
     })
     
-    # Start backtest in background
-    background_tasks.add_task(run_lean_backtest, backtest_id, request)
+    await dispatch([request])
     
     return BacktestResult(
         backtest_id=backtest_id,
-        status="running"
+        status="queued"
+    )
+
+@app.post("/backtest/screen", response_model=BacktestResult)
+async def screen_backtest(request: BacktestRequest):
+    """Run a signal strategy synchronously on the vectorized fast path"""
+    if request.signal is None:
+        raise HTTPException(status_code=422, detail="Screening requires a signal strategy")
+    from market_data import MarketDataError
+    timer = PhaseTimer()
+    try:
+        results = await asyncio.to_thread(run_signal_backtest, request, None, timer)
+    except MarketDataError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return BacktestResult(
+        backtest_id=request.backtest_id,
+        status="completed",
+        results=results,
+        timings=timer.timings
     )
 
 @app.get("/backtest/{backtest_id}", response_model=BacktestResult)
-async def get_backtest_result(backtest_id: str):
-    """Get the result of a backtest"""
-    status = load_backtest_status()
-    if backtest_id not in status:
+async def get_backtest_result(
+    backtest_id: str,
+    wait: float = Query(0, ge=0, le=MAX_WAIT_SECONDS)
+):
+    """Get the result of a backtest, optionally long-polling until it finishes"""
+    queue = job_events.subscribe(backtest_id) if wait else None
+    try:
+        backtest_status = await asyncio.to_thread(job_store.get, backtest_id)
+        if backtest_status is None:
+            raise HTTPException(status_code=404, detail="Backtest not found")
+        
+        if queue is not None:
+            backtest_status = await wait_for_terminal(backtest_status, queue, wait)
+        
+        return to_backtest_result(backtest_id, backtest_status)
+    finally:
+        if queue is not None:
+            job_events.unsubscribe(backtest_id, queue)
+
+@app.get("/backtest/{backtest_id}/events")
+async def stream_backtest_events(backtest_id: str):
+    """Stream status transitions of a backtest as Server-Sent Events"""
+    queue = job_events.subscribe(backtest_id)
+    backtest_status = await asyncio.to_thread(job_store.get, backtest_id)
+    if backtest_status is None:
+        job_events.unsubscribe(backtest_id, queue)
         raise HTTPException(status_code=404, detail="Backtest not found")
     
-    backtest_status = status[backtest_id]
-    return BacktestResult(
-        backtest_id=backtest_id,
-        status=backtest_status["status"],
-        results=backtest_status.get("results"),
-        error=backtest_status.get("error")
+    async def event_stream():
+        job = backtest_status
+        try:
+            while True:
+                result = to_backtest_result(backtest_id, job)
+                yield f"event: status\ndata: {result.model_dump_json()}\n\n"
+                if job["status"] in TERMINAL_STATUSES:
+                    return
+                
+                # Wait for the next transition, sending heartbeats meanwhile
+                while True:
+                    try:
+                        job = await asyncio.wait_for(queue.get(), EVENT_HEARTBEAT_SECONDS)
+                        break
+                    except asyncio.TimeoutError:
+                        yield ": heartbeat\n\n"
+        finally:
+            job_events.unsubscribe(backtest_id, queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/backtest/{backtest_id}/equity")
+async def get_backtest_equity(
+    backtest_id: str,
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+    downsample: Optional[int] = Query(None, gt=1)
+):
+    """Get a range of a backtest's equity curve, optionally downsampled"""
+    import numpy as np
+    from artifacts import EQUITY_FILE, read_series
+    equity_file = RESULTS_DIR / backtest_id / EQUITY_FILE
+    try:
+        series = await asyncio.to_thread(read_series, equity_file, start, end, downsample)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Equity curve not found")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    return {
+        "backtest_id": backtest_id,
+        "points": len(series["time"]),
+        "time": np.datetime_as_string(series["time"]).tolist(),
+        "equity": series["equity"].tolist()
+    }
+
+@app.post("/backtest/{backtest_id}/cancel", response_model=BacktestResult)
+async def cancel_backtest(backtest_id: str):
+    """Cancel a queued or running backtest"""
+    backtest_status = await asyncio.to_thread(job_store.get, backtest_id)
+    if backtest_status is None:
+        raise HTTPException(status_code=404, detail="Backtest not found")
+    if backtest_status["status"] in TERMINAL_STATUSES:
+        return to_backtest_result(backtest_id, backtest_status)
+    
+    await cancel_job(backtest_id)
+    await settle_progress(backtest_id)
+    backtest_status = await asyncio.to_thread(update_unfinished_status, backtest_id, {
+        "status": "cancelled",
+        "cancelled_at": datetime.now().isoformat()
+    })
+    if backtest_status is None:
+        # It finished before the cancel took effect
+        backtest_status = await asyncio.to_thread(job_store.get, backtest_id)
+    return to_backtest_result(backtest_id, backtest_status)
+
+@app.get("/backtests", response_model=BacktestList)
+async def list_backtests(
+    status: Optional[str] = Query(None, description="Comma-separated statuses to include"),
+    since: Optional[datetime] = Query(None, description="Only backtests created at or after this time"),
+    limit: int = Query(100, ge=1, le=MAX_BATCH_SIZE),
+    cursor: Optional[str] = None,
+    include_results: bool = False
+):
+    """List backtests newest first, a page at a time"""
+    statuses = [s for s in status.split(",") if s] if status else None
+    if since is not None and since.tzinfo is not None:
+        # created_at is stored as naive local time
+        since = since.astimezone().replace(tzinfo=None)
+    after = decode_cursor(cursor) if cursor else None
+    jobs = await asyncio.to_thread(
+        job_store.list_jobs, statuses, since.isoformat() if since else None,
+        limit, after, not include_results
+    )
+    next_cursor = None
+    if len(jobs) == limit:
+        backtest_id, job = jobs[-1]
+        next_cursor = encode_cursor(job.get("created_at"), backtest_id)
+    return BacktestList(
+        backtests=[to_backtest_summary(backtest_id, job) for backtest_id, job in jobs],
+        next_cursor=next_cursor
+    )
+
+@app.post("/backtests/status", response_model=BacktestStatusResult)
+async def get_backtest_statuses(request: BacktestStatusRequest):
+    """Get the status of many backtests in one store query"""
+    backtest_ids = list(dict.fromkeys(request.backtest_ids))
+    if len(backtest_ids) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Requested {len(backtest_ids)} backtests, the limit is {MAX_BATCH_SIZE}"
+        )
+    jobs = await asyncio.to_thread(job_store.get_many, backtest_ids, not request.include_results)
+    return BacktestStatusResult(
+        backtests=[
+            to_backtest_summary(backtest_id, jobs[backtest_id])
+            for backtest_id in backtest_ids if backtest_id in jobs
+        ],
+        missing=[backtest_id for backtest_id in backtest_ids if backtest_id not in jobs]
+    )
+
+@app.post("/backtests/batch", response_model=BatchResult)
+async def execute_batch(request: BatchBacktestRequest):
+    """Queue a list of backtests or a parameter sweep over one strategy"""
+    jobs = expand_batch(request)
+    if not jobs:
+        raise HTTPException(status_code=422, detail="Batch has no jobs")
+    return await queue_batch(request, jobs)
+
+async def queue_batch(request: BatchBacktestRequest, jobs: List[BatchJobParameters],
+                      details: Optional[Dict[str, Any]] = None) -> BatchResult:
+    """Validate, store and queue the jobs of a batch; details are stored with the batch"""
+    batch_id = request.batch_id
+    timer = PhaseTimer()
+    with timer.phase("validation"):
+        validate_strategy_code(request.strategy_code, request.signal)
+    if len(jobs) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Batch has {len(jobs)} jobs, the limit is {MAX_BATCH_SIZE}"
+        )
+    
+    backtest_ids = [f"{batch_id}-{index}" for index in range(len(jobs))]
+    check_not_running(backtest_ids)
+    backtest_requests = [
+        BacktestRequest(
+            backtest_id=backtest_id,
+            strategy_code=request.strategy_code,
+            signal=request.signal,
+            stop_rules=request.stop_rules,
+            priority=request.priority,
+            priority_class=request.priority_class,
+            owner=request.owner,
+            use_cache=request.use_cache,
+            **job.model_dump()
+        )
+        for backtest_id, job in zip(backtest_ids, jobs)
+    ]
+    cached = await asyncio.to_thread(lookup_cached_results, backtest_requests)
+    pending = [r for r, results in zip(backtest_requests, cached) if results is None]
+    
+    try:
+        check_capacity(len(pending))
+    except QueueFullError as e:
+        raise queue_full_response(e)
+    
+    strategy_file = None
+    if pending and dispatcher is None:
+        with timer.phase("strategy_write"):
+            strategy_file = await asyncio.to_thread(write_strategy, batch_id, request.strategy_code)
+    
+    created_at = datetime.now().isoformat()
+    code_hash = strategy_hash(request.strategy_code)
+    # The shared request fields let jobs be rebuilt after a restart
+    await asyncio.to_thread(job_store.save_batch, batch_id, {
+        "backtest_ids": backtest_ids,
+        "created_at": created_at,
+        "request": request.model_dump(mode="json", exclude={"batch_id", "jobs", "grid"}),
+        **(details or {})
+    })
+    await asyncio.to_thread(job_store.upsert_many, {
+        r.backtest_id: {
+            "status": "queued" if results is None else "completed",
+            "created_at": created_at,
+            "batch_id": batch_id,
+            "owner": request.owner,
+            "strategy_hash": code_hash,
+            "parameters": job.model_dump(),
+            "results": results,
+            "error": None,
+            "progress": None,
+            "timings": timer.timings,
+            **({"completed_at": created_at, "cache_hit": True} if results is not None else {})
+        }
+        for r, job, results in zip(backtest_requests, jobs, cached)
+    })
+    
+    if pending:
+        await dispatch(pending, strategy_file)
+    
+    counts: Dict[str, int] = {}
+    if pending:
+        counts["queued"] = len(pending)
+    if len(pending) < len(jobs):
+        counts["completed"] = len(jobs) - len(pending)
+    
+    return BatchResult(
+        batch_id=batch_id,
+        status="queued" if pending else "completed",
+        total=len(jobs),
+        counts=counts
+    )
+
+@app.get("/backtests/batch/{batch_id}", response_model=BatchResult)
+async def get_batch_result(batch_id: str, include_jobs: bool = True):
+    """Get aggregate status and per-job results of a batch"""
+    batch = await asyncio.to_thread(job_store.get_batch, batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    backtest_ids = batch["backtest_ids"]
+    jobs = await asyncio.to_thread(job_store.get_many, backtest_ids, not include_jobs)
+    status, counts = batch_status(jobs)
+    
+    return BatchResult(
+        batch_id=batch_id,
+        status=status,
+        total=len(backtest_ids),
+        counts=counts,
+        jobs=[
+            to_backtest_result(backtest_id, jobs[backtest_id])
+            for backtest_id in backtest_ids if backtest_id in jobs
+        ] if include_jobs else []
+    )
+
+@app.post("/backtests/walk-forward", response_model=WalkForwardResult)
+async def execute_walk_forward(request: WalkForwardRequest):
+    """Queue the train and test backtests of every walk-forward window as one batch"""
+    from walk_forward import walk_forward_windows
+    try:
+        windows = walk_forward_windows(
+            request.start_date, request.end_date, request.train_days,
+            request.test_days, request.step_days, request.anchored
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not windows:
+        raise HTTPException(status_code=422, detail="The date range is shorter than one train and test window")
+    
+    # Job 2i trains window i and job 2i + 1 tests it
+    jobs = [
+        BatchJobParameters(
+            start_date=window[f"{half}_start"],
+            end_date=window[f"{half}_end"],
+            initial_capital=request.initial_capital,
+            parameters=request.parameters
+        )
+        for window in windows for half in ("train", "test")
+    ]
+    batch = BatchBacktestRequest(
+        batch_id=request.walk_forward_id,
+        **request.model_dump(include={
+            "strategy_code", "signal", "stop_rules", "priority", "priority_class", "owner", "use_cache"
+        })
+    )
+    result = await queue_batch(batch, jobs, {"walk_forward": {
+        "overlapping": (request.step_days or request.test_days) < request.test_days,
+        "windows": windows
+    }})
+    return WalkForwardResult(
+        walk_forward_id=request.walk_forward_id,
+        status=result.status,
+        total_windows=len(windows),
+        counts=result.counts
+    )
+
+@app.get("/backtests/walk-forward/{walk_forward_id}", response_model=WalkForwardResult)
+async def get_walk_forward_result(walk_forward_id: str):
+    """Get per-window in-sample and out-of-sample results and their aggregate"""
+    from walk_forward import aggregate_out_of_sample
+    batch = await asyncio.to_thread(job_store.get_batch, walk_forward_id)
+    if batch is None or "walk_forward" not in batch:
+        raise HTTPException(status_code=404, detail="Walk-forward run not found")
+    
+    backtest_ids = batch["backtest_ids"]
+    jobs = await asyncio.to_thread(job_store.get_many, backtest_ids)
+    status, counts = batch_status(jobs)
+    
+    windows = []
+    for window in batch["walk_forward"]["windows"]:
+        train = jobs.get(backtest_ids[2 * window["index"]], {})
+        test = jobs.get(backtest_ids[2 * window["index"] + 1], {})
+        windows.append({
+            **window,
+            "train_status": train.get("status"),
+            "test_status": test.get("status"),
+            "in_sample": train.get("results") if train.get("status") == "completed" else None,
+            "out_of_sample": test.get("results") if test.get("status") == "completed" else None
+        })
+    
+    return WalkForwardResult(
+        walk_forward_id=walk_forward_id,
+        status=status,
+        total_windows=len(windows),
+        counts=counts,
+        windows=windows,
+        aggregate=aggregate_out_of_sample(windows, batch["walk_forward"]["overlapping"])
     )
 
-async def run_lean_backtest(backtest_id: str, request: BacktestRequest):
-    """Run the backtest using the LEAN CLI"""
+def batch_status(jobs: Dict[str, Dict[str, Any]]) -> Tuple[str, Dict[str, int]]:
+    """Overall status of a batch and the number of its jobs in each status"""
+    counts: Dict[str, int] = {}
+    for job in jobs.values():
+        counts[job["status"]] = counts.get(job["status"], 0) + 1
+    
+    if all(status in TERMINAL_STATUSES for status in counts):
+        status = "completed"
+    elif set(counts) == {"queued"}:
+        status = "queued"
+    else:
+        status = "running"
+    return status, counts
+
+async def run_lean_backtest(backtest_id: str, request: BacktestRequest,
+                            strategy_file: Optional[Path] = None):
+    """Run the backtest using the LEAN CLI
+
+    Phase timings are recorded in the job's status. The final status write
+    is timed as well but, being the write itself, only shows up in /metrics.
+    """
+    timer = PhaseTimer()
+    on_progress = None
     try:
-        # Create strategy directory
-        strategy_dir = STRATEGIES_DIR / backtest_id
-        strategy_dir.mkdir(parents=True, exist_ok=True)
+        with timer.phase("status_persist"):
+            job = await asyncio.to_thread(update_unfinished_status, backtest_id, {
+                "status": "running",
+                "started_at": datetime.now().isoformat()
+            })
+        if job is None:
+            # Cancelled before it started
+            return
+        timer = PhaseTimer({**(job.get("timings") or {}), **timer.timings})
         
-        # Write strategy code to file
-        strategy_file = strategy_dir / "strategy.py"
-        with open(strategy_file, "w") as f:
-            f.write(request.strategy_code)
+        # Batch jobs share a strategy file written once at submission
+        if strategy_file is None:
+            with timer.phase("strategy_write"):
+                strategy_file = await asyncio.to_thread(
+                    write_strategy, backtest_id, request.strategy_code
+                )
         
         # Create results directory
         results_dir = RESULTS_DIR / backtest_id
-        results_dir.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(results_dir.mkdir, parents=True, exist_ok=True)
         
-        # For now, simulate LEAN CLI backtest since we don't have LEAN CLI installed locally
-        # In Docker, this would call the actual LEAN CLI
-        await asyncio.sleep(3)  # Simulate processing time
+        on_progress = progress_monitor(backtest_id, request, job)
         
-        # Generate realistic backtest results
-        import random
-        random.seed(hash(backtest_id) % 1000)  # Deterministic results for same backtest_id
+        if request.signal is not None:
+            results = await asyncio.to_thread(run_signal_backtest, request, results_dir, timer)
+        elif ENGINE_MODE == "lean":
+            results = await run_lean_engine_backtest(
+                backtest_id, request, strategy_file, results_dir, on_progress, timer
+            )
+        else:
+            with timer.phase("engine_run"):
+                results = await run_engine(
+                    "run_simulator",
+                    on_progress,
+                    backtest_id=backtest_id,
+                    initial_capital=request.initial_capital,
+                    duration=SIMULATOR_DURATION_SECONDS,
+                    checkpoint=job.get("progress")
+                )
         
-        # Simulate realistic trading results
-        total_return = random.uniform(-0.2, 0.4)  # -20% to +40%
-        sharpe_ratio = random.uniform(-1.0, 2.5)  # -1.0 to 2.5
-        max_drawdown = random.uniform(-0.3, -0.05)  # -30% to -5%
-        win_rate = random.uniform(0.3, 0.8)  # 30% to 80%
-        
-        final_portfolio_value = 100000 * (1 + total_return)  # Default initial capital
-        
-        # Generate realistic backtest results
-        results = {
-            "totalReturn": total_return,
-            "sharpeRatio": sharpe_ratio,
-            "maxDrawdown": max_drawdown,
-            "winRate": win_rate,
-            "finalPortfolioValue": final_portfolio_value,
-            "totalTrades": random.randint(1, 50),
-            "profitLoss": 100000 * total_return
-        }
+        if request.use_cache:
+            await asyncio.to_thread(result_cache.put, backtest_cache_key(request), results)
         
-        # Update status with results
-        update_backtest_status(backtest_id, {
-            "status": "completed",
-            "results": results,
-            "completed_at": datetime.now().isoformat()
-        })
+        # Update status with results; they supersede the progress checkpoints
+        with timer.phase("status_persist"):
+            await finish_backtest(backtest_id, {
+                "status": "completed",
+                "results": results,
+                "progress": None,
+                "completed_at": datetime.now().isoformat(),
+                "timings": timer.timings
+            })
+    
+    except JobPruned as e:
+        with timer.phase("status_persist"):
+            await finish_backtest(backtest_id, {
+                "status": "pruned",
+                "error": str(e),
+                "progress": on_progress.last_checkpoint,
+                "pruned_at": datetime.now().isoformat(),
+                "timings": timer.timings
+            })
             
     except Exception as e:
-        update_backtest_status(backtest_id, {
-            "status": "failed",
-            "error": str(e),
-            "failed_at": datetime.now().isoformat()
-        })
+        # Where the run stopped, if it got that far
+        last_checkpoint = on_progress.last_checkpoint if on_progress is not None else None
+        with timer.phase("status_persist"):
+            await finish_backtest(backtest_id, {
+                "status": "failed",
+                "error": str(e),
+                "failed_at": datetime.now().isoformat(),
+                "timings": timer.timings,
+                **({"progress": last_checkpoint} if last_checkpoint is not None else {})
+            })
+    
+    finally:
+        # Cancelled runs skip the writes above; the cancel request settles their progress
+        progress_writes.pop(backtest_id, None)
+
+def progress_monitor(backtest_id: str, request: BacktestRequest,
+                     job: Dict[str, Any]) -> ProgressMonitor:
+    """Progress callback storing checkpoints and applying the request's stop rules
+
+    Peers are the other jobs of the same batch unless the rules name a group.
+    """
+    rules = request.stop_rules
+    return ProgressMonitor(
+        rules.model_dump() if rules is not None else None,
+        (rules and rules.peer_group) or job.get("batch_id"),
+        peer_tracker,
+        lambda checkpoint: persist_progress(backtest_id, checkpoint),
+        PROGRESS_PERSIST_SECONDS
+    )
+
+def stored_request(backtest_id: str, job: Dict[str, Any]) -> Optional[BacktestRequest]:
+    """Rebuild the request of a stored backtest, or None if it was not kept"""
+    if job.get("request") is not None:
+        return BacktestRequest(**job["request"])
+    batch = job_store.get_batch(job["batch_id"]) if job.get("batch_id") else None
+    if batch is None or batch.get("request") is None:
+        return None
+    return BacktestRequest(backtest_id=backtest_id, **batch["request"], **job["parameters"])
+
+def recover_backtests() -> List[BacktestRequest]:
+    """Requeue or fail the backtests a previous process left queued or running
+
+    Returns the requests to run again; they resume from their last stored
+    checkpoint where the engine supports it. Jobs interrupted more than
+    RECOVERY_MAX_ATTEMPTS times are failed, so a backtest that brings the
+    service down cannot do so forever.
+    """
+    orphans = job_store.find_by_status(["queued", "running"])
+    now = datetime.now().isoformat()
+    requeued, updates = [], {}
+    # Interrupted runs first, as they may resume part way through
+    for backtest_id, job in sorted(
+        orphans.items(), key=lambda item: (item[1]["status"] != "running", item[1].get("created_at") or "")
+    ):
+        try:
+            request = stored_request(backtest_id, job)
+        except ValueError as e:
+            print(f"Cannot rebuild backtest {backtest_id}: {e}")
+            request = None
+        recoveries = job.get("recoveries", 0) + 1
+        if request is None:
+            error = "Interrupted by a service restart"
+        elif recoveries > RECOVERY_MAX_ATTEMPTS:
+            error = f"Interrupted by {RECOVERY_MAX_ATTEMPTS} service restarts"
+        else:
+            updates[backtest_id] = {"status": "queued", "recoveries": recoveries, "recovered_at": now}
+            requeued.append(request)
+            continue
+        updates[backtest_id] = {"status": "failed", "error": error, "failed_at": now}
+        BACKTESTS_FINISHED.labels("failed").inc()
+    job_store.upsert_many(updates)
+    return requeued
+
+def persist_progress(backtest_id: str, checkpoint: Dict[str, Any]):
+    """Store a progress checkpoint in the background, off the event loop
+
+    A checkpoint arriving while the previous one is still being written is
+    skipped, so writes of one backtest never overtake each other.
+    """
+    pending = progress_writes.get(backtest_id)
+    if pending is not None and not pending.done():
+        return
+    progress_writes[backtest_id] = asyncio.get_running_loop().run_in_executor(
+        None, update_backtest_status, backtest_id, {"progress": checkpoint}
+    )
+
+async def settle_progress(backtest_id: str):
+    """Wait for a backtest's progress write in flight, so it cannot land after its final status"""
+    pending = progress_writes.pop(backtest_id, None)
+    if pending is not None:
+        await asyncio.gather(pending, return_exceptions=True)
+
+async def finish_backtest(backtest_id: str, updates: Dict[str, Any]):
+    """Write the final status of a backtest after its last progress write, unless it already finished"""
+    await settle_progress(backtest_id)
+    await asyncio.to_thread(update_unfinished_status, backtest_id, updates)
+
+def run_signal_backtest(request: BacktestRequest, results_dir: Optional[Path] = None,
+                        timer: Optional[PhaseTimer] = None) -> Dict[str, Any]:
+    """Run a declared signal strategy on the vectorized fast path
+
+    With results_dir, the equity curve is stored there as well.
+    """
+    import numpy as np
+    from artifacts import EQUITY_FILE, write_series
+    from vectorized import backtest_signal, signal_metrics, warmup_bars
+    timer = timer or PhaseTimer()
+    signal = request.signal.model_dump()
+    with timer.phase("data_load"):
+        # Indicators are warmed up on the bars before start_date, where there are any
+        series = get_market_data().load(signal["symbol"], signal["resolution"])
+        lo, hi = series.index_range(request.start_date, request.end_date, warmup_bars(signal))
+        bars = series.slice(request.start_date, request.end_date, warmup_bars(signal))
+        warmup = int(np.searchsorted(bars.time, np.datetime64(request.start_date)))
+    with timer.phase("engine_run"):
+        run = backtest_signal(
+            bars, signal, request.initial_capital, signal["fee_bps"], warmup,
+            get_feature_cache().features(series, lo, hi)
+        )
+    with timer.phase("result_parse"):
+        if results_dir is not None:
+            write_series(results_dir / EQUITY_FILE, bars.time[warmup:], {"equity": run["equity"]})
+        return signal_metrics(bars, run)
+
+async def run_engine(engine: str, on_progress: Optional[ProgressMonitor] = None,
+                     **kwargs) -> Any:
+    """Run an engine function on a warm worker, or in-process without a pool"""
+    if engine_pool is not None:
+        return await engine_pool.run(engine, kwargs, on_progress)
+    if engine == "run_simulator":
+        return await run_simulator(**kwargs, on_progress=on_progress)
+    return await run_lean_engine(
+        kwargs["launcher"],
+        Path(kwargs["engine_dir"]),
+        Path(kwargs["config_file"]),
+        Path(kwargs["log_file"]),
+        kwargs["timeout"],
+        on_progress
+    )
+
+async def run_lean_engine_backtest(backtest_id: str, request: BacktestRequest,
+                                   strategy_file: Path, results_dir: Path,
+                                   on_progress: Optional[ProgressMonitor] = None,
+                                   timer: Optional[PhaseTimer] = None) -> Dict[str, Any]:
+    """Run the real LEAN engine and parse its results"""
+    timer = timer or PhaseTimer()
+    algorithm_class = find_algorithm_class(request.strategy_code)
+    if algorithm_class is None:
+        raise EngineError("Strategy code does not define a QCAlgorithm subclass")
+    
+    config_file = results_dir / "config.json"
+    await asyncio.to_thread(
+        write_lean_config,
+        config_file,
+        algorithm_class,
+        strategy_file,
+        results_dir,
+        DATA_DIR,
+        {
+            "start_date": request.start_date,
+            "end_date": request.end_date,
+            "initial_capital": request.initial_capital,
+            **request.parameters
+        }
+    )
+    
+    with timer.phase("engine_run"):
+        await run_engine(
+            "run_lean_engine",
+            on_progress,
+            launcher=LEAN_LAUNCHER,
+            engine_dir=str(LEAN_ENGINE_DIR),
+            config_file=str(config_file),
+            log_file=str(results_dir / "engine.log"),
+            timeout=ENGINE_TIMEOUT_SECONDS
+        )
+    
+    with timer.phase("result_parse"):
+        results = await asyncio.to_thread(parse_lean_results, backtest_id)
+    if results is None:
+        raise EngineError("LEAN engine finished without readable backtest results")
+    return results
 
 def parse_lean_results(backtest_id: str) -> Optional[Dict[str, Any]]:
-    """Parse results from LEAN CLI output"""
+    """Parse results from LEAN CLI output, streaming series into artifacts"""
+    from lean_results import ingest_lean_results
     results_file = RESULTS_DIR / backtest_id / "backtest-results.json"
     
     if results_file.exists():
         try:
-            with open(results_file, "r") as f:
-                results = json.load(f)
-            
-            # Extract key metrics from LEAN results
-            total_performance = results.get("TotalPerformance", {})
-            
-            return {
-                "totalReturn": total_performance.get("TotalReturn", 0),
-                "sharpeRatio": total_performance.get("SharpeRatio", 0),
-                "maxDrawdown": total_performance.get("Drawdown", 0),
-                "winRate": total_performance.get("WinRate", 0),
-                "finalPortfolioValue": total_performance.get("PortfolioValue", 0),
-                "totalTrades": total_performance.get("TotalTrades", 0),
-                "profitLoss": total_performance.get("TotalProfit", 0)
-            }
+            return ingest_lean_results(results_file)
         except Exception as e:
             print(f"Error parsing results: {e}")
             return None
     
     return None
 
+executor = BacktestExecutor(
+    run_lean_backtest, MAX_WORKERS, MAX_QUEUE_DEPTH, observe_wait=QUEUE_WAIT_SECONDS.observe,
+    reserved_workers=INTERACTIVE_RESERVED_WORKERS, owner_weights=OWNER_WEIGHTS
+)
+dispatcher = QueueDispatcher(
+    job_queue, MAX_QUEUE_DEPTH, JOB_QUEUE_POLL_SECONDS, JOB_QUEUE_LEASE_SECONDS,
+    JOB_QUEUE_MAX_ATTEMPTS, requeue_backtests, fail_lost_backtests
+) if job_queue is not None else None
+status_watcher = StatusWatcher(
+    job_events, job_store.get_many, JOB_QUEUE_POLL_SECONDS
+) if job_queue is not None else None
+register_stats({
+    "executor": (dispatcher or executor).stats,
+    "result_cache": result_cache.stats,
+    "validation_cache": validation_cache.stats,
+    "feature_cache": feature_cache_stats,
+    "retention": retention.stats,
+    "peer_tracker": peer_tracker.stats,
+    **({"engine_pool": engine_pool.stats} if engine_pool is not None else {})
+})
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -0,0 +1,272 @@
+"""
+Columnar market-data store under DATA_DIR.
+
+LEAN bar data (zipped CSV) is converted once into one fixed-width NumPy
+array per column and symbol/resolution:
+
+    DATA_DIR/columnar/<resolution>/<symbol>/{time,open,high,low,close,volume}.npy
+
+Reads go through read-only memory maps, so concurrent backtests share the
+OS page cache instead of each decompressing the same history. Mapped series
+are checked against their LEAN source and stored version at most every
+check_interval seconds, and remapped when either changed.
+"""
+
+import io
+import json
+import shutil
+import threading
+import time
+import uuid
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+RESOLUTIONS = ("daily", "hour", "minute")
+COLUMNS = ("time", "open", "high", "low", "close", "volume")
+COLUMN_DTYPES = {
+    "time": "datetime64[s]",
+    "open": "float64",
+    "high": "float64",
+    "low": "float64",
+    "close": "float64",
+    "volume": "int64",
+}
+
+# LEAN stores equity prices as integers in ten-thousandths of a dollar
+LEAN_PRICE_SCALE = 10000.0
+
+
+class MarketDataError(Exception):
+    """Raised when bar data is missing or malformed"""
+
+
+@dataclass
+class Bars:
+    """Column views over one symbol's bars; arrays may be memory maps"""
+    symbol: str
+    resolution: str
+    time: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    # Identifies the stored version of the series, so derived data can tell it is stale
+    version: str = ""
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def index_range(self, start: Optional[str] = None, end: Optional[str] = None,
+                    warmup: int = 0) -> Tuple[int, int]:
+        """Indices of the bars with start <= time < end, plus up to warmup bars before start"""
+        lo = 0 if start is None else int(np.searchsorted(self.time, np.datetime64(start), "left"))
+        hi = len(self.time) if end is None else int(np.searchsorted(self.time, np.datetime64(end), "left"))
+        return max(0, lo - warmup), hi
+
+    def slice(self, start: Optional[str] = None, end: Optional[str] = None,
+              warmup: int = 0) -> "Bars":
+        """Bars with start <= time < end, plus up to warmup bars before start, as views without copying"""
+        lo, hi = self.index_range(start, end, warmup)
+        return Bars(self.symbol, self.resolution, *(getattr(self, c)[lo:hi] for c in COLUMNS),
+                    version=self.version)
+
+
+class MarketDataStore:
+    """Converts LEAN bar data to columnar arrays and serves memory-mapped reads"""
+
+    def __init__(self, data_dir: Path, check_interval: float = 5.0):
+        self.data_dir = Path(data_dir)
+        self.columnar_dir = self.data_dir / "columnar"
+        self.check_interval = check_interval
+        # Mapped series and when they were last found current
+        self._mapped: Dict[Tuple[str, str], Tuple[Bars, float]] = {}
+        self._lock = threading.Lock()
+        # Per-series locks stop threads converting the same symbol at once
+        self._series_locks: Dict[Tuple[str, str], threading.RLock] = {}
+
+    def _series_dir(self, symbol: str, resolution: str) -> Path:
+        if resolution not in RESOLUTIONS:
+            raise MarketDataError(f"Unknown resolution: {resolution}")
+        return self.columnar_dir / resolution / symbol.lower()
+
+    def _series_lock(self, symbol: str, resolution: str) -> threading.RLock:
+        with self._lock:
+            return self._series_locks.setdefault((symbol.lower(), resolution), threading.RLock())
+
+    def _lean_source(self, symbol: str, resolution: str) -> Path:
+        """Location of the raw LEAN equity data for a symbol"""
+        base = self.data_dir / "equity" / "usa" / resolution
+        if resolution == "minute":
+            return base / symbol.lower()
+        return base / f"{symbol.lower()}.zip"
+
+    def _source_signature(self, source: Path) -> List[List]:
+        """Names, sizes and mtimes of the source files, to detect changes"""
+        files = sorted(source.glob("*.zip")) if source.is_dir() else [source]
+        return [[f.name, f.stat().st_size, f.stat().st_mtime] for f in files]
+
+    def write_bars(self, symbol: str, resolution: str, columns: Dict[str, np.ndarray],
+                   source: Optional[List[List]] = None):
+        """Store bar columns for a symbol, replacing any previous version"""
+        order = np.argsort(columns["time"], kind="stable")
+        target = self._series_dir(symbol, resolution)
+        # Unique, so concurrent writers in other processes never share a staging directory
+        staging = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+        staging.mkdir(parents=True)
+
+        for column in COLUMNS:
+            values = np.asarray(columns[column]).astype(COLUMN_DTYPES[column])[order]
+            np.save(staging / f"{column}.npy", values)
+        with open(staging / "meta.json", "w") as f:
+            json.dump({"symbol": symbol.lower(), "resolution": resolution,
+                       "bars": int(len(order)), "source": source}, f)
+
+        # Swap the new version in; open memory maps keep the old files alive
+        retired = []
+        with self._lock:
+            self._mapped.pop((symbol.lower(), resolution), None)
+            while True:
+                retired.append(target.with_name(f".{target.name}.{uuid.uuid4().hex}.old"))
+                try:
+                    target.rename(retired[-1])
+                except FileNotFoundError:
+                    pass
+                try:
+                    staging.rename(target)
+                    break
+                except OSError:
+                    if not target.exists():
+                        raise
+                    # Another process swapped its version in meanwhile; replace that one
+        for path in retired:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def convert_lean_equity(self, symbol: str, resolution: str) -> int:
+        """Convert LEAN zipped CSV equity bars to the columnar format"""
+        with self._series_lock(symbol, resolution):
+            return self._convert_lean_equity(symbol, resolution)
+
+    def _convert_lean_equity(self, symbol: str, resolution: str) -> int:
+        source = self._lean_source(symbol, resolution)
+        if not source.exists():
+            raise MarketDataError(f"No LEAN {resolution} data for {symbol} at {source}")
+
+        if resolution == "minute":
+            rows, times = [], []
+            for day_file in sorted(source.glob("*_trade.zip")):
+                day = datetime.strptime(day_file.name[:8], "%Y%m%d")
+                data = _read_zipped_csv(day_file)
+                times.append(np.datetime64(day, "s") + data[:, 0].astype("timedelta64[ms]"))
+                rows.append(data[:, 1:])
+            if not rows:
+                raise MarketDataError(f"No minute trade files for {symbol} in {source}")
+            values = np.concatenate(rows)
+            time = np.concatenate(times)
+        else:
+            with zipfile.ZipFile(source) as archive:
+                text = archive.read(archive.namelist()[0]).decode()
+            lines = [line.split(",", 1) for line in text.splitlines() if line]
+            time = np.array(
+                [datetime.strptime(stamp, "%Y%m%d %H:%M") for stamp, _ in lines],
+                dtype="datetime64[s]",
+            )
+            values = np.loadtxt(io.StringIO("\n".join(rest for _, rest in lines)),
+                                delimiter=",", ndmin=2)
+
+        self.write_bars(symbol, resolution, {
+            "time": time,
+            "open": values[:, 0] / LEAN_PRICE_SCALE,
+            "high": values[:, 1] / LEAN_PRICE_SCALE,
+            "low": values[:, 2] / LEAN_PRICE_SCALE,
+            "close": values[:, 3] / LEAN_PRICE_SCALE,
+            "volume": values[:, 4],
+        }, self._source_signature(source))
+        return len(time)
+
+    def is_current(self, symbol: str, resolution: str) -> bool:
+        """True if converted data exists and matches its LEAN source, if any"""
+        meta_file = self._series_dir(symbol, resolution) / "meta.json"
+        if not meta_file.exists():
+            return False
+        source = self._lean_source(symbol, resolution)
+        if not source.exists():
+            return True
+        try:
+            with open(meta_file) as f:
+                return json.load(f).get("source") == self._source_signature(source)
+        except FileNotFoundError:
+            # Swapped out by a concurrent writer
+            return False
+
+    def _stored_version(self, symbol: str, resolution: str) -> str:
+        """Version of the stored series, empty if there is none"""
+        # write_bars swaps in a new directory, so its meta.json changes with every version
+        try:
+            meta = (self._series_dir(symbol, resolution) / "meta.json").stat()
+        except FileNotFoundError:
+            return ""
+        return f"{meta.st_ino}-{meta.st_mtime_ns}"
+
+    def _mapped_bars(self, key: Tuple[str, str]) -> Optional[Bars]:
+        """A mapped series checked within check_interval, or None"""
+        with self._lock:
+            entry = self._mapped.get(key)
+        if entry is not None and time.monotonic() - entry[1] < self.check_interval:
+            return entry[0]
+        return None
+
+    def load(self, symbol: str, resolution: str = "daily") -> Bars:
+        """Memory-map a symbol's bars, converting LEAN data on first use or when it changed"""
+        key = (symbol.lower(), resolution)
+        bars = self._mapped_bars(key)
+        if bars is not None:
+            return bars
+
+        with self._series_lock(symbol, resolution):
+            # Another thread may have loaded or checked it while this one waited
+            bars = self._mapped_bars(key)
+            if bars is not None:
+                return bars
+            if not self.is_current(symbol, resolution):
+                self._convert_lean_equity(symbol, resolution)
+
+            version = self._stored_version(symbol, resolution)
+            with self._lock:
+                entry = self._mapped.get(key)
+            if entry is not None and entry[0].version == version:
+                bars = entry[0]
+            else:
+                series_dir = self._series_dir(symbol, resolution)
+                bars = Bars(symbol.lower(), resolution, *(
+                    np.load(series_dir / f"{column}.npy", mmap_mode="r") for column in COLUMNS
+                ), version=version)
+            with self._lock:
+                self._mapped[key] = (bars, time.monotonic())
+        return bars
+
+    def list_series(self) -> List[Dict]:
+        """Describe every converted symbol/resolution"""
+        series = []
+        for meta_file in sorted(self.columnar_dir.glob("*/*/meta.json")):
+            # Staging and retired versions are hidden
+            if meta_file.parent.name.startswith("."):
+                continue
+            try:
+                with open(meta_file) as f:
+                    meta = json.load(f)
+            except FileNotFoundError:
+                continue
+            series.append({k: meta[k] for k in ("symbol", "resolution", "bars")})
+        return series
+
+
+def _read_zipped_csv(path: Path) -> np.ndarray:
+    with zipfile.ZipFile(path) as archive:
+        with archive.open(archive.namelist()[0]) as f:
+            return np.loadtxt(f, delimiter=",", ndmin=2, dtype="int64")
@@ -0,0 +1,102 @@
+"""
+Performance metrics computed from equity curves and trade lists.
+
+Everything is a NumPy array operation over the whole series, so the cost is
+linear in the number of bars with no Python-level loops, even for
+multi-year minute-resolution curves.
+"""
+
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+# Bars per year, used to annualize ratios
+PERIODS_PER_YEAR = {"daily": 252, "hour": 252 * 7, "minute": 252 * 390}
+
+
+def period_returns(equity: np.ndarray) -> np.ndarray:
+    """Simple returns between consecutive equity values"""
+    return equity[1:] / equity[:-1] - 1.0
+
+
+def drawdown_stats(equity: np.ndarray) -> Dict[str, Any]:
+    """Maximum drawdown (a negative fraction) and the longest time under water in bars"""
+    peak = np.maximum.accumulate(equity)
+    drawdown = equity / peak - 1.0
+    index = np.arange(len(equity))
+    # Bar index of the most recent peak at every bar
+    last_peak = np.maximum.accumulate(np.where(equity >= peak, index, 0))
+    return {
+        "maxDrawdown": float(drawdown.min()),
+        "maxDrawdownDuration": int((index - last_peak).max()),
+    }
+
+
+def rolling_stats(equity: np.ndarray, window: int,
+                  periods_per_year: int = 252) -> Dict[str, np.ndarray]:
+    """Rolling annualized return, volatility and Sharpe over window bars
+
+    Each output has one value per bar after the first; the first window - 1
+    values are NaN.
+    """
+    returns = period_returns(equity)
+    out = {key: np.full(len(returns), np.nan) for key in ("return", "volatility", "sharpe")}
+    if window < 2 or len(returns) < window:
+        return out
+
+    sums = np.cumsum(np.insert(returns, 0, 0.0))
+    squares = np.cumsum(np.insert(returns * returns, 0, 0.0))
+    mean = (sums[window:] - sums[:-window]) / window
+    variance = (squares[window:] - squares[:-window]) / window - mean * mean
+    std = np.sqrt(np.clip(variance, 0.0, None) * window / (window - 1))
+
+    out["return"][window - 1:] = mean * periods_per_year
+    out["volatility"][window - 1:] = std * np.sqrt(periods_per_year)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["sharpe"][window - 1:] = np.where(std > 0, mean / std * np.sqrt(periods_per_year), np.nan)
+    return out
+
+
+def compute_metrics(equity: np.ndarray, trade_pnl: Optional[np.ndarray] = None,
+                    positions: Optional[np.ndarray] = None,
+                    periods_per_year: int = 252) -> Dict[str, Any]:
+    """Summary metrics of a backtest
+
+    equity is the portfolio value per bar, starting with the initial
+    capital. trade_pnl holds the profit or return of each closed trade and
+    positions the allocation held over each bar, if known.
+    """
+    equity = np.asarray(equity, dtype=float)
+    if len(equity) < 2:
+        raise ValueError("An equity curve needs at least two values")
+
+    initial = float(equity[0])
+    final = float(equity[-1])
+    returns = period_returns(equity)
+    mean = returns.mean()
+    std = returns.std(ddof=1) if len(returns) > 1 else 0.0
+    downside = np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2))
+    annualizer = np.sqrt(periods_per_year)
+
+    metrics: Dict[str, Any] = {
+        "totalReturn": final / initial - 1.0,
+        "sharpeRatio": float(mean / std * annualizer) if std > 0 else 0.0,
+        "sortinoRatio": float(mean / downside * annualizer) if downside > 0 else 0.0,
+        "annualVolatility": float(std * annualizer),
+        "finalPortfolioValue": final,
+        "profitLoss": final - initial,
+        **drawdown_stats(equity),
+    }
+
+    trade_pnl = np.asarray(trade_pnl if trade_pnl is not None else [], dtype=float)
+    gross_profit = trade_pnl[trade_pnl > 0].sum()
+    gross_loss = -trade_pnl[trade_pnl < 0].sum()
+    metrics["totalTrades"] = int(len(trade_pnl))
+    metrics["winRate"] = float((trade_pnl > 0).mean()) if len(trade_pnl) else 0.0
+    # Undefined (None) when there are no losing trades
+    metrics["profitFactor"] = float(gross_profit / gross_loss) if gross_loss > 0 else None
+
+    if positions is not None:
+        metrics["exposure"] = float(np.mean(np.asarray(positions) != 0))
+
+    return metrics
@@ -0,0 +1,107 @@
+"""
+Early abort of hopeless backtests.
+
+Engines report progress checkpoints (fraction of the period done, return
+and drawdown so far). A ProgressMonitor checks each checkpoint against the
+job's stop rules and raises JobPruned to stop the run, freeing its worker.
+"""
+
+import bisect
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Any, List, Optional
+
+
+class JobPruned(Exception):
+    """Raised from a progress callback to stop a backtest early"""
+
+
+class PeerTracker:
+    """Running median of peer returns at the pruning checkpoint, per group
+
+    Only the max_groups most recently used groups are kept, so finished
+    batches do not pile up.
+    """
+
+    def __init__(self, max_groups: int = 1000):
+        self.max_groups = max(1, max_groups)
+        self.evictions = 0
+        self._returns: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def median_then_record(self, group: str, value: float, min_peers: int) -> Optional[float]:
+        """Median of the peers seen so far (None if fewer than min_peers), then add value"""
+        with self._lock:
+            returns = self._returns.setdefault(group, [])
+            self._returns.move_to_end(group)
+            while len(self._returns) > self.max_groups:
+                self._returns.popitem(last=False)
+                self.evictions += 1
+            median = None
+            if len(returns) >= min_peers:
+                middle = len(returns) // 2
+                median = returns[middle] if len(returns) % 2 else (returns[middle - 1] + returns[middle]) / 2
+            bisect.insort(returns, value)
+            return median
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "groups": len(self._returns),
+            "max_groups": self.max_groups,
+            "evictions": self.evictions,
+        }
+
+
+class ProgressMonitor:
+    """Applies a job's stop rules to its progress checkpoints"""
+
+    def __init__(self, rules: Optional[Dict[str, Any]], group: Optional[str],
+                 peers: PeerTracker, persist: Callable[[Dict[str, Any]], None],
+                 persist_interval: float = 1.0):
+        self.rules = rules or {}
+        self.group = group
+        self.peers = peers
+        self.persist = persist
+        self.persist_interval = persist_interval
+        self._checked_peers = False
+        self._last_persist = 0.0
+        # Persisting is rate-limited, so the stored checkpoint may be older
+        self.last_checkpoint: Optional[Dict[str, Any]] = None
+
+    def __call__(self, checkpoint: Dict[str, Any]):
+        self.last_checkpoint = checkpoint
+        now = time.monotonic()
+        if now - self._last_persist >= self.persist_interval:
+            self._last_persist = now
+            self.persist(checkpoint)
+
+        reason = self.stop_reason(checkpoint)
+        if reason is not None:
+            self.persist(checkpoint)
+            raise JobPruned(reason)
+
+    def stop_reason(self, checkpoint: Dict[str, Any]) -> Optional[str]:
+        fraction = checkpoint.get("fraction", 0.0)
+        total_return = checkpoint.get("return", 0.0)
+        drawdown = checkpoint.get("drawdown", 0.0)
+
+        max_drawdown = self.rules.get("max_drawdown")
+        if max_drawdown is not None and drawdown < max_drawdown:
+            return f"Drawdown {drawdown:.1%} passed the {max_drawdown:.1%} limit at {fraction:.0%} of the period"
+
+        if self._checked_peers or fraction < self.rules.get("checkpoint", 0.5):
+            return None
+        self._checked_peers = True
+
+        min_return = self.rules.get("min_return")
+        if min_return is not None and total_return < min_return:
+            return f"Return {total_return:.1%} below {min_return:.1%} at {fraction:.0%} of the period"
+
+        if self.rules.get("below_peer_median") and self.group is not None:
+            median = self.peers.median_then_record(
+                self.group, total_return, self.rules.get("min_peers", 3)
+            )
+            if median is not None and total_return < median:
+                return f"Return {total_return:.1%} below the peer median {median:.1%} at {fraction:.0%} of the period"
+        return None
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Worker process for the shared backtest queue.
+
+Claims backtests that the service (started with JOB_QUEUE set) has queued,
+runs them with the service's engine code and writes their status and
+results to the shared job store. Run any number of workers, on one host or
+several; they read the same configuration as the service, and on several
+hosts need JOB_QUEUE=postgres, JOB_STORE=postgres and a shared
+LEAN_RESULTS_DIR.
+"""
+
+import argparse
+import asyncio
+import signal
+import sys
+import time
+from typing import Dict, Any, Optional, Set
+
+import main
+from job_queue import JobQueue, default_worker_id
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=main.MAX_WORKERS,
+                        help="Backtests to run at once")
+    parser.add_argument("--worker-id", default=default_worker_id(),
+                        help="Name reported in heartbeats, unique per worker")
+    return parser.parse_args()
+
+
+class QueueWorker:
+    """Runs claimed backtests on a fixed number of slots, heartbeating their leases"""
+
+    def __init__(self, queue: JobQueue, worker_id: str, slots: int,
+                 lease_seconds: float, poll_interval: float):
+        self.queue = queue
+        self.worker_id = worker_id
+        self.slots = max(1, slots)
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.completed = 0
+        self.avg_duration: Optional[float] = None
+        self._active: Dict[str, asyncio.Task] = {}
+        self._stopping = False
+
+    def info(self) -> Dict[str, Any]:
+        """Load reported with every heartbeat"""
+        return {
+            "slots": self.slots,
+            "running": len(self._active),
+            "completed": self.completed,
+            "avg_duration": self.avg_duration,
+        }
+
+    async def run(self, stop: asyncio.Event):
+        """Work until stop is set, then hand unfinished backtests back to the queue"""
+        tasks = [asyncio.create_task(self._slot()) for _ in range(self.slots)]
+        tasks.append(asyncio.create_task(self._heartbeat()))
+        await stop.wait()
+
+        self._stopping = True
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        released = await asyncio.to_thread(self.queue.release, self.worker_id)
+        for backtest_id in released:
+            await asyncio.to_thread(main.update_backtest_status, backtest_id, {"status": "queued"})
+        if released:
+            print(f"Released {len(released)} backtests back to the queue")
+
+    async def _slot(self):
+        while True:
+            try:
+                claimed = await asyncio.to_thread(self.queue.claim, self.worker_id, self.lease_seconds)
+            except Exception as e:
+                print(f"Error claiming from the job queue: {e}")
+                claimed = None
+            if claimed is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            backtest_id, payload = claimed
+            await self._run(backtest_id, payload)
+
+    async def _run(self, backtest_id: str, payload: Dict[str, Any]):
+        started = time.monotonic()
+        request = main.BacktestRequest(**payload["request"])
+        task = asyncio.create_task(main.run_lean_backtest(backtest_id, request))
+        self._active[backtest_id] = task
+        try:
+            await task
+        except asyncio.CancelledError:
+            # Only the backtest was cancelled; keep the slot alive
+            if self._stopping or not task.cancelled():
+                raise
+        finally:
+            self._active.pop(backtest_id, None)
+        # A no-op if the lease was lost and the job now belongs to another worker
+        await asyncio.to_thread(self.queue.complete, backtest_id, self.worker_id)
+        duration = time.monotonic() - started
+        self.completed += 1
+        self.avg_duration = duration if self.avg_duration is None else \
+            0.8 * self.avg_duration + 0.2 * duration
+
+    async def _heartbeat(self):
+        while True:
+            backtest_ids = list(self._active)
+            try:
+                held: Set[str] = await asyncio.to_thread(
+                    self.queue.heartbeat, self.worker_id, backtest_ids,
+                    self.lease_seconds, self.info()
+                )
+            except Exception as e:
+                print(f"Error sending heartbeat: {e}")
+            else:
+                # Cancelled, or requeued after a missed lease; stop working on it
+                for backtest_id in set(backtest_ids) - held:
+                    task = self._active.get(backtest_id)
+                    if task is not None:
+                        task.cancel()
+            await asyncio.sleep(self.lease_seconds / 3)
+
+
+async def serve(args) -> int:
+    if main.job_queue is None:
+        print("❌ JOB_QUEUE is not set, there is no queue to work on")
+        return 1
+    worker = QueueWorker(
+        main.job_queue, args.worker_id, args.concurrency,
+        main.JOB_QUEUE_LEASE_SECONDS, main.JOB_QUEUE_POLL_SECONDS
+    )
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await asyncio.to_thread(main.create_directories)
+    if main.engine_pool is not None:
+        await main.engine_pool.start()
+    print(f"👷 Worker {args.worker_id} running {worker.slots} backtests at once "
+          f"from the {main.JOB_QUEUE} queue")
+    try:
+        await worker.run(stop)
+    finally:
+        if main.engine_pool is not None:
+            await main.engine_pool.stop()
+        main.job_queue.close()
+        main.job_store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(serve(parse_args())))
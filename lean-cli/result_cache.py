@@ -0,0 +1,150 @@
+"""
+Content-addressed cache of backtest results.
+
+Results are keyed on a hash of the normalized strategy code and the
+parameters that affect a run, so resubmitting an identical backtest under
+a new backtest_id can be answered without running the engine again.
+With a shared job queue, a SharedResultCache keeps the entries in the job
+store as well, so the service sees results that queue workers stored.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+
+def normalize_strategy_code(strategy_code: str) -> str:
+    """Normalize line endings and trailing whitespace that do not change behaviour"""
+    lines = strategy_code.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip("\n")
+
+
+def strategy_hash(strategy_code: str) -> str:
+    """Identity of a strategy, shared by backtests of the same code"""
+    return hashlib.sha256(normalize_strategy_code(strategy_code).encode()).hexdigest()
+
+
+def result_cache_key(strategy_code: str, start_date: str, end_date: str,
+                     initial_capital: float, parameters: Dict[str, Any],
+                     engine_version: str) -> str:
+    """Hash everything that determines the outcome of a backtest"""
+    payload = json.dumps({
+        "code": normalize_strategy_code(strategy_code),
+        "start_date": start_date,
+        "end_date": end_date,
+        "initial_capital": float(initial_capital),
+        "parameters": parameters,
+        "engine_version": engine_version,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    """LRU cache of results bounded by entry count and total size"""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return cached results and mark them recently used, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return json.loads(entry[0])
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return the cached results of those of keys that have any"""
+        cached = {}
+        for key in keys:
+            results = self.get(key)
+            if results is not None:
+                cached[key] = results
+        return cached
+
+    def put(self, key: str, results: Dict[str, Any]):
+        """Store results, evicting least recently used entries to stay in bounds"""
+        encoded = json.dumps(results)
+        size = len(encoded)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous[1]
+            self._entries[key] = (encoded, size)
+            self.total_bytes += size
+
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class SharedResultCache(ResultCache):
+    """ResultCache in front of the result cache table of a shared job store
+
+    Local misses are looked up in the store, and every put is written
+    through to it, so all processes using the store share the entries.
+    """
+
+    def __init__(self, store, max_entries: int, max_bytes: int):
+        super().__init__(max_entries, max_bytes)
+        self.store = store
+        self.shared_hits = 0
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        cached, missing = {}, []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    missing.append(key)
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                cached[key] = json.loads(entry[0])
+        shared = self.store.get_cached_results(missing) if missing else {}
+        with self._lock:
+            self.hits += len(shared)
+            self.shared_hits += len(shared)
+            self.misses += len(missing) - len(shared)
+        for key, results in shared.items():
+            super().put(key, results)
+        return {**cached, **shared}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([key]).get(key)
+
+    def put(self, key: str, results: Dict[str, Any]):
+        super().put(key, results)
+        self.store.put_cached_results(key, results, self.max_entries)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "shared_hits": self.shared_hits}
@@ -0,0 +1,310 @@
+"""
+Retention of finished backtests.
+
+The serving path keeps every strategy directory, result directory and job
+record. A RetentionManager applies the retention policy in the background,
+in a thread off the event loop:
+
+- finished backtests older than max_age_days, beyond the keep_per_strategy
+  newest of their strategy, or the oldest ones while the directories exceed
+  max_disk_bytes are compacted: their result directory is deleted and only
+  the summary metrics stay in the job store
+- job records older than delete_after_days are deleted altogether
+- strategy directories older than strategy_max_age_days that no queued or
+  running backtest uses are removed
+
+A zero setting disables that policy. While any policy is set, the
+strategy files of finished backtests are also hard-linked to one copy per
+content hash; strategy files are always replaced rather than rewritten in
+place, so rewriting one never changes its twins.
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Set
+
+from job_store import JobStore
+
+FINISHED_STATUSES = ["completed", "failed", "cancelled", "pruned"]
+ACTIVE_STATUSES = ["queued", "running"]
+STRATEGY_FILE = "strategy.py"
+# Strategy files are stored here once per content hash; the dot keeps it apart from job names
+OBJECTS_DIR = ".objects"
+# Batch strategy files are written before their jobs are stored; leave fresh ones alone
+STRATEGY_GRACE_SECONDS = 600
+SCAN_PAGE_SIZE = 1000
+
+
+def dir_size(path: Path) -> int:
+    """Bytes of the files under path, counting hard-linked files once"""
+    total = 0
+    seen = set()
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                stat = os.stat(os.path.join(root, name))
+            except FileNotFoundError:
+                continue
+            if (stat.st_dev, stat.st_ino) not in seen:
+                seen.add((stat.st_dev, stat.st_ino))
+                total += stat.st_size
+    return total
+
+
+def unshared_size(path: Path) -> int:
+    """Bytes freed by deleting path: files with no hard link outside it"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                stat = os.stat(os.path.join(root, name))
+            except FileNotFoundError:
+                continue
+            if stat.st_nlink == 1:
+                total += stat.st_size
+    return total
+
+
+def parse_created_at(job: Dict[str, Any]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(job["created_at"]).replace(tzinfo=None)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class RetentionManager:
+    """Periodically compacts and deletes finished backtests and their files"""
+
+    def __init__(self, store: JobStore, strategies_dir: Path, results_dir: Path,
+                 interval: float, max_age_days: float = 0, keep_per_strategy: int = 0,
+                 max_disk_bytes: int = 0, delete_after_days: float = 0,
+                 strategy_max_age_days: float = 0):
+        self.store = store
+        self.strategies_dir = Path(strategies_dir)
+        self.results_dir = Path(results_dir)
+        self.interval = interval
+        self.max_age_days = max_age_days
+        self.keep_per_strategy = keep_per_strategy
+        self.max_disk_bytes = max_disk_bytes
+        self.delete_after_days = delete_after_days
+        self.strategy_max_age_days = strategy_max_age_days
+        self._totals = Counter()
+        self._last_run: Dict[str, Any] = {}
+        self._run_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return any((self.max_age_days, self.keep_per_strategy, self.max_disk_bytes,
+                    self.delete_after_days, self.strategy_max_age_days))
+
+    async def start(self):
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.run)
+            except Exception as e:
+                print(f"Error applying retention policy: {e}")
+
+    def run(self) -> Dict[str, Any]:
+        """Apply the retention policy once and return what it reclaimed"""
+        with self._run_lock:
+            started = time.monotonic()
+            report = Counter()
+            self._retain_results(report)
+            self._retain_strategies(report)
+            report = {
+                "compacted": report["compacted"],
+                "deleted": report["deleted"],
+                "strategies_removed": report["strategies_removed"],
+                "strategies_deduplicated": report["strategies_deduplicated"],
+                "reclaimed_bytes": report["reclaimed_bytes"],
+            }
+            self._totals.update(report)
+            self._totals["runs"] += 1
+            self._last_run = {
+                **report,
+                "finished_at": datetime.now().isoformat(),
+                "duration_seconds": time.monotonic() - started,
+                "disk_bytes": dir_size(self.results_dir) + dir_size(self.strategies_dir),
+            }
+            return self._last_run
+
+    def _finished_jobs(self) -> List[tuple]:
+        """(backtest_id, job) of every finished backtest, newest first, without result payloads"""
+        jobs = []
+        after = None
+        while True:
+            page = self.store.list_jobs(FINISHED_STATUSES, None, SCAN_PAGE_SIZE, after, True)
+            jobs.extend(page)
+            if len(page) < SCAN_PAGE_SIZE:
+                return jobs
+            backtest_id, job = page[-1]
+            after = (job.get("created_at") or "", backtest_id)
+
+    def _retain_results(self, report: Counter):
+        now = datetime.now()
+        delete_before = now - timedelta(days=self.delete_after_days) if self.delete_after_days else None
+        compact_before = now - timedelta(days=self.max_age_days) if self.max_age_days else None
+        per_strategy = Counter()
+        to_delete, to_compact, kept = [], [], []
+
+        for backtest_id, job in self._finished_jobs():
+            created_at = parse_created_at(job)
+            strategy = job.get("strategy_hash") or job.get("batch_id") or backtest_id
+            per_strategy[strategy] += 1
+            if delete_before is not None and created_at is not None and created_at < delete_before:
+                to_delete.append(backtest_id)
+            elif (job.get("compacted_at") or "") >= (job.get("created_at") or ""):
+                # Compacted, and not resubmitted under the same ID since
+                continue
+            elif compact_before is not None and created_at is not None and created_at < compact_before:
+                to_compact.append(backtest_id)
+            elif self.keep_per_strategy and per_strategy[strategy] > self.keep_per_strategy:
+                to_compact.append(backtest_id)
+            else:
+                kept.append(backtest_id)
+
+        if self.max_disk_bytes:
+            sizes = {backtest_id: dir_size(self.results_dir / backtest_id) for backtest_id in kept}
+            excess = dir_size(self.results_dir) + dir_size(self.strategies_dir) - self.max_disk_bytes
+            excess -= sum(dir_size(self.results_dir / backtest_id) for backtest_id in to_compact + to_delete)
+            # kept is newest first
+            for backtest_id in reversed(kept):
+                if excess <= 0:
+                    break
+                if sizes[backtest_id]:
+                    to_compact.append(backtest_id)
+                    excess -= sizes[backtest_id]
+
+        for backtest_id in to_compact:
+            # It may have been resubmitted under the same ID since the scan
+            job = self.store.get(backtest_id)
+            if job is None or job.get("status") not in FINISHED_STATUSES:
+                continue
+            report["reclaimed_bytes"] += self._remove_results(backtest_id)
+            self.store.upsert(backtest_id, {
+                "request": None,
+                "progress": None,
+                "compacted_at": datetime.now().isoformat(),
+            })
+            report["compacted"] += 1
+
+        if to_delete:
+            for backtest_id in to_delete:
+                report["reclaimed_bytes"] += self._remove_results(backtest_id)
+            report["deleted"] += self.store.delete_many(to_delete)
+
+    def _remove_results(self, backtest_id: str) -> int:
+        results_dir = self.results_dir / backtest_id
+        if not results_dir.is_dir():
+            return 0
+        size = dir_size(results_dir)
+        shutil.rmtree(results_dir, ignore_errors=True)
+        return size
+
+    def _retain_strategies(self, report: Counter):
+        if not self.strategies_dir.is_dir():
+            return
+        active: Set[str] = set()
+        for backtest_id, job in self.store.find_by_status(ACTIVE_STATUSES).items():
+            active.add(backtest_id)
+            if job.get("batch_id"):
+                active.add(job["batch_id"])
+
+        objects_dir = self.strategies_dir / OBJECTS_DIR
+        max_age = max(self.strategy_max_age_days * 86400, STRATEGY_GRACE_SECONDS)
+        fresh_after = time.time() - max_age
+        for strategy_dir in self.strategies_dir.iterdir():
+            if strategy_dir.name == OBJECTS_DIR or not strategy_dir.is_dir():
+                continue
+            try:
+                fresh = strategy_dir.stat().st_mtime > fresh_after
+            except FileNotFoundError:
+                continue
+            if strategy_dir.name in active:
+                continue
+            if self.strategy_max_age_days and not fresh:
+                report["reclaimed_bytes"] += unshared_size(strategy_dir)
+                shutil.rmtree(strategy_dir, ignore_errors=True)
+                report["strategies_removed"] += 1
+                continue
+            if not self.enabled:
+                continue
+            strategy_file = strategy_dir / STRATEGY_FILE
+            try:
+                if strategy_file.stat().st_nlink == 1:
+                    report["reclaimed_bytes"] += self._deduplicate(strategy_file, objects_dir)
+                    report["strategies_deduplicated"] += 1
+            except FileNotFoundError:
+                pass
+
+        # Objects no strategy directory links to any more
+        if objects_dir.is_dir():
+            for stored in objects_dir.iterdir():
+                try:
+                    stat = stored.stat()
+                except FileNotFoundError:
+                    continue
+                if stat.st_nlink == 1:
+                    stored.unlink()
+                    report["reclaimed_bytes"] += stat.st_size
+
+    def _deduplicate(self, strategy_file: Path, objects_dir: Path) -> int:
+        """Hard-link a strategy file to the stored copy of its content, returning bytes freed"""
+        content = strategy_file.read_bytes()
+        digest = hashlib.sha256(content).hexdigest()
+        stored = objects_dir / f"{digest}.py"
+        objects_dir.mkdir(exist_ok=True)
+        try:
+            intact = hashlib.sha256(stored.read_bytes()).hexdigest() == digest
+        except FileNotFoundError:
+            intact = False
+        if not intact:
+            # Missing, or changed since it was stored: this file becomes the stored copy
+            staging = objects_dir / f".{uuid.uuid4().hex}.tmp"
+            os.link(strategy_file, staging)
+            os.replace(staging, stored)
+            return 0
+        # Swapped in atomically, so a running engine never sees the file missing
+        staging = strategy_file.with_name(f".{uuid.uuid4().hex}.tmp")
+        os.link(stored, staging)
+        os.replace(staging, strategy_file)
+        return len(content)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": self.interval,
+            "policies": {
+                "max_age_days": self.max_age_days,
+                "keep_per_strategy": self.keep_per_strategy,
+                "max_disk_bytes": self.max_disk_bytes,
+                "delete_after_days": self.delete_after_days,
+                "strategy_max_age_days": self.strategy_max_age_days,
+            },
+            "runs": self._totals["runs"],
+            "compacted": self._totals["compacted"],
+            "deleted": self._totals["deleted"],
+            "strategies_removed": self._totals["strategies_removed"],
+            "strategies_deduplicated": self._totals["strategies_deduplicated"],
+            "reclaimed_bytes": self._totals["reclaimed_bytes"],
+            "last_run": self._last_run or None,
+        }
@@ -0,0 +1,198 @@
+"""
+Fair-share scheduling of queued backtests.
+
+Every job has an owner and a priority class. Interactive jobs run before
+bulk ones, and bulk jobs never take the last reserved_slots workers, so an
+interactive run does not wait for a sweep to drain. Within a class, owners
+share the workers in proportion to their weight: an owner's virtual time
+advances by the worker time its jobs use divided by its weight, and the
+owner furthest behind goes next. Within an owner, higher priority runs
+first, FIFO within a priority.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+# In the order they are served
+PRIORITY_CLASSES = ("interactive", "bulk")
+# Claim priorities of the shared job queue hold the class above the job's own priority
+CLASS_PRIORITY_SPAN = 1_000_000
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """Owner weights from "alice=2,bob=0.5"; owners not listed weigh 1"""
+    weights = {}
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        owner, _, weight = entry.partition("=")
+        weights[owner.strip()] = float(weight)
+    return weights
+
+
+def claim_priority(priority_class: str, priority: int) -> int:
+    """Single priority ordering shared-queue claims by class, then by the job's priority"""
+    bound = CLASS_PRIORITY_SPAN // 2 - 1
+    rank = len(PRIORITY_CLASSES) - 1 - PRIORITY_CLASSES.index(priority_class)
+    return rank * CLASS_PRIORITY_SPAN + max(-bound, min(bound, priority))
+
+
+@dataclass
+class ScheduledJob:
+    job_id: str
+    args: Tuple[Any, ...]
+    owner: str
+    priority_class: str
+    priority: int
+    submitted: float
+    # Worker time charged to the owner at dispatch, corrected once the job finishes
+    estimate: float = 0.0
+
+
+class FairShareQueue:
+    """Queue handing jobs to max_slots workers by class, owner share and priority
+
+    Used from the event loop only, like asyncio.Queue.
+    """
+
+    def __init__(self, max_slots: int, reserved_slots: int,
+                 weights: Optional[Dict[str, float]] = None,
+                 estimate: Callable[[], float] = lambda: 1.0):
+        self.max_slots = max(1, max_slots)
+        # Bulk jobs always get at least one worker
+        self.reserved_slots = max(0, min(reserved_slots, self.max_slots - 1))
+        self.weights = weights or {}
+        self.estimate = estimate
+        self._queues: Dict[Tuple[str, str], List[Tuple[int, int, ScheduledJob]]] = {}
+        self._vtime: Dict[Tuple[str, str], float] = {}
+        self._where: Dict[str, Tuple[str, str]] = {}
+        self._running = Counter()
+        self._owners: Dict[str, Counter] = {}
+        self._sequence = itertools.count()
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def qsize(self) -> int:
+        return len(self._where)
+
+    def _weight(self, owner: str) -> float:
+        return self.weights.get(owner, 1.0)
+
+    def _owner(self, owner: str) -> Counter:
+        return self._owners.setdefault(owner, Counter())
+
+    def put(self, job: ScheduledJob):
+        """Queue a job, replacing a queued job with the same ID"""
+        self.remove(job.job_id)
+        key = (job.priority_class, job.owner)
+        queue = self._queues.setdefault(key, [])
+        if not queue:
+            # An owner returning from idle starts level with the others instead of banking credit
+            active = [
+                self._vtime[k] for k, q in self._queues.items()
+                if q and k[0] == job.priority_class
+            ]
+            self._vtime[key] = max(self._vtime.get(key, 0.0), min(active, default=0.0))
+        heapq.heappush(queue, (-job.priority, next(self._sequence), job))
+        self._where[job.job_id] = key
+        self._owner(job.owner)["queued"] += 1
+        self._notify()
+
+    def remove(self, job_id: str) -> bool:
+        """Drop a queued job; False if it is not queued"""
+        key = self._where.pop(job_id, None)
+        if key is None:
+            return False
+        queue = self._queues[key]
+        queue[:] = [entry for entry in queue if entry[2].job_id != job_id]
+        heapq.heapify(queue)
+        self._owner(key[1])["queued"] -= 1
+        return True
+
+    def _pick(self) -> Optional[ScheduledJob]:
+        for priority_class in PRIORITY_CLASSES:
+            if priority_class != PRIORITY_CLASSES[0] and \
+                    self._running[priority_class] >= self.max_slots - self.reserved_slots:
+                continue
+            keys = [k for k, q in self._queues.items() if q and k[0] == priority_class]
+            if not keys:
+                continue
+            # Ties go to the owner whose next job was submitted first
+            key = min(keys, key=lambda k: (self._vtime[k], self._queues[k][0][1]))
+            _, _, job = heapq.heappop(self._queues[key])
+            self._where.pop(job.job_id, None)
+            job.estimate = self.estimate()
+            self._vtime[key] += job.estimate / self._weight(job.owner)
+            self._running[priority_class] += 1
+            stats = self._owner(job.owner)
+            wait = time.monotonic() - job.submitted
+            stats["queued"] -= 1
+            stats["running"] += 1
+            stats["started"] += 1
+            stats["wait_seconds"] += wait
+            stats["max_wait_seconds"] = max(stats["max_wait_seconds"], wait)
+            return job
+        return None
+
+    async def get(self) -> ScheduledJob:
+        """Wait for the next job this worker may run"""
+        while True:
+            job = self._pick()
+            if job is not None:
+                return job
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    def done(self, job: ScheduledJob, duration: float):
+        """Account a finished job's actual worker time and free its slot"""
+        key = (job.priority_class, job.owner)
+        self._vtime[key] += (duration - job.estimate) / self._weight(job.owner)
+        self._running[job.priority_class] -= 1
+        self._owner(job.owner)["running"] -= 1
+        self._notify()
+
+    def _notify(self):
+        # Every waiting worker looks again; those with nothing they may run wait on
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        oldest: Dict[str, float] = {}
+        queued_by_class = Counter()
+        for (priority_class, owner), queue in self._queues.items():
+            queued_by_class[priority_class] += len(queue)
+            for _, _, job in queue:
+                oldest[owner] = max(oldest.get(owner, 0.0), now - job.submitted)
+        return {
+            "classes": {
+                priority_class: {
+                    "queued": queued_by_class[priority_class],
+                    "running": self._running[priority_class],
+                }
+                for priority_class in PRIORITY_CLASSES
+            },
+            "owners": {
+                owner or "anonymous": {
+                    "weight": self._weight(owner),
+                    "queued": stats["queued"],
+                    "running": stats["running"],
+                    "started": stats["started"],
+                    "avg_wait_seconds": stats["wait_seconds"] / stats["started"] if stats["started"] else 0.0,
+                    "max_wait_seconds": stats["max_wait_seconds"],
+                    "oldest_queued_seconds": oldest.get(owner, 0.0),
+                }
+                for owner, stats in self._owners.items()
+            },
+        }
@@ -0,0 +1,101 @@
+"""
+Prometheus metrics and per-job phase timings.
+
+Request latency, backtest phase durations, queue wait and job store
+latency are recorded as histograms. Executor, cache and worker pool
+statistics are read from their stats() methods at scrape time.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Optional
+
+from prometheus_client import Counter, Histogram, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+
+# Latency buckets in seconds, from sub-millisecond store calls to long engine runs
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0
+)
+
+HTTP_REQUESTS = Counter(
+    "lean_cli_http_requests_total", "HTTP requests handled",
+    ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "lean_cli_http_request_duration_seconds", "Time to produce an HTTP response",
+    ["method", "route"], buckets=LATENCY_BUCKETS
+)
+PHASE_SECONDS = Histogram(
+    "lean_cli_backtest_phase_seconds", "Time spent in each phase of a backtest",
+    ["phase"], buckets=LATENCY_BUCKETS
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "lean_cli_backtest_queue_wait_seconds", "Time backtests wait in the executor queue",
+    buckets=LATENCY_BUCKETS
+)
+BACKTESTS_FINISHED = Counter(
+    "lean_cli_backtests_finished_total", "Backtests that reached a terminal status",
+    ["status"]
+)
+JOB_STORE_LATENCY = Histogram(
+    "lean_cli_job_store_operation_seconds", "Latency of job store operations",
+    ["operation"], buckets=LATENCY_BUCKETS
+)
+
+
+class PhaseTimer:
+    """Times the phases of one backtest, keeping the totals for its status"""
+
+    def __init__(self, timings: Optional[Dict[str, float]] = None):
+        self.timings: Dict[str, float] = dict(timings or {})
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+            PHASE_SECONDS.labels(phase=name).observe(elapsed)
+
+
+class InstrumentedJobStore:
+    """Wraps a JobStore and records the latency of every operation"""
+
+    def __init__(self, store):
+        self._store = store
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._store, name)
+        if not callable(attr):
+            return attr
+        histogram = JOB_STORE_LATENCY.labels(operation=name)
+
+        def timed(*args, **kwargs):
+            with histogram.time():
+                return attr(*args, **kwargs)
+        return timed
+
+
+class StatsCollector:
+    """Exports numeric values of stats() dicts as gauges at scrape time"""
+
+    def __init__(self, sources: Dict[str, Callable[[], Dict[str, Any]]]):
+        self.sources = sources
+
+    def collect(self):
+        for source, stats in self.sources.items():
+            for key, value in stats().items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                yield GaugeMetricFamily(
+                    f"lean_cli_{source}_{key}", f"{source} {key.replace('_', ' ')}", value=value
+                )
+
+
+def register_stats(sources: Dict[str, Callable[[], Dict[str, Any]]]):
+    """Export stats() snapshots from the given sources on /metrics"""
+    REGISTRY.register(StatsCollector(sources))
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Equity artifact test for the LEAN CLI service
+
+Stores a chunked equity curve and checks that ranged and downsampled reads,
+directly and through GET /backtest/{id}/equity, return exactly the points
+a full read would.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+WORKDIR = tempfile.mkdtemp(prefix="test_artifacts_")
+# The service reads its configuration at import time
+os.environ.update({
+    "ENGINE_MODE": "simulator",
+    "JOB_STORE": "memory",
+    "LEAN_STRATEGIES_DIR": os.path.join(WORKDIR, "strategies"),
+    "LEAN_RESULTS_DIR": os.path.join(WORKDIR, "results"),
+    "LEAN_DATA_DIR": os.path.join(WORKDIR, "data"),
+})
+
+import httpx  # noqa: E402
+import main as service  # noqa: E402
+from artifacts import EQUITY_FILE, read_series, write_series  # noqa: E402
+
+POINTS = 1000
+CHUNK_SIZE = 64
+TIME = np.datetime64("2020-01-01T00:00:00") + np.arange(POINTS) * np.timedelta64(1, "h")
+EQUITY = 100000.0 + np.arange(POINTS, dtype=float)
+
+
+def stored_series(directory: Path) -> Path:
+    path = directory / EQUITY_FILE
+    write_series(path, TIME, {"equity": EQUITY}, chunk_size=CHUNK_SIZE)
+    return path
+
+
+def expected(start=None, end=None) -> np.ndarray:
+    mask = np.ones(POINTS, dtype=bool)
+    if start is not None:
+        mask &= TIME >= np.datetime64(start)
+    if end is not None:
+        mask &= TIME <= np.datetime64(end)
+    return EQUITY[mask]
+
+
+def test_ranged_reads():
+    """Ranges inside one chunk, across chunks and outside the series match a full read"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = stored_series(Path(tmp))
+        full = read_series(path)
+        assert (full["time"] == TIME).all() and (full["equity"] == EQUITY).all()
+        for start, end in [
+            ("2020-01-01T05:00:00", "2020-01-01T10:00:00"),
+            ("2020-01-03T00:00:00", "2020-01-20T17:00:00"),
+            ("2020-01-02T15:00:00", None),
+            (None, "2020-01-01T00:00:00"),
+        ]:
+            series = read_series(path, start, end)
+            assert (series["equity"] == expected(start, end)).all(), (start, end)
+            assert len(series["time"]) == len(series["equity"]), (start, end)
+        empty = read_series(path, "2021-01-01", "2021-02-01")
+        assert len(empty["time"]) == 0 and len(empty["equity"]) == 0, empty
+
+
+def test_downsampled_reads():
+    """Downsampling keeps at most the requested points, evenly spaced and ending with the last one"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = stored_series(Path(tmp))
+        series = read_series(path, "2020-01-02T00:00:00", None, downsample=50)
+        points = expected("2020-01-02T00:00:00")
+        assert len(series["equity"]) == 50, len(series["equity"])
+        assert series["equity"][0] == points[0] and series["equity"][-1] == points[-1]
+        assert (np.diff(series["equity"]) > 0).all()
+        assert len(read_series(path, None, "2020-01-01T09:00:00", downsample=50)["equity"]) == 10
+
+
+def test_equity_endpoint():
+    """The endpoint serves ranged reads of a backtest's stored curve and 404s without one"""
+    directory = service.RESULTS_DIR / "ranged"
+    directory.mkdir(parents=True, exist_ok=True)
+    stored_series(directory)
+
+    async def get(url, params):
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            return await c.get(url, params=params)
+
+    params = {"from": "2020-01-05T00:00:00", "to": "2020-01-06T00:00:00"}
+    body = asyncio.run(get("/backtest/ranged/equity", params)).json()
+    assert body["points"] == 25 and body["equity"] == expected(params["from"], params["to"]).tolist(), body
+    assert body["time"][0] == "2020-01-05T00:00:00", body["time"][0]
+    assert asyncio.run(get("/backtest/missing/equity", {})).status_code == 404
+
+
+def main():
+    """Run the equity artifact tests"""
+    print("🚀 Starting equity artifact test")
+    print("=" * 50)
+    try:
+        test_ranged_reads()
+        test_downsampled_reads()
+        test_equity_endpoint()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("✅ Ranged equity reads return exactly the requested points")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
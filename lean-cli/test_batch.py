@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Batch expansion test for the LEAN CLI service
+
+Checks that a batch lists its explicit jobs followed by the cartesian
+product of its grid, and that empty or oversized batches are rejected
+before anything is stored.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+WORKDIR = tempfile.mkdtemp(prefix="test_batch_")
+# The service reads its configuration at import time
+os.environ.update({
+    "ENGINE_MODE": "simulator",
+    "JOB_STORE": "memory",
+    "LEAN_STRATEGIES_DIR": os.path.join(WORKDIR, "strategies"),
+    "LEAN_RESULTS_DIR": os.path.join(WORKDIR, "results"),
+    "LEAN_DATA_DIR": os.path.join(WORKDIR, "data"),
+})
+
+import httpx  # noqa: E402
+import main as service  # noqa: E402
+
+STRATEGY_CODE = """
+from AlgorithmImports import *
+
+class Batched(QCAlgorithm):
+    def Initialize(self):
+        self.SetCash(100000)
+        self.AddEquity("SPY")
+"""
+
+
+def batch(**fields) -> service.BatchBacktestRequest:
+    return service.BatchBacktestRequest(batch_id="grid", strategy_code=STRATEGY_CODE, **fields)
+
+
+def test_grid_expansion():
+    """Explicit jobs come first, then every combination of the grid in order"""
+    jobs = service.expand_batch(batch(
+        jobs=[{"initial_capital": 5000.0}],
+        grid={"end_date": ["2021-01-01", "2022-01-01"], "parameters": {"fast": [5, 10], "slow": [50]}},
+    ))
+    assert [job.model_dump() for job in jobs] == [
+        {"start_date": "2020-01-01", "end_date": "2021-01-01", "initial_capital": 5000.0, "parameters": {}},
+        {"start_date": "2020-01-01", "end_date": "2021-01-01", "initial_capital": 100000.0,
+         "parameters": {"fast": 5, "slow": 50}},
+        {"start_date": "2020-01-01", "end_date": "2021-01-01", "initial_capital": 100000.0,
+         "parameters": {"fast": 10, "slow": 50}},
+        {"start_date": "2020-01-01", "end_date": "2022-01-01", "initial_capital": 100000.0,
+         "parameters": {"fast": 5, "slow": 50}},
+        {"start_date": "2020-01-01", "end_date": "2022-01-01", "initial_capital": 100000.0,
+         "parameters": {"fast": 10, "slow": 50}},
+    ], jobs
+
+
+def test_empty_grid_dimension_yields_no_jobs():
+    """A grid with an empty list of values has no combinations"""
+    assert service.expand_batch(batch(grid={"parameters": {"fast": []}})) == []
+    assert len(service.expand_batch(batch(grid={}))) == 1
+
+
+def test_rejected_batches():
+    """Empty batches and those over MAX_BATCH_SIZE are rejected with 422 and not stored"""
+    async def post(body):
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            return await c.post("/backtests/batch", json=body)
+
+    response = asyncio.run(post({"batch_id": "empty", "strategy_code": STRATEGY_CODE}))
+    assert response.status_code == 422 and response.json()["detail"] == "Batch has no jobs", response.json()
+
+    size = service.MAX_BATCH_SIZE + 1
+    response = asyncio.run(post({
+        "batch_id": "huge", "strategy_code": STRATEGY_CODE,
+        "grid": {"parameters": {"n": list(range(size))}},
+    }))
+    assert response.status_code == 422, response.json()
+    assert str(size) in response.json()["detail"], response.json()
+    assert service.job_store.get_batch("huge") is None
+
+
+def main():
+    """Run the batch expansion tests"""
+    print("🚀 Starting batch expansion test")
+    print("=" * 50)
+    try:
+        test_grid_expansion()
+        test_empty_grid_dimension_yields_no_jobs()
+        test_rejected_batches()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("✅ Batches expand their grids and reject empty or oversized requests")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
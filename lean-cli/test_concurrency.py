@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Concurrency test for the LEAN CLI service
+
+Runs the app in-process and checks that /health latency stays flat while
+500 long-polling status requests are in flight, i.e. that status lookups
+and writes do not block the event loop.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+WORKDIR = tempfile.mkdtemp(prefix="test_concurrency_")
+# The service reads its configuration at import time
+os.environ.update({
+    "ENGINE_MODE": "simulator",
+    "ENGINE_WORKERS": "0",
+    "SIMULATOR_DURATION_SECONDS": "30",
+    "MAX_WORKERS": "4",
+    "JOB_STORE": "sqlite",
+    "JOB_STORE_PATH": os.path.join(WORKDIR, "backtest_status.db"),
+    "LEAN_STRATEGIES_DIR": os.path.join(WORKDIR, "strategies"),
+    "LEAN_RESULTS_DIR": os.path.join(WORKDIR, "results"),
+    "LEAN_DATA_DIR": os.path.join(WORKDIR, "data"),
+})
+
+import httpx  # noqa: E402
+import main as service  # noqa: E402
+
+POLLS = 500
+BACKTESTS = 20
+HEALTH_SAMPLES = 50
+POLL_WAIT_SECONDS = 5
+# /health p95 under load may exceed the idle p95 by this factor, or by MIN_BUDGET_MS
+MAX_SLOWDOWN = 5.0
+MIN_BUDGET_MS = 20.0
+
+STRATEGY_CODE = """
+from AlgorithmImports import *
+
+class ConcurrencyTestAlgorithm(QCAlgorithm):
+    def Initialize(self):
+        self.AddEquity("SPY")
+"""
+
+
+async def health_latency(client: httpx.AsyncClient) -> float:
+    """p95 /health latency in milliseconds over HEALTH_SAMPLES requests"""
+    samples = []
+    for _ in range(HEALTH_SAMPLES):
+        started = time.perf_counter()
+        response = await client.get("/health")
+        samples.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200
+        await asyncio.sleep(0.005)
+    return float(np.percentile(samples, 95))
+
+
+async def measure():
+    """Return the idle and under-load /health p95 and the number of polls in flight"""
+    async with service.app.router.lifespan_context(service.app):
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+            backtest_ids = [f"concurrency-{i}" for i in range(BACKTESTS)]
+            for backtest_id in backtest_ids:
+                response = await client.post("/backtest", json={
+                    "backtest_id": backtest_id,
+                    "strategy_code": STRATEGY_CODE,
+                    "use_cache": False
+                })
+                assert response.status_code == 200
+
+            idle = await health_latency(client)
+
+            polls = [
+                asyncio.create_task(client.get(
+                    f"/backtest/{backtest_ids[i % BACKTESTS]}",
+                    params={"wait": POLL_WAIT_SECONDS}
+                ))
+                for i in range(POLLS)
+            ]
+            await asyncio.sleep(0.5)
+            in_flight = sum(not poll.done() for poll in polls)
+            loaded = await health_latency(client)
+            in_flight = min(in_flight, sum(not poll.done() for poll in polls))
+
+            responses = await asyncio.gather(*polls)
+            assert all(response.status_code == 200 for response in responses)
+            for backtest_id in backtest_ids:
+                await client.post(f"/backtest/{backtest_id}/cancel")
+    return idle, loaded, in_flight
+
+
+def test_health_latency_under_polling():
+    """/health stays responsive while POLLS status long-polls are waiting"""
+    idle, loaded, in_flight = asyncio.run(measure())
+    print(f"📊 /health p95: {idle:.2f} ms idle, {loaded:.2f} ms with {in_flight} polls in flight")
+    assert in_flight == POLLS, f"only {in_flight} of {POLLS} polls were in flight"
+    assert loaded <= max(idle * MAX_SLOWDOWN, MIN_BUDGET_MS), \
+        f"/health p95 rose from {idle:.2f} ms to {loaded:.2f} ms under polling"
+
+
+def main():
+    """Run the concurrency test"""
+    print("🚀 Starting LEAN CLI concurrency test")
+    print("=" * 50)
+    try:
+        test_health_latency_under_polling()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("✅ /health latency stays flat under concurrent status polling")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -72,7 +72,7 @@ class StrategyAlgorithm(QCAlgorithm):
 def check_result(backtest_id):
     """Check backtest result"""
     try:
-        response = requests.get(f"{BASE_URL}/backtest/{backtest_id}")
+        response = requests.get(f"{BASE_URL}/backtest/{backtest_id}", params={"wait": 10})
         
         if response.status_code == 200:
             result = response.json()
@@ -110,8 +110,7 @@ def main():
     
     # Wait for completion
     print("\n⏳ Waiting for backtest to complete...")
-    for i in range(10):
-        time.sleep(5)
+    for i in range(5):
         if check_result(backtest_id):
             print("\n✅ Backtest completed!")
             break
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Result delivery test for the LEAN CLI service
+
+Drives the long-poll and Server-Sent Events endpoints in process against an
+in-memory job store, and checks that both return as soon as a backtest
+finishes, that a long poll gives up after its wait, and that StatusWatcher
+publishes updates written by other processes.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+WORKDIR = tempfile.mkdtemp(prefix="test_events_")
+# The service reads its configuration at import time
+os.environ.update({
+    "ENGINE_MODE": "simulator",
+    "JOB_STORE": "memory",
+    "LEAN_STRATEGIES_DIR": os.path.join(WORKDIR, "strategies"),
+    "LEAN_RESULTS_DIR": os.path.join(WORKDIR, "results"),
+    "LEAN_DATA_DIR": os.path.join(WORKDIR, "data"),
+})
+
+import httpx  # noqa: E402
+import main as service  # noqa: E402
+from events import JobEvents, StatusWatcher  # noqa: E402
+
+# Delay before the backtest finishes, well under the long-poll wait
+FINISH_AFTER_SECONDS = 0.2
+RESULTS = {"totalReturn": 0.1}
+
+
+async def finish_later(backtest_id: str):
+    await asyncio.sleep(FINISH_AFTER_SECONDS)
+    await asyncio.to_thread(service.update_backtest_status, backtest_id, {"status": "running"})
+    await asyncio.sleep(FINISH_AFTER_SECONDS)
+    await asyncio.to_thread(service.update_backtest_status, backtest_id, {
+        "status": "completed", "results": RESULTS
+    })
+
+
+def client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=service.app), base_url="http://test")
+
+
+def test_long_poll_returns_on_completion():
+    """A long poll returns the finished backtest as soon as it completes"""
+    async def run():
+        service.update_backtest_status("poll", {"status": "queued"})
+        async with client() as c:
+            started = time.monotonic()
+            response, _ = await asyncio.gather(c.get("/backtest/poll", params={"wait": 10}), finish_later("poll"))
+            return response, time.monotonic() - started
+    response, elapsed = asyncio.run(run())
+    body = response.json()
+    assert body["status"] == "completed" and body["results"] == RESULTS, body
+    assert elapsed < 5, elapsed
+    assert not service.job_events.subscribed_ids()
+
+
+def test_long_poll_times_out():
+    """A long poll on an unfinished backtest returns its status after the wait"""
+    async def run():
+        service.update_backtest_status("slow", {"status": "running"})
+        async with client() as c:
+            started = time.monotonic()
+            response = await c.get("/backtest/slow", params={"wait": 0.3})
+            return response, time.monotonic() - started
+    response, elapsed = asyncio.run(run())
+    assert response.json()["status"] == "running", response.json()
+    assert 0.3 <= elapsed < 5, elapsed
+
+    async def missing():
+        async with client() as c:
+            return await c.get("/backtest/missing", params={"wait": 1})
+    assert asyncio.run(missing()).status_code == 404
+
+
+def test_event_stream_ends_on_completion():
+    """The event stream sends each status transition and ends with the final one"""
+    async def run():
+        service.update_backtest_status("sse", {"status": "queued"})
+        async with client() as c:
+            response, _ = await asyncio.gather(c.get("/backtest/sse/events"), finish_later("sse"))
+            return response
+    response = asyncio.run(run())
+    assert response.headers["content-type"].startswith("text/event-stream"), response.headers
+    events = [
+        json.loads(line[len("data: "):])
+        for line in response.text.splitlines() if line.startswith("data: ")
+    ]
+    assert [event["status"] for event in events] == ["queued", "running", "completed"], events
+    assert events[-1]["results"] == RESULTS, events
+
+
+def test_status_watcher_publishes_changes():
+    """Updates found by polling the store are published once each"""
+    stored = {"w": {"status": "running"}}
+
+    async def run():
+        events = JobEvents()
+        watcher = StatusWatcher(events, lambda ids: {i: dict(stored[i]) for i in ids if i in stored}, 0.02)
+        queue = events.subscribe("w")
+        await watcher.start()
+        try:
+            first = await asyncio.wait_for(queue.get(), 5)
+            stored["w"] = {"status": "completed"}
+            second = await asyncio.wait_for(queue.get(), 5)
+            await asyncio.sleep(0.1)
+            return first, second, queue.qsize()
+        finally:
+            await watcher.stop()
+    first, second, pending = asyncio.run(run())
+    assert first == {"status": "running"} and second == {"status": "completed"}, (first, second)
+    assert pending == 0, pending
+
+
+def main():
+    """Run the result delivery tests"""
+    print("🚀 Starting result delivery test")
+    print("=" * 50)
+    try:
+        test_long_poll_returns_on_completion()
+        test_long_poll_times_out()
+        test_event_stream_ends_on_completion()
+        test_status_watcher_publishes_changes()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("✅ Long polls and event streams return as backtests finish")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
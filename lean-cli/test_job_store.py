@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Job store test for the LEAN CLI service
+
+Runs the same checks against the in-memory and SQLite job stores: updates
+merge into the stored fields, a legacy backtest_status.json is imported
+once without replacing newer jobs, and final status writes never replace a status that is already final, such as a
+cancel written while a queue worker was finishing the run. Also checks that
+closing the SQLite store closes the connection of every thread.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+WORKDIR = tempfile.mkdtemp(prefix="test_job_store_")
+# The service reads its configuration at import time
+os.environ.update({
+    "ENGINE_MODE": "simulator",
+    "JOB_STORE": "memory",
+    "LEAN_STRATEGIES_DIR": os.path.join(WORKDIR, "strategies"),
+    "LEAN_RESULTS_DIR": os.path.join(WORKDIR, "results"),
+    "LEAN_DATA_DIR": os.path.join(WORKDIR, "data"),
+})
+
+import main as service  # noqa: E402
+from events import TERMINAL_STATUSES  # noqa: E402
+from job_store import MemoryJobStore, SQLiteJobStore, migrate_json_status  # noqa: E402
+
+
+def stores():
+    """A fresh store of each backend that runs here"""
+    yield MemoryJobStore()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteJobStore(Path(tmp) / "jobs.db")
+        try:
+            yield store
+        finally:
+            store.close()
+
+
+def test_updates_merge():
+    """Updates merge into the stored fields, one job or several at a time"""
+    for store in stores():
+        name = type(store).__name__
+        store.upsert("a", {"status": "queued", "created_at": "2024-01-01T00:00:00", "request": {"x": 1}})
+        job = store.upsert("a", {"status": "running", "progress": None})
+        assert job == {
+            "status": "running", "created_at": "2024-01-01T00:00:00", "request": {"x": 1}, "progress": None
+        }, (name, job)
+        store.upsert_many({"a": {"status": "completed", "results": {"totalReturn": 0.1}}, "b": {"status": "queued"}})
+        assert store.get("a")["request"] == {"x": 1}, name
+        assert set(store.find_by_status(["completed"])) == {"a"}, name
+        assert store.get_many(["a", "b", "missing"], compact=True) == {
+            "a": {"status": "completed", "created_at": "2024-01-01T00:00:00", "progress": None},
+            "b": {"status": "queued"},
+        }, name
+        assert store.get("missing") is None, name
+
+
+def test_json_migration():
+    """A legacy status file is imported once, keeping jobs the store already has, then renamed"""
+    for store in stores():
+        name = type(store).__name__
+        with tempfile.TemporaryDirectory() as tmp:
+            status_file = Path(tmp) / "backtest_status.json"
+            status_file.write_text(json.dumps({
+                "old": {"status": "completed", "created_at": "2023-01-01T00:00:00"},
+                "kept": {"status": "failed"},
+            }))
+            store.upsert("kept", {"status": "completed"})
+            assert migrate_json_status(store, status_file) == 2, name
+            assert store.get("old") == {"status": "completed", "created_at": "2023-01-01T00:00:00"}, name
+            assert store.get("kept") == {"status": "completed"}, name
+            assert not status_file.exists() and status_file.with_name("backtest_status.json.migrated").exists(), name
+            assert migrate_json_status(store, status_file) == 0, name
+
+
+def test_final_status_is_kept():
+    """A conditional write is skipped once the stored status is final"""
+    for store in stores():
+        name = type(store).__name__
+        store.upsert("a", {"status": "running", "created_at": "2024-01-01T00:00:00"})
+        job = store.upsert_unless_status("a", {"status": "completed"}, list(TERMINAL_STATUSES))
+        assert job is not None and job["status"] == "completed", (name, job)
+        assert store.upsert_unless_status("a", {"status": "cancelled"}, list(TERMINAL_STATUSES)) is None, name
+        assert store.get("a")["status"] == "completed", name
+        job = store.upsert_unless_status("new", {"status": "running"}, list(TERMINAL_STATUSES))
+        assert job == {"status": "running"}, (name, job)
+
+
+def test_cancel_outlives_final_write():
+    """A run finishing after its cancel was stored leaves it cancelled"""
+    store, service.job_store = service.job_store, MemoryJobStore()
+    try:
+        service.update_backtest_status("x", {"status": "cancelled"})
+        asyncio.run(service.finish_backtest("x", {"status": "completed", "results": {}}))
+        job = service.job_store.get("x")
+    finally:
+        service.job_store = store
+    assert job["status"] == "cancelled" and "results" not in job, job
+
+
+def test_close_reaches_every_thread():
+    """close() closes the connections opened by other threads, and the store reconnects after it"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteJobStore(Path(tmp) / "jobs.db")
+        with ThreadPoolExecutor(4) as pool:
+            list(pool.map(lambda i: store.upsert(f"job-{i}", {"status": "queued"}), range(16)))
+        connections = list(store._connections)
+        assert len(connections) > 1, connections
+        store.close()
+        for conn in connections:
+            try:
+                conn.execute("SELECT 1")
+            except sqlite3.ProgrammingError:
+                continue
+            raise AssertionError("a connection was left open")
+        assert store.get("job-0") == {"status": "queued"}
+        store.close()
+
+
+def main():
+    """Run the job store tests"""
+    print("🚀 Starting job store test")
+    print("=" * 50)
+    try:
+        test_updates_merge()
+        test_json_migration()
+        test_final_status_is_kept()
+        test_cancel_outlives_final_write()
+        test_close_reaches_every_thread()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("✅ Every job store merges, migrates and keeps final statuses")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
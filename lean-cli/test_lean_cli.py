@@ -34,8 +34,11 @@ def test_simple_backtest():
     
     # Simple strategy code
     strategy_code = """
-print("Hello from LEAN CLI!")
-print("This is a simple test strategy")
+from AlgorithmImports import *
+
+class SimpleTestAlgorithm(QCAlgorithm):
+    def Initialize(self):
+        self.AddEquity("SPY")
 """
     
     backtest_request = {
@@ -53,12 +56,13 @@ print("This is a simple test strategy")
             data = response.json()
             print(f"✅ Backtest started: {data}")
             
-            # Poll for results
+            # Long-poll for results
             backtest_id = data["backtest_id"]
             max_attempts = 10
             for attempt in range(max_attempts):
-                time.sleep(2)
-                result_response = requests.get(f"{LEAN_CLI_URL}/backtest/{backtest_id}")
+                result_response = requests.get(
+                    f"{LEAN_CLI_URL}/backtest/{backtest_id}", params={"wait": 10}
+                )
                 
                 if result_response.status_code == 200:
                     result_data = result_response.json()
@@ -129,12 +133,13 @@ class MovingAverageCrossover(QCAlgorithm):
             data = response.json()
             print(f"✅ Trading strategy backtest started: {data}")
             
-            # Poll for results
+            # Long-poll for results
             backtest_id = data["backtest_id"]
             max_attempts = 10
             for attempt in range(max_attempts):
-                time.sleep(2)
-                result_response = requests.get(f"{LEAN_CLI_URL}/backtest/{backtest_id}")
+                result_response = requests.get(
+                    f"{LEAN_CLI_URL}/backtest/{backtest_id}", params={"wait": 10}
+                )
                 
                 if result_response.status_code == 200:
                     result_data = result_response.json()
@@ -183,6 +188,28 @@ def test_error_handling():
         print(f"❌ Error handling test failed: {e}")
         return False
 
+def test_invalid_strategy():
+    """Test that broken strategy code is rejected before it is queued"""
+    print("\n🔍 Testing invalid strategy rejection...")
+    
+    backtest_request = {
+        "backtest_id": "test_invalid_001",
+        "strategy_code": "class Broken(QCAlgorithm):\n    def Initialize(self)\n        pass\n"
+    }
+    
+    try:
+        response = requests.post(f"{LEAN_CLI_URL}/backtest", json=backtest_request)
+        if response.status_code == 422:
+            errors = response.json()["detail"]
+            print(f"✅ Invalid strategy rejected: line {errors[0]['line']}: {errors[0]['msg']}")
+            return True
+        else:
+            print(f"❌ Unexpected response for invalid strategy: {response.status_code}")
+            return False
+    except Exception as e:
+        print(f"❌ Invalid strategy test failed: {e}")
+        return False
+
 def main():
     """Run all tests"""
     print("🚀 Starting LEAN CLI Service Tests")
@@ -192,7 +219,8 @@ def main():
         test_health_check,
         test_simple_backtest,
         test_trading_strategy,
-        test_error_handling
+        test_error_handling,
+        test_invalid_strategy
     ]
     
     passed = 0
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+LEAN results parser test for the LEAN CLI service
+
+Writes LEAN-style backtest-results.json files in the layouts different LEAN
+versions produce and checks that the streaming parser extracts the same
+summary, equity curve and orders as json.load of the whole file.
+"""
+
+import gzip
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from artifacts import EQUITY_FILE, ORDERS_FILE, read_series
+from lean_results import ingest_lean_results, summarize_performance
+
+POINTS = 500
+START = 1577836800  # 2020-01-01
+
+
+def lean_results(candles: bool, orders_as_list: bool) -> dict:
+    """A results document with equity points and orders in the given layout"""
+    values = []
+    for index in range(POINTS):
+        x, y = START + index * 86400, 100000.0 + index * 1.5
+        values.append([x, y - 1, y + 1, y - 2, y] if candles else {"x": x, "y": y})
+    orders = [{"Id": index, "Symbol": {"Value": "SPY"}, "Quantity": 10 - index, "Price": 300.25 + index}
+              for index in range(1, 2500)]
+    return {
+        "Charts": {
+            "Benchmark": {"Series": {"Benchmark": {"Values": [{"x": START, "y": 1.0}]}}},
+            "Strategy Equity": {"Series": {"Equity": {"Values": values}}},
+        },
+        "Orders": orders if orders_as_list else {str(order["Id"]): order for order in orders},
+        "TotalPerformance": {
+            "TotalReturn": 0.0749, "SharpeRatio": 1.25, "Drawdown": -0.031, "WinRate": 0.55,
+            "PortfolioValue": 100748.5, "TotalTrades": 2499, "TotalProfit": 748.5,
+        },
+    }
+
+
+def reference(results_file: Path):
+    """Summary, equity points and orders as json.load of the whole file gives them"""
+    with open(results_file) as f:
+        results = json.load(f)
+    points = results["Charts"]["Strategy Equity"]["Series"]["Equity"]["Values"]
+    equity = [point["y"] if isinstance(point, dict) else point[-1] for point in points]
+    orders = results["Orders"]
+    orders = list(orders.values()) if isinstance(orders, dict) else orders
+    return summarize_performance(results["TotalPerformance"]), equity, orders
+
+
+def test_streaming_parse_matches_json_load():
+    """Every layout streams to the same summary, equity and orders as a full load"""
+    for candles in (False, True):
+        for orders_as_list in (False, True):
+            layout = (candles, orders_as_list)
+            with tempfile.TemporaryDirectory() as tmp:
+                results_file = Path(tmp) / "backtest-results.json"
+                results_file.write_text(json.dumps(lean_results(candles, orders_as_list)))
+                summary = ingest_lean_results(results_file)
+                expected_summary, expected_equity, expected_orders = reference(results_file)
+
+                assert summary == expected_summary, (layout, summary)
+                series = read_series(Path(tmp) / EQUITY_FILE)
+                assert series["equity"].tolist() == expected_equity, layout
+                assert (series["time"] == np.datetime64(START, "s") + np.arange(POINTS) * 86400).all(), layout
+                with gzip.open(Path(tmp) / ORDERS_FILE, "rt") as f:
+                    orders = [json.loads(line) for line in f]
+                assert orders == expected_orders, layout
+
+
+def test_missing_sections():
+    """A results file without charts or orders still yields a summary and no equity curve"""
+    with tempfile.TemporaryDirectory() as tmp:
+        results_file = Path(tmp) / "backtest-results.json"
+        results_file.write_text(json.dumps({"TotalPerformance": {"TotalReturn": 0.1}}))
+        summary = ingest_lean_results(results_file)
+        assert summary["totalReturn"] == 0.1 and summary["sharpeRatio"] == 0, summary
+        assert not (Path(tmp) / EQUITY_FILE).exists()
+        with gzip.open(Path(tmp) / ORDERS_FILE, "rt") as f:
+            assert f.read() == ""
+
+
+def main():
+    """Run the LEAN results parser tests"""
+    print("🚀 Starting LEAN results parser test")
+    print("=" * 50)
+    try:
+        test_streaming_parse_matches_json_load()
+        test_missing_sections()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("✅ Streaming parse matches json.load")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
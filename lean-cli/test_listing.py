@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Backtest listing test for the LEAN CLI service
+
+Pages through the in-memory and SQLite job stores and checks that keyset
+pages join up to the full newest-first order with nothing repeated or
+skipped, including jobs created at the same time. Also checks the status,
+since and compact filters, bulk status lookups, and the cursors of
+GET /backtests and POST /backtests/status.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+WORKDIR = tempfile.mkdtemp(prefix="test_listing_")
+# The service reads its configuration at import time
+os.environ.update({
+    "ENGINE_MODE": "simulator",
+    "JOB_STORE": "memory",
+    "LEAN_STRATEGIES_DIR": os.path.join(WORKDIR, "strategies"),
+    "LEAN_RESULTS_DIR": os.path.join(WORKDIR, "results"),
+    "LEAN_DATA_DIR": os.path.join(WORKDIR, "data"),
+})
+
+import httpx  # noqa: E402
+import main as service  # noqa: E402
+from job_store import MemoryJobStore, SQLiteJobStore  # noqa: E402
+
+STATUSES = ("completed", "failed", "running")
+
+
+def stores():
+    """A fresh store of each backend that runs here"""
+    yield MemoryJobStore()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteJobStore(Path(tmp) / "jobs.db")
+        try:
+            yield store
+        finally:
+            store.close()
+
+
+def fill(store, count: int = 25) -> list:
+    """Store count jobs, three to a created_at, and return their IDs newest first"""
+    jobs = {
+        f"bt-{index:02d}": {
+            "status": STATUSES[index % len(STATUSES)],
+            "created_at": f"2024-01-01T00:00:{index // 3:02d}",
+            "results": {"totalReturn": index / 100},
+            "request": {"backtest_id": f"bt-{index:02d}"},
+        }
+        for index in range(count)
+    }
+    store.upsert_many(jobs)
+    return sorted(jobs, key=lambda backtest_id: (jobs[backtest_id]["created_at"], backtest_id), reverse=True)
+
+
+def pages(store, limit: int, **filters) -> list:
+    """Every page of list_jobs, following the last job of each"""
+    result, after = [], None
+    while True:
+        page = store.list_jobs(limit=limit, after=after, **filters)
+        result.append(page)
+        if len(page) < limit:
+            return result
+        backtest_id, job = page[-1]
+        after = (job["created_at"], backtest_id)
+
+
+def test_keyset_pages():
+    """Pages of any size join up to the full order, across jobs created at the same time"""
+    for store in stores():
+        name = type(store).__name__
+        ordered = fill(store)
+        for limit in (1, 2, 3, 4, 7, 25, 100):
+            listed = [backtest_id for page in pages(store, limit) for backtest_id, _ in page]
+            assert listed == ordered, (name, limit, listed)
+        assert store.list_jobs(after=("2024-01-01T00:00:00", "bt-00")) == [], name
+
+
+def test_filters():
+    """Status and since filters hold on every page, and compact leaves out the bulky fields"""
+    for store in stores():
+        name = type(store).__name__
+        ordered = fill(store)
+        jobs = store.get_many(ordered)
+        filters = {"statuses": ["completed", "running"], "since": "2024-01-01T00:00:03"}
+        listed = [backtest_id for page in pages(store, 2, **filters) for backtest_id, _ in page]
+        assert listed == [
+            backtest_id for backtest_id in ordered
+            if jobs[backtest_id]["status"] in filters["statuses"]
+            and jobs[backtest_id]["created_at"] >= filters["since"]
+        ], (name, listed)
+
+        (_, compact), = store.list_jobs(limit=1)
+        assert "results" not in compact and "request" not in compact and compact["status"], (name, compact)
+        (_, full), = store.list_jobs(limit=1, compact=False)
+        assert full["results"] and full["request"], (name, full)
+
+
+def test_get_many():
+    """get_many returns only the known IDs, compact or in full"""
+    for store in stores():
+        name = type(store).__name__
+        fill(store, 3)
+        jobs = store.get_many(["bt-02", "unknown", "bt-00"])
+        assert set(jobs) == {"bt-00", "bt-02"}, (name, jobs)
+        assert jobs["bt-02"]["results"] == {"totalReturn": 0.02}, (name, jobs)
+        compact = store.get_many(["bt-01"], compact=True)
+        assert set(compact["bt-01"]) == {"status", "created_at"}, (name, compact)
+        assert store.get_many([]) == {}, name
+
+
+def test_endpoints():
+    """GET /backtests follows next_cursor to the end; POST /backtests/status keeps request order"""
+    async def requests(store):
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            listed, cursor = [], None
+            while True:
+                params = {"limit": 4, **({"cursor": cursor} if cursor else {})}
+                body = (await c.get("/backtests", params=params)).json()
+                listed += [job["backtest_id"] for job in body["backtests"]]
+                assert all(job["results"] is None for job in body["backtests"]), body
+                cursor = body["next_cursor"]
+                if cursor is None:
+                    break
+            invalid = await c.get("/backtests", params={"cursor": "not-a-cursor"})
+            statuses = (await c.post("/backtests/status", json={
+                "backtest_ids": ["bt-03", "unknown", "bt-01", "bt-03"], "include_results": True
+            })).json()
+            return listed, invalid, statuses
+
+    store, service.job_store = service.job_store, MemoryJobStore()
+    try:
+        ordered = fill(service.job_store, 10)
+        listed, invalid, statuses = asyncio.run(requests(service.job_store))
+        assert listed == ordered, listed
+        assert invalid.status_code == 422, invalid.status_code
+        assert [job["backtest_id"] for job in statuses["backtests"]] == ["bt-03", "bt-01"], statuses
+        assert statuses["backtests"][0]["results"] == {"totalReturn": 0.03}, statuses
+        assert statuses["missing"] == ["unknown"], statuses
+    finally:
+        service.job_store = store
+
+
+def main():
+    """Run the backtest listing tests"""
+    print("🚀 Starting backtest listing test")
+    print("=" * 50)
+    try:
+        test_keyset_pages()
+        test_filters()
+        test_get_many()
+        test_endpoints()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("✅ Backtest pages join up without gaps or repeats")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
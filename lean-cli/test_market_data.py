@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Market data test for the LEAN CLI service
+
+Converts a small LEAN daily zip to the columnar format and checks the
+converted prices, that the conversion goes stale when the source changes,
+and that a memory-mapped series is remapped once its source changed, no
+sooner than the check interval.
+"""
+
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+from market_data import MarketDataStore
+
+DAYS = 20
+
+
+def write_lean_daily(data_dir: Path, symbol: str, close: int, days: int = DAYS):
+    """Write a LEAN daily zip whose bars all close at close ten-thousandths of a dollar"""
+    source = data_dir / "equity" / "usa" / "daily" / f"{symbol}.zip"
+    source.parent.mkdir(parents=True, exist_ok=True)
+    lines = [f"202001{day:02d} 00:00,{close},{close + 100},{close - 100},{close},{1000 + day}"
+             for day in range(1, days + 1)]
+    with zipfile.ZipFile(source, "w") as archive:
+        archive.writestr(f"{symbol}.csv", "\n".join(lines))
+    # Make the change visible to the size-and-mtime signature even within one mtime tick
+    stamp = time.time() + close / 1e6
+    os.utime(source, (stamp, stamp))
+
+
+def test_conversion():
+    """LEAN prices are scaled to dollars and stored sorted by time"""
+    with tempfile.TemporaryDirectory() as tmp:
+        write_lean_daily(Path(tmp), "spy", 1234500)
+        store = MarketDataStore(Path(tmp))
+        bars = store.load("SPY")
+        assert len(bars) == DAYS, len(bars)
+        assert bars.close[0] == 123.45 and bars.high[0] == 123.46, (bars.close[0], bars.high[0])
+        assert str(bars.time[0]) == "2020-01-01T00:00:00", bars.time[0]
+        assert (bars.volume == [1000 + day for day in range(1, DAYS + 1)]).all()
+        assert store.list_series() == [{"symbol": "spy", "resolution": "daily", "bars": DAYS}]
+
+
+def test_source_change_is_stale():
+    """Converted data is current until its LEAN source changes, then converts again"""
+    with tempfile.TemporaryDirectory() as tmp:
+        write_lean_daily(Path(tmp), "spy", 1000000)
+        store = MarketDataStore(Path(tmp))
+        assert not store.is_current("spy", "daily")
+        store.convert_lean_equity("spy", "daily")
+        assert store.is_current("spy", "daily")
+        write_lean_daily(Path(tmp), "spy", 2000000, days=DAYS + 5)
+        assert not store.is_current("spy", "daily")
+        assert len(MarketDataStore(Path(tmp)).load("spy")) == DAYS + 5
+
+
+def test_mapped_series_is_remapped():
+    """A mapped series is served until the check interval passes, then remapped if its source changed"""
+    with tempfile.TemporaryDirectory() as tmp:
+        write_lean_daily(Path(tmp), "spy", 1000000)
+        store = MarketDataStore(Path(tmp), check_interval=0.2)
+        first = store.load("spy")
+        assert store.load("spy") is first
+        write_lean_daily(Path(tmp), "spy", 2000000)
+        assert store.load("spy") is first
+        time.sleep(0.3)
+        second = store.load("spy")
+        assert second.close[0] == 200.0 and second.version != first.version, (second.close[0], second.version)
+        # Old maps stay readable after the swap
+        assert first.close[0] == 100.0
+        time.sleep(0.3)
+        assert store.load("spy") is second
+
+
+def test_series_written_elsewhere_is_remapped():
+    """A new version stored by another process is picked up after the check interval"""
+    with tempfile.TemporaryDirectory() as tmp:
+        write_lean_daily(Path(tmp), "spy", 1000000)
+        store = MarketDataStore(Path(tmp), check_interval=0)
+        first = store.load("spy")
+        other = MarketDataStore(Path(tmp))
+        other.write_bars("spy", "daily", {
+            "time": first.time, "open": first.open, "high": first.high, "low": first.low,
+            "close": first.close * 2, "volume": first.volume,
+        }, other._source_signature(other._lean_source("spy", "daily")))
+        assert store.load("spy").close[0] == 200.0
+
+
+def main():
+    """Run the market data tests"""
+    print("🚀 Starting market data test")
+    print("=" * 50)
+    try:
+        test_conversion()
+        test_source_change_is_stale()
+        test_mapped_series_is_remapped()
+        test_series_written_elsewhere_is_remapped()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("✅ Market data is converted, and remapped when its source changes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Metrics test for the LEAN CLI service
+
+Checks the vectorized metrics against values worked out by hand for a short
+equity curve, and the rolling statistics against a plain loop over windows.
+"""
+
+import math
+import sys
+
+import numpy as np
+
+from metrics import compute_metrics, drawdown_stats, rolling_stats
+
+# Returns +10%, -10%, +22.2%: one drawdown of 10% lasting one bar
+EQUITY = [100.0, 110.0, 99.0, 121.0]
+
+
+def test_summary_metrics():
+    """Returns, risk ratios and drawdown of a short curve"""
+    metrics = compute_metrics(np.array(EQUITY))
+    returns = np.array([0.1, -0.1, 121.0 / 99.0 - 1.0])
+    std = math.sqrt(sum((r - returns.mean()) ** 2 for r in returns) / 2)
+    downside = math.sqrt(0.01 / 3)
+    assert math.isclose(metrics["totalReturn"], 0.21)
+    assert math.isclose(metrics["profitLoss"], 21.0) and metrics["finalPortfolioValue"] == 121.0
+    assert math.isclose(metrics["sharpeRatio"], returns.mean() / std * math.sqrt(252))
+    assert math.isclose(metrics["sortinoRatio"], returns.mean() / downside * math.sqrt(252))
+    assert math.isclose(metrics["annualVolatility"], std * math.sqrt(252))
+    assert math.isclose(metrics["maxDrawdown"], -0.1)
+    assert metrics["maxDrawdownDuration"] == 1, metrics
+
+
+def test_flat_curve():
+    """A curve that never moves has zero ratios instead of dividing by zero"""
+    metrics = compute_metrics(np.full(10, 100.0))
+    assert metrics["sharpeRatio"] == 0.0 and metrics["sortinoRatio"] == 0.0, metrics
+    assert metrics["maxDrawdown"] == 0.0 and metrics["maxDrawdownDuration"] == 0, metrics
+    try:
+        compute_metrics(np.array([100.0]))
+    except ValueError:
+        return
+    raise AssertionError("a single value was accepted as an equity curve")
+
+
+def test_drawdown_duration():
+    """The longest stretch below the previous peak, in bars"""
+    stats = drawdown_stats(np.array([1.0, 2.0, 1.5, 1.0, 1.8, 2.5, 2.0, 2.6]))
+    assert math.isclose(stats["maxDrawdown"], -0.5)
+    assert stats["maxDrawdownDuration"] == 3, stats
+
+
+def test_trade_metrics():
+    """Win rate, profit factor and exposure from trades and positions"""
+    metrics = compute_metrics(np.array(EQUITY), trade_pnl=np.array([10.0, -5.0, 5.0, -5.0]),
+                              positions=np.array([0, 1, 1, 0]))
+    assert metrics["totalTrades"] == 4 and metrics["winRate"] == 0.5, metrics
+    assert math.isclose(metrics["profitFactor"], 1.5)
+    assert metrics["exposure"] == 0.5
+    metrics = compute_metrics(np.array(EQUITY), trade_pnl=np.array([1.0]))
+    assert metrics["profitFactor"] is None and metrics["winRate"] == 1.0, metrics
+    assert compute_metrics(np.array(EQUITY))["totalTrades"] == 0
+
+
+def test_rolling_stats():
+    """Rolling values match each window computed on its own"""
+    rng = np.random.default_rng(7)
+    equity = 100.0 * np.cumprod(1.0 + rng.normal(0.0005, 0.01, 200))
+    window = 20
+    stats = rolling_stats(equity, window)
+    returns = equity[1:] / equity[:-1] - 1.0
+    assert np.isnan(stats["sharpe"][:window - 1]).all()
+    for end in range(window, len(returns) + 1):
+        chunk = returns[end - window:end]
+        assert math.isclose(stats["return"][end - 1], chunk.mean() * 252, rel_tol=1e-6)
+        assert math.isclose(stats["volatility"][end - 1], chunk.std(ddof=1) * math.sqrt(252), rel_tol=1e-6)
+        assert math.isclose(stats["sharpe"][end - 1], chunk.mean() / chunk.std(ddof=1) * math.sqrt(252),
+                            rel_tol=1e-6)
+
+
+def main():
+    """Run the metrics tests"""
+    print("🚀 Starting metrics test")
+    print("=" * 50)
+    try:
+        test_summary_metrics()
+        test_flat_curve()
+        test_drawdown_duration()
+        test_trade_metrics()
+        test_rolling_stats()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("✅ Metrics match their definitions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
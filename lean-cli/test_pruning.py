@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Pruning test for the LEAN CLI service
+
+Feeds progress checkpoints to ProgressMonitor and checks which stop rules
+prune a backtest and when, that peers are compared against the median of
+those seen before them, and how often checkpoints are persisted.
+"""
+
+import sys
+
+from pruning import JobPruned, PeerTracker, ProgressMonitor
+
+
+def monitor(rules, group=None, peers=None, persisted=None, persist_interval=0.0) -> ProgressMonitor:
+    return ProgressMonitor(
+        rules, group, peers or PeerTracker(),
+        (persisted if persisted is not None else []).append, persist_interval
+    )
+
+
+def pruned_at(progress: ProgressMonitor, checkpoints) -> int:
+    """Index of the checkpoint that pruned the run, or -1"""
+    for index, checkpoint in enumerate(checkpoints):
+        try:
+            progress(checkpoint)
+        except JobPruned:
+            return index
+    return -1
+
+
+def test_max_drawdown():
+    """A drawdown past the limit prunes at any point of the run"""
+    checkpoints = [{"fraction": 0.1, "return": 0.0, "drawdown": -0.05},
+                   {"fraction": 0.2, "return": -0.1, "drawdown": -0.25}]
+    assert pruned_at(monitor({"max_drawdown": -0.2}), checkpoints) == 1
+    assert pruned_at(monitor({"max_drawdown": -0.3}), checkpoints) == -1
+    assert pruned_at(monitor(None), checkpoints) == -1
+
+
+def test_min_return_at_checkpoint():
+    """min_return is checked once, at the first checkpoint past the rule's fraction"""
+    checkpoints = [{"fraction": 0.3, "return": -0.2}, {"fraction": 0.6, "return": -0.1},
+                   {"fraction": 0.9, "return": -0.3}]
+    assert pruned_at(monitor({"min_return": -0.05}), checkpoints) == 1
+    assert pruned_at(monitor({"min_return": -0.05, "checkpoint": 0.2}), checkpoints) == 0
+    # Recovered by the checkpoint; later losses are not checked again
+    assert pruned_at(monitor({"min_return": -0.15}), checkpoints) == -1
+
+
+def test_peer_median():
+    """Runs below the median of the earlier peers in their group are pruned once min_peers have reported"""
+    peers = PeerTracker()
+    rules = {"below_peer_median": True, "min_peers": 3}
+    results = [
+        pruned_at(monitor(rules, "batch", peers), [{"fraction": 0.5, "return": value}])
+        for value in (0.1, 0.3, 0.2, 0.15, 0.25, 0.05)
+    ]
+    # Medians seen: none, none, none, 0.2, 0.175, 0.2
+    assert results == [-1, -1, -1, 0, -1, 0], results
+    assert pruned_at(monitor(rules, "other", peers), [{"fraction": 0.5, "return": -1.0}]) == -1
+    assert pruned_at(monitor(rules, None, peers), [{"fraction": 0.5, "return": -1.0}]) == -1
+
+
+def test_peer_groups_are_bounded():
+    """Only the most recently used groups keep their returns"""
+    peers = PeerTracker(max_groups=2)
+    for group in ("a", "b", "a", "c"):
+        peers.median_then_record(group, 0.1, 1)
+    assert peers.stats() == {"groups": 2, "max_groups": 2, "evictions": 1}, peers.stats()
+    assert peers.median_then_record("b", 0.1, 1) is None
+    assert peers.median_then_record("a", 0.1, 1) is None
+
+
+def test_persisted_checkpoints():
+    """Checkpoints are persisted at most every persist_interval, and always when pruning"""
+    persisted = []
+    progress = monitor({"max_drawdown": -0.2}, persisted=persisted, persist_interval=3600)
+    checkpoints = [{"fraction": f / 10, "drawdown": -0.01 * f} for f in range(1, 5)]
+    checkpoints.append({"fraction": 0.5, "drawdown": -0.5})
+    assert pruned_at(progress, checkpoints) == 4
+    assert persisted == [checkpoints[0], checkpoints[4]], persisted
+    assert progress.last_checkpoint == checkpoints[4]
+
+
+def main():
+    """Run the pruning tests"""
+    print("🚀 Starting pruning test")
+    print("=" * 50)
+    try:
+        test_max_drawdown()
+        test_min_return_at_checkpoint()
+        test_peer_median()
+        test_peer_groups_are_bounded()
+        test_persisted_checkpoints()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("✅ Stop rules prune the right backtests at the right time")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Crash recovery test for the LEAN CLI service
+
+Leaves backtests queued and running in a job store as a crashed process
+would, and checks which ones startup recovery requeues or fails, and that a
+requeued simulator run resumes from its last checkpoint with the results
+of an uninterrupted run.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+WORKDIR = tempfile.mkdtemp(prefix="test_recovery_")
+# The service reads its configuration at import time
+os.environ.update({
+    "ENGINE_MODE": "simulator",
+    "ENGINE_WORKERS": "0",
+    "JOB_STORE": "memory",
+    "LEAN_STRATEGIES_DIR": os.path.join(WORKDIR, "strategies"),
+    "LEAN_RESULTS_DIR": os.path.join(WORKDIR, "results"),
+    "LEAN_DATA_DIR": os.path.join(WORKDIR, "data"),
+})
+
+import main as service  # noqa: E402
+from engine import SIMULATOR_CHECKPOINTS, run_simulator  # noqa: E402
+from job_store import MemoryJobStore  # noqa: E402
+
+STRATEGY_CODE = """
+from AlgorithmImports import *
+
+class Recovered(QCAlgorithm):
+    def Initialize(self):
+        self.SetCash(100000)
+"""
+RESUME_STEP = 7
+
+
+def stored_request(backtest_id: str) -> dict:
+    return service.BacktestRequest(backtest_id=backtest_id, strategy_code=STRATEGY_CODE).model_dump(mode="json")
+
+
+def test_recovery_requeues_and_fails():
+    """Orphans with a stored request are requeued, running ones first; the rest are failed"""
+    store, service.job_store = service.job_store, MemoryJobStore()
+    try:
+        jobs = service.job_store
+        jobs.upsert("queued", {"status": "queued", "created_at": "2024-01-01T00:00:01",
+                               "request": stored_request("queued")})
+        jobs.upsert("running", {"status": "running", "created_at": "2024-01-01T00:00:02",
+                                "request": stored_request("running")})
+        jobs.save_batch("batch", {"backtest_ids": ["batch-0"], "request": {"strategy_code": STRATEGY_CODE}})
+        jobs.upsert("batch-0", {"status": "queued", "created_at": "2024-01-01T00:00:00", "batch_id": "batch",
+                                "parameters": {"initial_capital": 5000.0}})
+        jobs.upsert("no-request", {"status": "running"})
+        jobs.upsert("crashy", {"status": "running", "recoveries": service.RECOVERY_MAX_ATTEMPTS,
+                               "request": stored_request("crashy")})
+        jobs.upsert("done", {"status": "completed", "request": stored_request("done")})
+
+        requests = service.recover_backtests()
+
+        assert [r.backtest_id for r in requests] == ["running", "batch-0", "queued"], requests
+        assert requests[1].initial_capital == 5000.0 and requests[1].strategy_code == STRATEGY_CODE
+        for backtest_id in ("running", "batch-0", "queued"):
+            job = jobs.get(backtest_id)
+            assert job["status"] == "queued" and job["recoveries"] == 1, (backtest_id, job)
+        assert jobs.get("no-request")["status"] == "failed", jobs.get("no-request")
+        crashy = jobs.get("crashy")
+        assert crashy["status"] == "failed" and "restarts" in crashy["error"], crashy
+        assert jobs.get("done") == {"status": "completed", "request": stored_request("done")}
+    finally:
+        service.job_store = store
+
+
+def test_simulator_resumes_from_checkpoint():
+    """A resumed run reports only the remaining checkpoints, on the same path, with the same results"""
+    async def run(checkpoint=None):
+        checkpoints = []
+        results = await run_simulator("resumed", 100000.0, duration=0.05,
+                                      on_progress=checkpoints.append, checkpoint=checkpoint)
+        return results, checkpoints
+
+    full_results, full_checkpoints = asyncio.run(run())
+    resumed_results, resumed_checkpoints = asyncio.run(run(full_checkpoints[RESUME_STEP - 1]))
+    assert resumed_results == full_results
+    assert [c["step"] for c in resumed_checkpoints] == list(range(RESUME_STEP + 1, SIMULATOR_CHECKPOINTS))
+    assert resumed_checkpoints == full_checkpoints[RESUME_STEP:]
+
+
+def test_requeued_backtest_resumes():
+    """Running a recovered backtest picks up from its stored checkpoint and completes it"""
+    store, service.job_store = service.job_store, MemoryJobStore()
+    duration = service.SIMULATOR_DURATION_SECONDS
+    service.SIMULATOR_DURATION_SECONDS = 1.0
+    try:
+        service.job_store.upsert("resume", {
+            "status": "running", "created_at": "2024-01-01T00:00:00", "request": stored_request("resume"),
+            "progress": {"step": SIMULATOR_CHECKPOINTS - 1, "fraction": 0.9, "return": 0.0, "drawdown": 0.0},
+        })
+        request, = service.recover_backtests()
+        elapsed = asyncio.run(timed(service.run_lean_backtest("resume", request)))
+        job = service.job_store.get("resume")
+        assert job["status"] == "completed" and job["results"] and job["progress"] is None, job
+        # Only the last of the simulated steps was left to run
+        assert elapsed < 0.5 * service.SIMULATOR_DURATION_SECONDS, elapsed
+    finally:
+        service.job_store = store
+        service.SIMULATOR_DURATION_SECONDS = duration
+
+
+async def timed(awaitable) -> float:
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await awaitable
+    return loop.time() - started
+
+
+def main():
+    """Run the crash recovery tests"""
+    print("🚀 Starting crash recovery test")
+    print("=" * 50)
+    try:
+        test_recovery_requeues_and_fails()
+        test_simulator_resumes_from_checkpoint()
+        test_requeued_backtest_resumes()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("✅ Interrupted backtests are requeued and resume where they stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
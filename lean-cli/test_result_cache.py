@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Result cache test for the LEAN CLI service
+
+Checks which changes to a backtest change its cache key, that the cache
+stays within its bounds, that entries are shared through the job store,
+and that resubmitting a cached backtest completes it without running it.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+WORKDIR = tempfile.mkdtemp(prefix="test_result_cache_")
+# The service reads its configuration at import time
+os.environ.update({
+    "ENGINE_MODE": "simulator",
+    "JOB_STORE": "memory",
+    "LEAN_STRATEGIES_DIR": os.path.join(WORKDIR, "strategies"),
+    "LEAN_RESULTS_DIR": os.path.join(WORKDIR, "results"),
+    "LEAN_DATA_DIR": os.path.join(WORKDIR, "data"),
+})
+
+import httpx  # noqa: E402
+import main as service  # noqa: E402
+from job_store import MemoryJobStore  # noqa: E402
+from result_cache import ResultCache, SharedResultCache, result_cache_key  # noqa: E402
+
+STRATEGY_CODE = """
+from AlgorithmImports import *
+
+class Cached(QCAlgorithm):
+    def Initialize(self):
+        self.SetCash(100000)
+        self.AddEquity("SPY")
+"""
+BASE = dict(strategy_code=STRATEGY_CODE, start_date="2020-01-01", end_date="2021-01-01",
+            initial_capital=100000, parameters={"fast": 5, "slow": 50}, engine_version="simulator")
+
+
+def key(**changes) -> str:
+    return result_cache_key(**{**BASE, **changes})
+
+
+def test_cache_key():
+    """Formatting and parameter order leave the key alone; anything affecting the run changes it"""
+    assert key() == key(strategy_code=STRATEGY_CODE.replace("\n", "  \r\n") + "\n\n")
+    assert key() == key(parameters={"slow": 50, "fast": 5})
+    assert key() == key(initial_capital=100000.0)
+    changed = [
+        key(strategy_code=STRATEGY_CODE.replace("SPY", "QQQ")),
+        key(start_date="2020-01-02"),
+        key(end_date="2021-01-02"),
+        key(initial_capital=100001),
+        key(parameters={"fast": 6, "slow": 50}),
+        key(engine_version="lean"),
+    ]
+    assert len(set(changed) | {key()}) == len(changed) + 1, changed
+
+
+def test_cache_bounds():
+    """Least recently used entries are evicted past the entry and byte limits"""
+    cache = ResultCache(max_entries=2, max_bytes=1000)
+    cache.put("a", {"v": 1})
+    cache.put("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}
+    cache.put("c", {"v": 3})
+    assert cache.get("b") is None and cache.get("a") == {"v": 1} and cache.get("c") == {"v": 3}
+    cache.put("big", {"v": "x" * 2000})
+    assert cache.get("big") is None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["entries"] == 2, cache.stats()
+
+
+def test_shared_cache():
+    """Entries put by one process are hits for another using the same store"""
+    store = MemoryJobStore()
+    SharedResultCache(store, 10, 10000).put("k", {"totalReturn": 0.1})
+    other = SharedResultCache(store, 10, 10000)
+    assert other.get_many(["k", "missing"]) == {"k": {"totalReturn": 0.1}}
+    assert other.get("k") == {"totalReturn": 0.1}
+    stats = other.stats()
+    assert (stats["hits"], stats["shared_hits"], stats["misses"]) == (2, 1, 1), stats
+
+
+def test_resubmission_is_a_cache_hit():
+    """A backtest identical to a cached one completes at once under its new id"""
+    request = service.BacktestRequest(backtest_id="first", strategy_code=STRATEGY_CODE)
+    results = {"totalReturn": 0.25}
+    service.result_cache.put(service.backtest_cache_key(request), results)
+
+    async def post(body):
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            return await c.post("/backtest", json=body)
+
+    response = asyncio.run(post({"backtest_id": "second", "strategy_code": STRATEGY_CODE}))
+    body = response.json()
+    assert body["status"] == "completed" and body["results"] == results, body
+    job = service.job_store.get("second")
+    assert job["cache_hit"] is True and job["results"] == results, job
+
+
+def main():
+    """Run the result cache tests"""
+    print("🚀 Starting result cache test")
+    print("=" * 50)
+    try:
+        test_cache_key()
+        test_cache_bounds()
+        test_shared_cache()
+        test_resubmission_is_a_cache_hit()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("✅ Identical backtests share cached results")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Retention test for the LEAN CLI service
+
+Applies each retention policy to finished backtests in an in-memory job
+store and temporary directories, and checks which backtests are compacted,
+deleted or kept, including the disk budget and the strategy directories, and that
+deduplicated strategy files stay independent when one is rewritten.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+WORKDIR = tempfile.mkdtemp(prefix="test_retention_")
+# The service reads its configuration at import time
+os.environ.update({
+    "ENGINE_MODE": "simulator",
+    "JOB_STORE": "memory",
+    "LEAN_STRATEGIES_DIR": os.path.join(WORKDIR, "strategies"),
+    "LEAN_RESULTS_DIR": os.path.join(WORKDIR, "results"),
+    "LEAN_DATA_DIR": os.path.join(WORKDIR, "data"),
+})
+
+import main as service  # noqa: E402
+from job_store import MemoryJobStore  # noqa: E402
+from retention import OBJECTS_DIR, RetentionManager  # noqa: E402
+
+RESULT_BYTES = 1000
+OLD_SECONDS = 30 * 86400
+
+
+def make_backtests(root: Path, ages_days, strategy="s1", status="completed"):
+    """Store finished backtests created ages_days ago, each with a result and strategy directory"""
+    store = MemoryJobStore()
+    for index, age in enumerate(ages_days):
+        backtest_id = f"{strategy}-{index}"
+        store.upsert(backtest_id, {
+            "status": status,
+            "created_at": (datetime.now() - timedelta(days=age)).isoformat(),
+            "strategy_hash": strategy,
+            "request": {"backtest_id": backtest_id},
+            "results": {"totalReturn": 0.1},
+        })
+        results_dir = root / "results" / backtest_id
+        results_dir.mkdir(parents=True)
+        (results_dir / "equity.bin").write_bytes(b"x" * RESULT_BYTES)
+        strategy_dir = root / "strategies" / backtest_id
+        strategy_dir.mkdir(parents=True)
+        (strategy_dir / "strategy.py").write_text(f"# {strategy}\n")
+        os.utime(strategy_dir, (time.time() - OLD_SECONDS,) * 2)
+    return store
+
+
+def apply(root: Path, store, **policies):
+    manager = RetentionManager(store, root / "strategies", root / "results", 0, **policies)
+    return manager.run()
+
+
+def compacted(root: Path, store, backtest_id: str) -> bool:
+    job = store.get(backtest_id)
+    return job.get("compacted_at") is not None and not (root / "results" / backtest_id).exists()
+
+
+def test_zero_policies_keep_everything():
+    """With every policy at 0 nothing is compacted, deleted or removed"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        store = make_backtests(root, [100, 50, 1])
+        report = apply(root, store)
+        assert report["compacted"] == report["deleted"] == report["strategies_removed"] == 0, report
+        assert all((root / "strategies" / f"s1-{i}").is_dir() for i in range(3))
+        assert all((root / "results" / f"s1-{i}").is_dir() for i in range(3))
+
+
+def test_age_count_and_delete_policies():
+    """Backtests are compacted by age and per-strategy count, and deleted after delete_after_days"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        store = make_backtests(root, [200, 40, 3, 2, 1])
+        report = apply(root, store, max_age_days=30, keep_per_strategy=2, delete_after_days=100)
+        assert store.get("s1-0") is None, "the oldest backtest was not deleted"
+        assert compacted(root, store, "s1-1"), "a backtest past max_age_days was not compacted"
+        assert compacted(root, store, "s1-2"), "a backtest beyond keep_per_strategy was not compacted"
+        assert not compacted(root, store, "s1-3") and not compacted(root, store, "s1-4")
+        assert store.get("s1-1")["results"] == {"totalReturn": 0.1}
+        assert report["deleted"] == 1 and report["compacted"] == 2, report
+
+
+def test_disk_budget_compacts_oldest_first():
+    """Over max_disk_bytes, the oldest backtests are compacted until the directories fit"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        store = make_backtests(root, [4, 3, 2, 1])
+        strategy_bytes = sum(f.stat().st_size for f in (root / "strategies").rglob("*.py"))
+        budget = 2 * RESULT_BYTES + strategy_bytes
+        report = apply(root, store, max_disk_bytes=budget)
+        assert [compacted(root, store, f"s1-{i}") for i in range(4)] == [True, True, False, False]
+        assert report["disk_bytes"] <= budget, report
+
+
+def test_strategy_directories():
+    """Old strategy directories are removed unless a queued or running backtest uses them"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        store = make_backtests(root, [10, 10])
+        store.upsert("s1-1", {"status": "running"})
+        report = apply(root, store, strategy_max_age_days=7)
+        assert not (root / "strategies" / "s1-0").exists()
+        assert (root / "strategies" / "s1-1" / "strategy.py").is_file()
+        assert report["strategies_removed"] == 1, report
+
+
+def test_zero_policies_skip_deduplication():
+    """With every policy at 0 strategy files are left as they are"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        store = make_backtests(root, [10, 10])
+        report = apply(root, store)
+        assert report["strategies_deduplicated"] == 0, report
+        assert not (root / "strategies" / OBJECTS_DIR).exists()
+
+
+def test_rewritten_strategy_leaves_twins_unchanged():
+    """Rewriting a deduplicated strategy file changes neither its twins nor the stored copy"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        store = make_backtests(root, [10, 10])
+        store.upsert("s1-2", {"status": "queued"})
+        apply(root, store, max_age_days=365)
+        first, second = (root / "strategies" / f"s1-{i}" / "strategy.py" for i in range(2))
+        assert first.stat().st_ino == second.stat().st_ino, "strategy files were not deduplicated"
+
+        strategies_dir = service.STRATEGIES_DIR
+        service.STRATEGIES_DIR = root / "strategies"
+        try:
+            service.write_strategy("s1-0", "# rewritten\n")
+            # A third copy of the original code links to the stored copy, which must be intact
+            service.write_strategy("s1-2", "# s1\n")
+        finally:
+            service.STRATEGIES_DIR = strategies_dir
+        assert first.read_text() == "# rewritten\n"
+        assert second.read_text() == "# s1\n"
+        store.upsert("s1-2", {"status": "completed"})
+        apply(root, store, max_age_days=365)
+        assert (root / "strategies" / "s1-2" / "strategy.py").read_text() == "# s1\n"
+        for stored in (root / "strategies" / OBJECTS_DIR).glob("*.py"):
+            assert stored.read_text() in ("# s1\n", "# rewritten\n")
+
+
+def main():
+    """Run the retention tests"""
+    print("🚀 Starting retention test")
+    print("=" * 50)
+    try:
+        test_zero_policies_keep_everything()
+        test_age_count_and_delete_policies()
+        test_disk_budget_compacts_oldest_first()
+        test_strategy_directories()
+        test_zero_policies_skip_deduplication()
+        test_rewritten_strategy_leaves_twins_unchanged()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("✅ Retention policies compact, delete and keep the expected backtests")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
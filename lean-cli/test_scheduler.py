@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Scheduling test for the backtest executor
+
+Runs the executor with a stub job and checks that interactive backtests
+jump ahead of bulk ones, that owners share workers by weight, and that
+resubmitting a queued backtest neither runs it twice nor kills a worker,
+and that a running backtest cannot be resubmitted.
+"""
+
+import asyncio
+import sys
+from typing import List
+
+from executor import BacktestExecutor, JobRunningError
+
+JOB_SECONDS = 0.02
+
+
+async def run_jobs(submit, workers: int = 2, reserved: int = 1, weights=None) -> List[str]:
+    """IDs of the jobs submit() queues, in the order they started"""
+    started = []
+
+    async def run(job_id, *args):
+        started.append(job_id)
+        await asyncio.sleep(JOB_SECONDS)
+
+    executor = BacktestExecutor(run, workers, 1000, reserved_workers=reserved, owner_weights=weights)
+    await executor.start()
+    try:
+        submit(executor)
+        for _ in range(500):
+            await asyncio.sleep(JOB_SECONDS)
+            if executor.queue_depth == 0 and executor.running == 0:
+                break
+        alive = sum(not worker.done() for worker in executor._workers)
+        assert alive == workers, f"{workers - alive} of {workers} workers died"
+    finally:
+        await executor.stop()
+    return started
+
+
+def test_interactive_jumps_ahead():
+    """An interactive backtest starts before queued bulk ones"""
+    def submit(executor):
+        for i in range(10):
+            executor.submit(f"bulk-{i}", owner="sweep", priority_class="bulk")
+        executor.submit("interactive", owner="user")
+    started = asyncio.run(run_jobs(submit))
+    assert started.index("interactive") <= 1, started
+
+
+def test_weighted_fair_share():
+    """An owner with twice the weight gets twice the workers"""
+    def submit(executor):
+        for i in range(12):
+            executor.submit(f"a-{i}", owner="a", priority_class="bulk")
+            executor.submit(f"b-{i}", owner="b", priority_class="bulk")
+    started = asyncio.run(run_jobs(submit, workers=1, reserved=0, weights={"a": 2}))
+    first = started[:9]
+    assert sum(job_id.startswith("a") for job_id in first) == 6, first
+
+
+def test_resubmitted_job_runs_once():
+    """A backtest submitted again while queued replaces the queued one"""
+    def submit(executor):
+        for i in range(4):
+            executor.submit(f"fill-{i}")
+        executor.submit("dup")
+        executor.submit("dup")
+    started = asyncio.run(run_jobs(submit))
+    assert started.count("dup") == 1, started
+
+
+def test_running_job_rejects_resubmission():
+    """A backtest submitted again while running is rejected and keeps running"""
+    async def run():
+        started = []
+        release = asyncio.Event()
+
+        async def job(job_id, *args):
+            started.append(job_id)
+            await release.wait()
+
+        executor = BacktestExecutor(job, 2, 1000)
+        await executor.start()
+        try:
+            executor.submit("dup")
+            while not executor.is_running("dup"):
+                await asyncio.sleep(0)
+            task = executor._active["dup"]
+            try:
+                executor.submit("dup")
+            except JobRunningError:
+                pass
+            else:
+                raise AssertionError("running backtest was queued again")
+            release.set()
+            for _ in range(100):
+                await asyncio.sleep(JOB_SECONDS)
+                if executor.running == 0 and executor.queue_depth == 0:
+                    break
+            assert task.done() and not task.cancelled(), task
+        finally:
+            await executor.stop()
+        return started
+    started = asyncio.run(run())
+    assert started == ["dup"], started
+
+
+def main():
+    """Run the scheduling tests"""
+    print("🚀 Starting executor scheduling test")
+    print("=" * 50)
+    try:
+        test_interactive_jumps_ahead()
+        test_weighted_fair_share()
+        test_resubmitted_job_runs_once()
+        test_running_job_rejects_resubmission()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("✅ Interactive, fair-share, resubmitted and running backtests are scheduled correctly")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
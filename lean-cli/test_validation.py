@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Strategy validation test for the LEAN CLI service
+
+Checks the strategy code variants that are accepted, the line-level errors
+of those that are not, the shape of the 422 response rejecting them, and
+that repeated code is answered from the validation cache.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+WORKDIR = tempfile.mkdtemp(prefix="test_validation_")
+# The service reads its configuration at import time
+os.environ.update({
+    "ENGINE_MODE": "simulator",
+    "JOB_STORE": "memory",
+    "LEAN_STRATEGIES_DIR": os.path.join(WORKDIR, "strategies"),
+    "LEAN_RESULTS_DIR": os.path.join(WORKDIR, "results"),
+    "LEAN_DATA_DIR": os.path.join(WORKDIR, "data"),
+})
+
+import httpx  # noqa: E402
+import main as service  # noqa: E402
+from validation import ValidationCache, is_warning, validate_strategy  # noqa: E402
+
+ACCEPTED = {
+    "pascal_case": """
+from AlgorithmImports import *
+
+class Strategy(QCAlgorithm):
+    def Initialize(self):
+        self.SetCash(100000)
+""",
+    "snake_case": """
+from AlgorithmImports import *
+
+class Strategy(QCAlgorithm):
+    def initialize(self):
+        self.set_cash(100000)
+""",
+    "module_attribute_base": """
+import AlgorithmImports
+
+class Strategy(AlgorithmImports.QCAlgorithm):
+    def Initialize(self):
+        pass
+""",
+    "inherited_initialize": """
+from AlgorithmImports import *
+
+class Base(QCAlgorithm):
+    def Initialize(self):
+        pass
+
+class Strategy(Base):
+    def OnData(self, data):
+        pass
+""",
+}
+# Accepted with a warning, as the imported base may derive from QCAlgorithm
+INDIRECT_BASE = """
+from my_framework import FrameworkAlgorithm
+
+class Strategy(FrameworkAlgorithm):
+    def OnData(self, data):
+        pass
+"""
+# Code, expected error type and line
+REJECTED = {
+    "syntax_error": ("class Strategy(QCAlgorithm):\n    def Initialize(self)\n        pass\n", "syntax_error", 2),
+    "compiler_error": ("return 1\n", "syntax_error", 1),
+    "no_algorithm": ("class Strategy:\n    pass\n", "invalid_strategy", None),
+    "no_initialize": ("\nclass Strategy(QCAlgorithm):\n    def OnData(self, data):\n        pass\n",
+                      "invalid_strategy", 2),
+}
+
+
+def test_accepted_variants():
+    """Each accepted variant validates without issues; an imported base only warns"""
+    for name, code in ACCEPTED.items():
+        assert validate_strategy(code) == [], name
+        service.validate_strategy_code(code, None)
+    issues = validate_strategy(INDIRECT_BASE)
+    assert len(issues) == 1 and is_warning(issues[0]) and issues[0]["line"] == 4, issues
+    service.validate_strategy_code(INDIRECT_BASE, None)
+
+
+def test_rejected_code():
+    """Broken code yields one error of the expected type at the offending line"""
+    for name, (code, kind, line) in REJECTED.items():
+        issues = validate_strategy(code)
+        assert len(issues) == 1 and issues[0]["type"] == kind, (name, issues)
+        assert issues[0]["line"] == line, (name, issues)
+        assert not is_warning(issues[0]), name
+
+
+def test_rejection_response():
+    """POST /backtest answers broken code with a 422 shaped like FastAPI's validation errors"""
+    async def post(body):
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            return await c.post("/backtest", json=body)
+
+    code = REJECTED["syntax_error"][0]
+    response = asyncio.run(post({"backtest_id": "broken", "strategy_code": code}))
+    assert response.status_code == 422, response.status_code
+    detail = response.json()["detail"]
+    assert len(detail) == 1, detail
+    assert set(detail[0]) == {"loc", "msg", "type", "line", "column"}, detail
+    assert detail[0]["loc"] == ["body", "strategy_code"] and detail[0]["line"] == 2, detail
+    assert service.job_store.get("broken") is None
+
+
+def test_validation_cache():
+    """The same code is validated once, and the cache stays within max_entries"""
+    cache = ValidationCache(max_entries=2)
+    code = ACCEPTED["pascal_case"]
+    assert cache.validate(code) == [] and cache.validate(code) == []
+    cache.validate(ACCEPTED["snake_case"])
+    cache.validate(ACCEPTED["inherited_initialize"])
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 3, 2), stats
+
+
+def main():
+    """Run the strategy validation tests"""
+    print("🚀 Starting strategy validation test")
+    print("=" * 50)
+    try:
+        test_accepted_variants()
+        test_rejected_code()
+        test_rejection_response()
+        test_validation_cache()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("✅ Strategy code is accepted or rejected with line-level errors")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Walk-forward test for the LEAN CLI service
+
+Checks the train/test windows generated for a date range, the aggregate of
+their out-of-sample results, and the annualized returns used for
+walk-forward efficiency, including returns too large to annualize.
+"""
+
+import math
+import sys
+
+from walk_forward import aggregate_out_of_sample, annualized_return, walk_forward_windows
+
+
+def window(in_sample_return: float, out_of_sample_return: float) -> dict:
+    """A finished window trained over a year and tested over one day"""
+    return {
+        "train_start": "2021-01-01",
+        "train_end": "2022-01-01",
+        "test_start": "2022-01-01",
+        "test_end": "2022-01-02",
+        "in_sample": {"totalReturn": in_sample_return},
+        "out_of_sample": {"totalReturn": out_of_sample_return},
+    }
+
+
+def test_rolling_windows():
+    """Windows advance by step_days and stop before the test period passes end_date"""
+    windows = walk_forward_windows("2020-01-01", "2020-04-15", train_days=31, test_days=30)
+    assert [(w["train_start"], w["test_start"], w["test_end"]) for w in windows] == [
+        ("2020-01-01", "2020-02-01", "2020-03-02"),
+        ("2020-01-31", "2020-03-02", "2020-04-01"),
+    ], windows
+    assert [w["index"] for w in windows] == [0, 1]
+    assert all(w["train_end"] == w["test_start"] for w in windows)
+    assert walk_forward_windows("2020-01-01", "2020-02-01", train_days=31, test_days=30) == []
+
+
+def test_anchored_and_stepped_windows():
+    """Anchored windows keep training from start_date; step_days sets how far windows move"""
+    windows = walk_forward_windows("2020-01-01", "2020-04-15", train_days=31, test_days=30,
+                                   step_days=15, anchored=True)
+    assert {w["train_start"] for w in windows} == {"2020-01-01"}, windows
+    assert [w["test_start"] for w in windows] == ["2020-02-01", "2020-02-16", "2020-03-02"], windows
+
+
+def test_aggregate():
+    """Out-of-sample statistics over finished test windows, compounded only without overlap"""
+    windows = [
+        {"out_of_sample": {"totalReturn": 0.1, "sharpeRatio": 1.0, "maxDrawdown": -0.05}},
+        {"out_of_sample": {"totalReturn": -0.05, "sharpeRatio": -0.5, "maxDrawdown": -0.2}},
+        {"out_of_sample": {"totalReturn": 0.2, "sharpeRatio": 2.0, "maxDrawdown": -0.1}},
+        {"out_of_sample": None},
+    ]
+    aggregate = aggregate_out_of_sample(windows, overlapping=False)
+    assert aggregate["windows"] == 3
+    assert math.isclose(aggregate["meanReturn"], 0.25 / 3)
+    assert math.isclose(aggregate["medianReturn"], 0.1)
+    assert math.isclose(aggregate["returnStd"], math.sqrt(sum((r - 0.25 / 3) ** 2 for r in (0.1, -0.05, 0.2)) / 2))
+    assert math.isclose(aggregate["meanSharpe"], 2.5 / 3)
+    assert aggregate["worstDrawdown"] == -0.2
+    assert math.isclose(aggregate["positiveWindows"], 2 / 3)
+    assert math.isclose(aggregate["compoundedReturn"], 1.1 * 0.95 * 1.2 - 1.0)
+    assert aggregate["walkForwardEfficiency"] is None, aggregate
+    assert aggregate_out_of_sample(windows, overlapping=True)["compoundedReturn"] is None
+    assert aggregate_out_of_sample([{"out_of_sample": None}], overlapping=False) is None
+
+
+def test_annualized_return():
+    """Returns compound to a yearly rate; overflowing ones become None instead of raising"""
+    assert math.isclose(annualized_return(0.1, 365), 0.1)
+    assert math.isclose(annualized_return(0.21, 730), 0.1)
+    assert annualized_return(-1.0, 30) == -1.0
+    assert annualized_return(100.0, 1) is None
+
+
+def test_efficiency_skips_overflowing_windows():
+    """A window whose annualized return overflows is left out of walk-forward efficiency"""
+    aggregate = aggregate_out_of_sample([window(0.1, 100.0), window(0.2, 0.001)], overlapping=False)
+    expected = annualized_return(0.001, 1) / annualized_return(0.2, 365)
+    assert math.isclose(aggregate["walkForwardEfficiency"], expected), aggregate
+    aggregate = aggregate_out_of_sample([window(0.1, 100.0)], overlapping=False)
+    assert aggregate["walkForwardEfficiency"] is None, aggregate
+
+
+def main():
+    """Run the walk-forward tests"""
+    print("🚀 Starting walk-forward test")
+    print("=" * 50)
+    try:
+        test_rolling_windows()
+        test_anchored_and_stepped_windows()
+        test_aggregate()
+        test_annualized_return()
+        test_efficiency_skips_overflowing_windows()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("✅ Walk-forward windows are generated and aggregated correctly")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
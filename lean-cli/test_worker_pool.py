@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Engine worker pool test
+
+Checks that a pool whose workers cannot start fails its jobs instead of
+leaving them waiting, and that a worker's memory includes the processes
+it started.
+"""
+
+import asyncio
+import subprocess
+import sys
+import time
+
+import engine_worker
+import worker_pool
+from engine import EngineError
+from worker_pool import EngineWorkerPool
+
+CHILD_MB = 200
+
+
+def test_failed_spawns_fail_jobs():
+    """Jobs fail once every worker slot has given up starting"""
+    async def run():
+        pool = EngineWorkerPool([sys.executable, "-c", "import sys; sys.exit(1)"], 2, 10, 1 << 40)
+        waiting = asyncio.create_task(pool.run("run_simulator", {}))
+        await pool.start()
+        assert not pool.ready and pool.slots == 0, pool.stats()
+        for job in (waiting, pool.run("run_simulator", {})):
+            try:
+                await asyncio.wait_for(job, 5)
+            except EngineError:
+                continue
+            raise AssertionError("job ran without a worker")
+        await pool.stop()
+
+    backoff = worker_pool.SPAWN_BACKOFF_SECONDS
+    worker_pool.SPAWN_BACKOFF_SECONDS = 0.01
+    try:
+        asyncio.run(run())
+    finally:
+        worker_pool.SPAWN_BACKOFF_SECONDS = backoff
+
+
+def test_rss_includes_children():
+    """A worker's memory counts the engine process it launched"""
+    before = engine_worker.tree_rss_bytes()
+    child = subprocess.Popen([
+        sys.executable, "-c",
+        f"import sys, time; x = bytearray({CHILD_MB} << 20); print(flush=True); time.sleep(5)",
+    ], stdout=subprocess.PIPE)
+    try:
+        child.stdout.readline()
+        time.sleep(0.1)
+        grown = engine_worker.tree_rss_bytes() - before
+    finally:
+        child.kill()
+        child.wait()
+    assert grown > CHILD_MB << 20, grown
+
+
+def main():
+    """Run the worker pool tests"""
+    print("🚀 Starting engine worker pool test")
+    print("=" * 50)
+    try:
+        test_failed_spawns_fail_jobs()
+        test_rss_includes_children()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print("✅ Failed workers fail their jobs and memory covers the engine process")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
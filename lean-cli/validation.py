@@ -0,0 +1,110 @@
+"""
+Pre-dispatch validation of strategy code.
+
+Submitted code is compiled and checked for a QCAlgorithm subclass with an
+Initialize (or initialize) method before a job is queued, so broken code is rejected with
+line-level errors instead of taking a worker slot. Outcomes are cached by
+code hash, since search loops resubmit the same code many times.
+"""
+
+import ast
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+from engine import algorithm_class_chain, find_algorithm_class_node
+
+STRATEGY_FILENAME = "strategy.py"
+# Issues that cannot be confirmed from the code alone; reported without rejecting it
+WARNING_TYPES = ("indirect_base",)
+INITIALIZE_METHODS = ("Initialize", "initialize")
+
+
+def strategy_error(message: str, line: Optional[int] = None,
+                   column: Optional[int] = None, kind: str = "invalid_strategy") -> Dict[str, Any]:
+    """One validation error, shaped like FastAPI's request validation errors"""
+    return {
+        "loc": ["body", "strategy_code"],
+        "msg": message,
+        "type": kind,
+        "line": line,
+        "column": column,
+    }
+
+
+def is_warning(issue: Dict[str, Any]) -> bool:
+    return issue["type"] in WARNING_TYPES
+
+
+def validate_strategy(strategy_code: str) -> List[Dict[str, Any]]:
+    """Compile and check strategy code; returns the errors and warnings, empty if valid"""
+    try:
+        tree = compile(strategy_code, STRATEGY_FILENAME, "exec", ast.PyCF_ONLY_AST)
+        # Some errors, such as 'return' outside a function, are only raised by the compiler
+        compile(tree, STRATEGY_FILENAME, "exec")
+    except SyntaxError as e:
+        return [strategy_error(e.msg, e.lineno, e.offset, "syntax_error")]
+    except ValueError as e:
+        return [strategy_error(str(e), kind="syntax_error")]
+
+    node = find_algorithm_class_node(tree)
+    if node is None:
+        node = find_algorithm_class_node(tree, indirect=True)
+        if node is None:
+            return [strategy_error("Strategy code does not define a QCAlgorithm subclass")]
+        # Its imported base may derive from QCAlgorithm and define Initialize
+        return [strategy_error(
+            f"Class {node.name} does not visibly derive from QCAlgorithm; assuming an imported base does",
+            node.lineno, node.col_offset + 1, "indirect_base"
+        )]
+
+    chain, _ = algorithm_class_chain(tree, node)
+    methods = {
+        item.name for cls in chain for item in cls.body
+        if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))
+    }
+    if not methods.intersection(INITIALIZE_METHODS):
+        return [strategy_error(
+            f"Class {node.name} does not define Initialize", node.lineno, node.col_offset + 1
+        )]
+    return []
+
+
+class ValidationCache:
+    """LRU cache of validation outcomes keyed by a hash of the code"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def validate(self, strategy_code: str) -> List[Dict[str, Any]]:
+        """Errors of the strategy code, validating it only on a cache miss"""
+        key = hashlib.sha256(strategy_code.encode()).hexdigest()
+        with self._lock:
+            errors = self._entries.get(key)
+            if errors is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return errors
+            self.misses += 1
+
+        errors = validate_strategy(strategy_code)
+        with self._lock:
+            self._entries[key] = errors
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return errors
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
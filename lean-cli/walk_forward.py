@@ -0,0 +1,100 @@
+"""
+Walk-forward analysis over rolling train/test windows.
+
+The date range is split into windows, each an in-sample (train) period
+followed by an out-of-sample (test) period, and both halves of every window
+run as jobs of one batch. Out-of-sample results are aggregated across the
+windows, along with how well in-sample returns carried over.
+"""
+
+import math
+from datetime import date, timedelta
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+
+def walk_forward_windows(start_date: str, end_date: str, train_days: int, test_days: int,
+                         step_days: Optional[int] = None, anchored: bool = False) -> List[Dict[str, Any]]:
+    """Train/test windows that fit between start_date and end_date
+
+    Windows advance by step_days (default test_days). Anchored windows keep
+    training from start_date, so the train period grows with each step.
+    """
+    start = date.fromisoformat(start_date)
+    end = date.fromisoformat(end_date)
+    step = timedelta(days=step_days or test_days)
+    windows = []
+    offset = timedelta(0)
+    while True:
+        train_end = start + offset + timedelta(days=train_days)
+        test_end = train_end + timedelta(days=test_days)
+        if test_end > end:
+            return windows
+        windows.append({
+            "index": len(windows),
+            "train_start": (start if anchored else start + offset).isoformat(),
+            "train_end": train_end.isoformat(),
+            "test_start": train_end.isoformat(),
+            "test_end": test_end.isoformat(),
+        })
+        offset += step
+
+
+def _days(start: str, end: str) -> int:
+    return (date.fromisoformat(end) - date.fromisoformat(start)).days
+
+
+def annualized_return(total_return: float, days: int) -> Optional[float]:
+    """Compound a return over days to a yearly rate, None if that overflows a float"""
+    if total_return <= -1.0:
+        return -1.0
+    try:
+        return math.expm1(365.0 / days * math.log1p(total_return))
+    except OverflowError:
+        return None
+
+
+def aggregate_out_of_sample(windows: List[Dict[str, Any]],
+                            overlapping: bool) -> Optional[Dict[str, Any]]:
+    """Out-of-sample metrics across windows, None until a test period has finished
+
+    Each window carries the results of its in_sample and out_of_sample runs,
+    or None. Returns of overlapping test periods are not compounded, as they
+    would count the same days more than once.
+    """
+    tested = [w for w in windows if w.get("out_of_sample")]
+    if not tested:
+        return None
+
+    results = [w["out_of_sample"] for w in tested]
+    returns = np.array([r["totalReturn"] for r in results])
+    sharpes = np.array([r.get("sharpeRatio", 0.0) for r in results])
+    drawdowns = np.array([r.get("maxDrawdown", 0.0) for r in results])
+    aggregate: Dict[str, Any] = {
+        "windows": len(tested),
+        "meanReturn": float(returns.mean()),
+        "medianReturn": float(np.median(returns)),
+        "returnStd": float(returns.std(ddof=1)) if len(returns) > 1 else 0.0,
+        "meanSharpe": float(sharpes.mean()),
+        "worstDrawdown": float(drawdowns.min()),
+        "positiveWindows": float((returns > 0).mean()),
+        "compoundedReturn": None if overlapping else float(np.prod(1.0 + returns) - 1.0),
+    }
+
+    # Annualized, as train and test periods differ in length; windows whose
+    # annualized return overflows, such as a large gain over a few days, are left out
+    annualized = [
+        (annualized_return(w["in_sample"]["totalReturn"], _days(w["train_start"], w["train_end"])),
+         annualized_return(w["out_of_sample"]["totalReturn"], _days(w["test_start"], w["test_end"])))
+        for w in tested if w.get("in_sample")
+    ]
+    paired = [pair for pair in annualized if None not in pair]
+    efficiency = None
+    if paired:
+        in_sample = np.mean([pair[0] for pair in paired])
+        out_of_sample = np.mean([pair[1] for pair in paired])
+        if in_sample > 0:
+            efficiency = float(out_of_sample / in_sample)
+    aggregate["walkForwardEfficiency"] = efficiency
+    return aggregate
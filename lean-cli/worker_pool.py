@@ -0,0 +1,207 @@
+"""
+Pool of warm engine worker processes.
+
+Workers are started ahead of time and reused across jobs over a JSON-lines
+pipe. A worker is replaced after a fixed number of jobs, when the peak
+memory of its process tree during a job passes a threshold, or when a job
+running on it is cancelled or stopped early from its progress callback.
+A worker that fails to start is retried with backoff; once every slot has
+given up, jobs fail instead of waiting.
+"""
+
+import asyncio
+import json
+import os
+import signal
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from engine import EngineError
+
+# Largest protocol message accepted from a worker
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+# Attempts to start a worker before its slot is given up, and the first retry delay
+SPAWN_ATTEMPTS = 5
+SPAWN_BACKOFF_SECONDS = 1.0
+
+
+class EngineWorker:
+    """One running engine_worker.py process"""
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.jobs_run = 0
+        self.rss_bytes = 0
+
+    async def send(self, message: Dict[str, Any]):
+        self.process.stdin.write((json.dumps(message) + "\n").encode())
+        await self.process.stdin.drain()
+
+    async def receive(self) -> Dict[str, Any]:
+        line = await self.process.stdout.readline()
+        if not line:
+            raise EngineError("Engine worker exited unexpectedly")
+        return json.loads(line)
+
+    async def kill(self):
+        """Kill the worker and anything it started, such as a LEAN launcher"""
+        if self.process.returncode is None:
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await self.process.wait()
+
+
+class EngineWorkerPool:
+    """Dispatches engine jobs to a fixed number of pre-started workers"""
+
+    def __init__(self, command: List[str], size: int, max_jobs: int, max_rss_bytes: int):
+        self.command = command
+        self.size = max(1, size)
+        self.max_jobs = max_jobs
+        self.max_rss_bytes = max_rss_bytes
+        self.jobs = 0
+        self.recycled = 0
+        self.ready = False
+        # Workers running or being started; a slot is given up when its worker cannot start
+        self.slots = self.size
+        self._cold_start_total = 0.0
+        self._cold_starts = 0
+        self._warm_start_total = 0.0
+        self._idle: Optional[asyncio.Queue] = None
+        self._workers: Set[EngineWorker] = set()
+        self._replacing: Set[asyncio.Task] = set()
+
+    def _idle_queue(self) -> asyncio.Queue:
+        # Created on first use inside the event loop, so jobs can wait for a pool still starting
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+        return self._idle
+
+    async def start(self):
+        """Start every worker and wait until they are ready
+
+        Each worker takes jobs as soon as it is ready, so jobs submitted
+        while the pool starts wait only for the first one.
+        """
+        await asyncio.gather(*(self._fill_slot() for _ in range(self.size)))
+        self.ready = self.slots > 0
+
+    async def stop(self):
+        for task in self._replacing:
+            task.cancel()
+        await asyncio.gather(*self._replacing, return_exceptions=True)
+        await asyncio.gather(*(worker.kill() for worker in list(self._workers)))
+        self._workers.clear()
+
+    async def _spawn(self) -> EngineWorker:
+        started = time.monotonic()
+        process = await asyncio.create_subprocess_exec(
+            *self.command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=MAX_MESSAGE_BYTES,
+            start_new_session=True,
+        )
+        worker = EngineWorker(process)
+        self._workers.add(worker)
+        try:
+            message = await worker.receive()
+        except BaseException:
+            await self._discard(worker)
+            raise
+        if message.get("type") != "ready":
+            await self._discard(worker)
+            raise EngineError(f"Engine worker failed to start: {message}")
+        self._cold_start_total += time.monotonic() - started
+        self._cold_starts += 1
+        return worker
+
+    async def _discard(self, worker: EngineWorker):
+        self._workers.discard(worker)
+        await worker.kill()
+
+    async def _fill_slot(self):
+        """Start a worker for a slot, retrying with backoff before giving the slot up"""
+        for attempt in range(SPAWN_ATTEMPTS):
+            try:
+                self._idle_queue().put_nowait(await self._spawn())
+                return
+            except Exception as e:
+                print(f"Error starting engine worker (attempt {attempt + 1}/{SPAWN_ATTEMPTS}): {e}")
+            if attempt + 1 < SPAWN_ATTEMPTS:
+                await asyncio.sleep(SPAWN_BACKOFF_SECONDS * 2 ** attempt)
+        self.slots -= 1
+        # Wake a waiting job so it can fail if no slots are left
+        self._idle_queue().put_nowait(None)
+
+    async def _replace(self, worker: EngineWorker):
+        await self._discard(worker)
+        self.recycled += 1
+        await self._fill_slot()
+
+    def _replace_in_background(self, worker: EngineWorker):
+        task = asyncio.create_task(self._replace(worker))
+        self._replacing.add(task)
+        task.add_done_callback(self._replacing.discard)
+
+    async def run(self, engine: str, kwargs: Dict[str, Any],
+                  on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Any:
+        """Run an engine function on an idle worker and return its result
+
+        Progress checkpoints from the worker are passed to on_progress; if it
+        raises, the worker is killed along with the job. Raises EngineError
+        when no worker could be started.
+        """
+        worker = None
+        while worker is None:
+            if self.slots == 0:
+                raise EngineError("No engine worker could be started")
+            worker = await self._idle_queue().get()
+            if worker is None and self.slots == 0:
+                # Pass the wake-up on to the next waiting job
+                self._idle.put_nowait(None)
+        try:
+            dispatched = time.monotonic()
+            await worker.send({"job_id": self.jobs, "engine": engine, "kwargs": kwargs})
+            await worker.receive()  # started
+            self._warm_start_total += time.monotonic() - dispatched
+            self.jobs += 1
+            message = await worker.receive()
+            while message.get("type") == "progress":
+                if on_progress is not None:
+                    on_progress(message["checkpoint"])
+                message = await worker.receive()
+        except BaseException:
+            # The worker may be mid-job; never hand it to another job
+            self._replace_in_background(worker)
+            raise
+
+        worker.jobs_run += 1
+        worker.rss_bytes = message.get("rss", 0)
+        if worker.jobs_run >= self.max_jobs or worker.rss_bytes > self.max_rss_bytes:
+            self._replace_in_background(worker)
+        else:
+            self._idle.put_nowait(worker)
+
+        if not message["ok"]:
+            raise EngineError(message["error"])
+        return message["result"]
+
+    def stats(self) -> Dict[str, Any]:
+        # Worker start-up covers the interpreter and engine imports only; LEAN
+        # itself is launched per job either way, so that is all a warm worker saves
+        worker_start = self._cold_start_total / self._cold_starts if self._cold_starts else 0.0
+        dispatch = self._warm_start_total / self.jobs if self.jobs else 0.0
+        return {
+            "size": self.size,
+            "slots": self.slots,
+            "ready": self.ready,
+            "idle": sum(1 for worker in self._idle._queue if worker is not None) if self._idle is not None else 0,
+            "jobs": self.jobs,
+            "recycled": self.recycled,
+            "avg_worker_start_seconds": worker_start,
+            "avg_dispatch_seconds": dispatch,
+            "saved_interpreter_start_seconds": max(0.0, worker_start - dispatch) * self.jobs,
+        }
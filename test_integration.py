@@ -56,8 +56,11 @@ def test_lean_cli_integration():
     
     # Test a simple backtest
     strategy_code = """
-print("Integration test strategy")
-print("Testing the complete system flow")
+from AlgorithmImports import *
+
+class IntegrationTestAlgorithm(QCAlgorithm):
+    def Initialize(self):
+        self.AddEquity("SPY")
 """
     
     backtest_request = {
@@ -75,12 +78,13 @@ print("Testing the complete system flow")
             data = response.json()
             print(f"✅ Backtest started: {data['backtest_id']}")
             
-            # Poll for results
+            # Long-poll for results
             backtest_id = data["backtest_id"]
             max_attempts = 10
             for attempt in range(max_attempts):
-                time.sleep(2)
-                result_response = requests.get(f"{LEAN_CLI_URL}/backtest/{backtest_id}")
+                result_response = requests.get(
+                    f"{LEAN_CLI_URL}/backtest/{backtest_id}", params={"wait": 10}
+                )
                 
                 if result_response.status_code == 200:
                     result_data = result_response.json()